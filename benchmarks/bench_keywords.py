@@ -0,0 +1,54 @@
+"""
+bench_keywords.py
+-----------------
+Compares per-document keyword extraction (extract_keywords) with the
+streaming nlp.pipe path (extract_keywords_batch) on data/cleaned_reviews.csv,
+and checks that both produce identical keywords.
+
+Run from the repo root:
+    python benchmarks/bench_keywords.py [--n-process 2] [--batch-size 1000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from task_2_sentiment_thematic_analysis import extract_keywords, extract_keywords_batch  # noqa: E402
+
+INPUT_FILE = "data/cleaned_reviews.csv"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--n-process", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    texts = pd.read_csv(args.input)["review"].tolist()
+
+    start = time.perf_counter()
+    per_doc = [extract_keywords(t) for t in texts]
+    per_doc_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = list(extract_keywords_batch(texts, batch_size=args.batch_size, n_process=args.n_process))
+    batched_s = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(per_doc, batched))
+    print(f"reviews:          {len(texts)}")
+    print(f"per-document:     {per_doc_s:.2f}s ({len(texts) / per_doc_s:,.0f} reviews/s)")
+    print(f"nlp.pipe:         {batched_s:.2f}s ({len(texts) / batched_s:,.0f} reviews/s)")
+    print(f"speedup:          {per_doc_s / batched_s:.1f}x")
+    print(f"identical output: {mismatches == 0} ({mismatches} mismatches)")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+bench_near_duplicates.py
+------------------------
+Times near_duplicates.NearDuplicateIndex (MinHash + LSH banding) on
+synthetic cleaned reviews of increasing size, to show that indexing cost
+grows about linearly with the number of distinct texts, and checks a
+sample of clustered texts against the exact shingle Jaccard similarity
+to their cluster's first text (median and 5th percentile).
+Also times re-adding the same corpus after a save/load round trip (what a
+new scrape pays for the reviews it has already seen).
+
+Run from the repo root:
+    python benchmarks/bench_near_duplicates.py [--rows 100000 400000 1000000] [--threshold 0.8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from near_duplicates import SHINGLE_SIZE, THRESHOLD, _NON_WORD, NearDuplicateIndex  # noqa: E402
+from preprocess import clean_text, map_unique  # noqa: E402
+from synthetic import synthetic_reviews  # noqa: E402
+
+
+def exact_jaccard(a, b, k=SHINGLE_SIZE):
+    def shingles(text):
+        data = _NON_WORD.sub(" ", text).strip().encode().ljust(k, b"\0")
+        return {data[i:i + k] for i in range(len(data) - k + 1)}
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 400_000, 1_000_000])
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--sample-pairs", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10} {'distinct':>10} {'clusters':>10} {'index s':>9} {'texts/s':>10} {'re-add s':>9}"
+          f" {'jaccard p50':>12} {'p5':>6}")
+    for rows in args.rows:
+        texts = map_unique(synthetic_reviews(rows)["review"], clean_text).tolist()
+        index = NearDuplicateIndex(args.threshold)
+        start = time.perf_counter()
+        items = index.add(texts)
+        clusters = index.clusters(items)
+        seconds = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.npz")
+            index.save(path)
+            start = time.perf_counter()
+            again = NearDuplicateIndex.load(path).assign(texts)
+            readd = time.perf_counter() - start
+        assert (again == clusters).all()
+
+        # Exact similarity of clustered texts to their cluster's first text
+        # (single linkage can chain, so some sit below the threshold)
+        text_of = dict(zip(items.tolist(), texts))
+        pairs = [(text_of[cluster], text) for text, cluster in zip(texts, clusters.tolist())
+                 if text != text_of[cluster]]
+        picks = rng.choice(len(pairs), min(args.sample_pairs, len(pairs)), replace=False) if pairs else []
+        similarity = [exact_jaccard(*pairs[p]) for p in picks] or [float("nan")]
+        p50, p5 = np.percentile(similarity, [50, 5])
+
+        print(f"{rows:>10,} {len(index):>10,} {len(set(clusters.tolist())):>10,} {seconds:>9.2f}"
+              f" {len(index) / seconds:>10,.0f} {readd:>9.2f} {p50:>12.2f} {p5:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+bench_overlapped_scoring.py
+---------------------------
+Times chunked read -> VADER score -> write-back done one stage after
+another (the old score_incrementally loop) against
+chunk_pipeline.run_overlapped, where reads and writes run in their own
+threads behind bounded queues. Database round trips are simulated with
+--read-ms / --write-ms of latency per chunk, so the benchmark needs no
+server; scoring is real (VaderScorer). Also reports the peak number of
+chunks alive at once, which is what bounds memory.
+
+Run from the repo root:
+    python benchmarks/bench_overlapped_scoring.py [--rows 100000] [--chunk-size 5000]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from chunk_pipeline import QUEUE_DEPTH, run_overlapped  # noqa: E402
+from vader_scoring import VaderScorer  # noqa: E402
+from synthetic import synthetic_reviews  # noqa: E402
+
+
+class Stages:
+    """Simulated reads and writes that count the chunks alive between them."""
+
+    def __init__(self, texts, chunk_size, read_s, write_s, scorer):
+        self.texts, self.chunk_size = texts, chunk_size
+        self.read_s, self.write_s, self.scorer = read_s, write_s, scorer
+        self.alive = self.peak = 0
+        self.lock = threading.Lock()
+
+    def chunks(self):
+        for start in range(0, len(self.texts), self.chunk_size):
+            time.sleep(self.read_s)
+            with self.lock:
+                self.alive += 1
+                self.peak = max(self.peak, self.alive)
+            yield self.texts[start:start + self.chunk_size]
+
+    def process(self, chunk):
+        return self.scorer(chunk)
+
+    def write(self, results):
+        time.sleep(self.write_s)
+        with self.lock:
+            self.alive -= 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--read-ms", type=float, default=40)
+    parser.add_argument("--write-ms", type=float, default=60)
+    parser.add_argument("--depth", type=int, default=QUEUE_DEPTH)
+    parser.add_argument("--workers", type=int, default=None, help="VADER processes (default: one per core)")
+    args = parser.parse_args()
+
+    texts = synthetic_reviews(args.rows)["review"].tolist()
+    print(f"rows: {len(texts):,}  chunks: {-(-len(texts) // args.chunk_size)}  "
+          f"read/write latency: {args.read_ms:.0f}/{args.write_ms:.0f} ms per chunk")
+    with VaderScorer(args.workers) as scorer:
+        scorer(texts[:1])   # start the pool outside the timing
+        for name in ("sequential", "overlapped"):
+            stages = Stages(texts, args.chunk_size, args.read_ms / 1000, args.write_ms / 1000, scorer)
+            start = time.perf_counter()
+            if name == "sequential":
+                for chunk in stages.chunks():
+                    stages.write(stages.process(chunk))
+            else:
+                run_overlapped(stages.chunks(), stages.process, stages.write, args.depth)
+            seconds = time.perf_counter() - start
+            print(f"{name:<11} {seconds:7.2f}s ({len(texts) / seconds:>9,.0f} rows/s)  "
+                  f"peak chunks alive: {stages.peak}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+bench_preprocess.py
+-------------------
+Benchmarks the text/bank cleaning in preprocess.py on synthetic raw
+reviews (10k / 100k / 1M rows) against the original per-row .apply()
+implementation, and checks the outputs are identical.
+
+Run from the repo root:
+    python benchmarks/bench_preprocess.py [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from preprocess import clean_text, map_unique, standardize_bank_name  # noqa: E402
+from synthetic import synthetic_reviews  # noqa: E402
+
+BANK_VARIANTS = ["Commercial Bank of Ethiopia", "CBE", "Bank of Abyssinia", "BOA Mobile", "Dashen Bank", "dashen"]
+
+
+def legacy_clean_text(text):
+    """clean_text as it was before vectorization (re.sub with pattern strings)."""
+    if not isinstance(text, str):
+        return ""
+    text = text.lower()
+    text = re.sub(r"http\S+|www\S+", "", text)
+    text = re.sub(r"[^a-z0-9.,!? ]", " ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip()
+
+
+def bench(n):
+    df = synthetic_reviews(n)
+    # Raw bank spellings, for standardize_bank_name to map
+    df["bank"] = np.array(BANK_VARIANTS, dtype=object)[np.random.default_rng(0).integers(0, len(BANK_VARIANTS), n)]
+
+    start = time.perf_counter()
+    legacy_review = df["review"].apply(legacy_clean_text)
+    legacy_bank = df["bank"].apply(standardize_bank_name)
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    review = map_unique(df["review"], clean_text)
+    bank = map_unique(df["bank"], standardize_bank_name)
+    vectorized_s = time.perf_counter() - start
+
+    identical = review.equals(legacy_review) and bank.equals(legacy_bank)
+    print(f"{n:>9,} rows | apply {legacy_s:7.2f}s | vectorized {vectorized_s:7.2f}s | "
+          f"speedup {legacy_s / vectorized_s:5.1f}x | identical {identical}")
+    return identical
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    if not all([bench(n) for n in args.sizes]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
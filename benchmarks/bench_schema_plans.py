@@ -0,0 +1,185 @@
+"""
+bench_schema_plans.py
+---------------------
+Shows query plans and timings for our access paths on the reviews schema
+before and after the migrations in sql/migrations, on a synthetic
+multi-million-row dataset.
+
+Two schemas are built in the target database (and dropped afterwards
+unless --keep):
+    bench_before  migration 0001 only: the old unindexed, unpartitioned,
+                  free-text reviews table
+    bench_after   every migration: enums, yearly partitions, composite
+                  indexes and the per-bank rollup
+Both get the same rows (generated server-side, seeded), are VACUUM
+ANALYZEd, and each query is run --repeat times with EXPLAIN ANALYZE; the
+best time and the scan nodes used are printed side by side.
+
+Run from the repo root (needs PostgreSQL 15+; uses config.yaml unless --dsn):
+    python benchmarks/bench_schema_plans.py [--rows 2000000] [--banks 50] [--show-plans]
+"""
+
+import argparse
+import os
+import re
+import sys
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from db import connect  # noqa: E402
+from migrate import migrate_cursor  # noqa: E402
+
+SCHEMAS = ("bench_before", "bench_after")
+FIRST_YEAR = 2016
+LAST_YEAR = 2025
+BANK = 2
+
+# name -> SQL, or (SQL before, SQL after) when the schemas answer it differently
+QUERIES = {
+    "bank, one month": f"""
+        SELECT count(*), avg(rating) FROM reviews
+        WHERE bank_id = {BANK} AND review_date >= DATE '{LAST_YEAR}-03-01'
+          AND review_date < DATE '{LAST_YEAR}-04-01'""",
+    "bank, label count": f"""
+        SELECT count(*) FROM reviews
+        WHERE bank_id = {BANK} AND sentiment_label = 'negative'""",
+    "bank, label sample": f"""
+        SELECT review_text FROM reviews
+        WHERE bank_id = {BANK} AND sentiment_label = 'negative' LIMIT 5""",
+    "all banks, one week": f"""
+        SELECT bank_id, count(*) FROM reviews
+        WHERE review_date >= DATE '{LAST_YEAR}-03-01' AND review_date < DATE '{LAST_YEAR}-03-08'
+        GROUP BY bank_id""",
+    "keyset page": """
+        SELECT review_id, review_text FROM reviews
+        WHERE review_id > {middle_id} ORDER BY review_id LIMIT 1000""",
+    "per-bank report": (
+        """SELECT bank_id, count(*), avg(rating), avg(sentiment_score),
+                  count(*) FILTER (WHERE sentiment_label = 'negative')
+           FROM reviews GROUP BY bank_id""",
+        "SELECT * FROM bank_review_summary",
+    ),
+}
+
+GENERATE_SQL = """
+    SELECT setseed(0.42);
+    INSERT INTO banks (bank_name, app_name)
+    SELECT 'Synthetic Bank ' || b, 'Synthetic App ' || b FROM generate_series(1, %(banks)s) b
+    ON CONFLICT (bank_name) DO NOTHING;
+    INSERT INTO reviews (review_id, bank_id, review_text, rating, review_date,
+                         sentiment_label, sentiment_score, source, review_key)
+    SELECT i,
+           1 + floor(random() * %(banks)s)::INT,
+           'review ' || i || ' ' || md5(i::TEXT),
+           1 + floor(random() * 5)::INT,
+           DATE %(first_day)s + floor(random() * %(days)s)::INT,
+           (ARRAY['positive', 'neutral', 'negative'])[1 + floor(random() * 3)::INT],
+           random() * 2 - 1,
+           'Google Play',
+           md5(i::TEXT)
+    FROM generate_series(1, %(rows)s) i;
+"""
+
+COPY_SQL = """
+    SELECT create_review_partitions(MIN(review_date), MAX(review_date)) FROM bench_before.reviews;
+    INSERT INTO banks SELECT * FROM bench_before.banks ON CONFLICT DO NOTHING;
+    INSERT INTO reviews (review_id, bank_id, review_text, rating, review_date,
+                         sentiment_label, sentiment_score, source, review_key)
+    SELECT review_id, bank_id, review_text, rating, review_date,
+           sentiment_label::review_sentiment, sentiment_score, source::review_source, review_key
+    FROM bench_before.reviews;
+"""
+
+
+def build(conn, rows, banks):
+    cur = conn.cursor()
+    for schema in SCHEMAS:
+        cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}; SET search_path TO {schema}")
+        migrate_cursor(cur, target=1 if schema == "bench_before" else None)
+        conn.commit()
+    print(f"Generating {rows:,} reviews for {banks} banks ...")
+    cur.execute("SET search_path TO bench_before")
+    cur.execute(GENERATE_SQL, {
+        "rows": rows, "banks": banks, "first_day": f"{FIRST_YEAR}-01-01",
+        "days": (LAST_YEAR - FIRST_YEAR + 1) * 365,
+    })
+    conn.commit()
+    print("Copying them into the migrated schema ...")
+    cur.execute("SET search_path TO bench_after")
+    cur.execute(COPY_SQL)
+    conn.commit()
+    conn.autocommit = True
+    for schema in SCHEMAS:
+        cur.execute(f"SET search_path TO {schema}")
+        cur.execute("VACUUM ANALYZE reviews")    # one statement per call: VACUUM can't run in a block
+        cur.execute("VACUUM ANALYZE banks")
+    conn.autocommit = False
+    cur.close()
+
+
+def explain(cur, sql, repeat):
+    """(best execution ms, scan nodes, full plan text) of EXPLAIN ANALYZE runs."""
+    best, plan = None, None
+    for _ in range(repeat):
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}")
+        lines = [row[0] for row in cur.fetchall()]
+        ms = float(re.search(r"Execution Time: ([\d.]+) ms", lines[-1]).group(1))
+        if best is None or ms < best:
+            best, plan = ms, lines
+    scans = []
+    for line in plan:
+        match = re.search(r"((?:Parallel )?(?:Seq|Index Only|Index|Bitmap Heap|Bitmap Index) Scan)(?: using (\S+))? on (\S+)", line)
+        if match:
+            scans.append(f"{match.group(1)}" + (f" ({match.group(2)})" if match.group(2) else ""))
+    distinct = sorted(set(scans), key=scans.index)
+    summary = ", ".join(distinct[:2]) + (f" +{len(distinct) - 2}" if len(distinct) > 2 else "")
+    partitions = len({re.search(r" on (\S+)", l).group(1) for l in plan if " on " in l and "Scan" in l})
+    return best, f"{summary} [{partitions} rel]", "\n".join(plan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--banks", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dsn", help="libpq connection string (default: config.yaml)")
+    parser.add_argument("--reuse", action="store_true", help="Reuse the schemas from a previous --keep run")
+    parser.add_argument("--keep", action="store_true", help="Don't drop the benchmark schemas")
+    parser.add_argument("--show-plans", action="store_true")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn) if args.dsn else connect()
+    try:
+        if not args.reuse:
+            build(conn, args.rows, args.banks)
+        cur = conn.cursor()
+        cur.execute("SELECT percentile_disc(0.5) WITHIN GROUP (ORDER BY review_id) FROM bench_before.reviews")
+        middle_id = cur.fetchone()[0]
+        conn.commit()
+
+        print(f"\n{'query':<22} {'before ms':>10} {'after ms':>10} {'speedup':>8}   plan before -> after")
+        for name, sql in QUERIES.items():
+            before_sql, after_sql = sql if isinstance(sql, tuple) else (sql, sql)
+            results = []
+            for schema, query in zip(SCHEMAS, (before_sql, after_sql)):
+                cur.execute(f"SET search_path TO {schema}")
+                results.append(explain(cur, query.format(middle_id=middle_id), args.repeat))
+            (before_ms, before_scan, before_plan), (after_ms, after_scan, after_plan) = results
+            print(f"{name:<22} {before_ms:>10.2f} {after_ms:>10.2f} {before_ms / after_ms:>7.1f}x"
+                  f"   {before_scan} -> {after_scan}")
+            if args.show_plans:
+                print(f"\n--- before ---\n{before_plan}\n--- after ---\n{after_plan}\n")
+        conn.commit()
+        cur.close()
+    finally:
+        if not args.keep:
+            conn.rollback()
+            conn.cursor().execute(f"DROP SCHEMA IF EXISTS {', '.join(SCHEMAS)} CASCADE")
+            conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+bench_startup.py
+----------------
+Measures how long the analysis scripts take to start:
+
+- import time of each script module, in a fresh interpreter (median of --repeat runs)
+- time to first result for one review (sentiment + keywords), either cold
+  (a fresh process that loads the models itself) or warm (a client of a
+  model_server.py that already has them loaded)
+
+Run from the repo root:
+    python benchmarks/bench_startup.py [--repeat 5] [--skip-models]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+sys.path.insert(0, SCRIPTS)
+
+from model_server import ModelClient  # noqa: E402
+
+MODULES = [
+    "task_2_sentiment_thematic_analysis",
+    "task_4_analysis",
+    "task_2_analysis",
+    "pipeline",
+]
+SAMPLE = "The app keeps crashing after login, please fix the transfer page."
+SERVER_ADDRESS = "localhost:6011"
+
+IMPORT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {scripts!r})
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+COLD_SNIPPET = """
+import sys
+sys.path.insert(0, {scripts!r})
+import task_2_sentiment_thematic_analysis as task_2
+task_2.analyze_sentiment({sample!r})
+task_2.extract_keywords({sample!r})
+"""
+
+
+def _python(code):
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                          capture_output=True, text=True)
+
+
+def import_seconds(module, repeat):
+    runs = [float(_python(IMPORT_SNIPPET.format(scripts=SCRIPTS, module=module)).stdout)
+            for _ in range(repeat)]
+    return statistics.median(runs)
+
+
+def cold_first_result():
+    start = time.perf_counter()
+    _python(COLD_SNIPPET.format(scripts=SCRIPTS, sample=SAMPLE))
+    return time.perf_counter() - start
+
+
+def warm_first_result(repeat):
+    """Start a preloaded model server, then time a fresh client's first request."""
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPTS, "model_server.py"), "--preload",
+         "--address", SERVER_ADDRESS], cwd=ROOT
+    )
+    try:
+        deadline = time.monotonic() + 300
+        while True:
+            try:
+                ModelClient(SERVER_ADDRESS).close()
+                break
+            except (OSError, RuntimeError):     # not listening yet, or no key written yet
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("model server did not start")
+                time.sleep(0.5)
+
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with ModelClient(SERVER_ADDRESS) as client:
+                client.sentiment([SAMPLE])
+                client.keywords([SAMPLE])
+            runs.append(time.perf_counter() - start)
+        with ModelClient(SERVER_ADDRESS) as client:
+            client.shutdown()
+        return statistics.median(runs)
+    finally:
+        if server.poll() is None:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-models", action="store_true",
+                        help="Only measure import times (no transformers/spaCy needed)")
+    args = parser.parse_args()
+
+    print("import time (median, fresh interpreter):")
+    for module in MODULES:
+        print(f"  {module:<38}{import_seconds(module, args.repeat) * 1000:>9.0f} ms")
+
+    if args.skip_models:
+        return
+    cold = cold_first_result()
+    warm = warm_first_result(args.repeat)
+    print("time to first result (1 review, sentiment + keywords):")
+    print(f"  cold process:                        {cold:>9.2f} s")
+    print(f"  warm model server:                   {warm:>9.2f} s")
+    print(f"  speedup:                             {cold / warm:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+bench_tfidf_themes.py
+---------------------
+Compares the old per-bank TF-IDF loop in task_2_analysis.extract_themes
+(one transform and one full sort per bank) with keyword_index.KeywordIndex
+(one transform, one sparse group-indicator product, argpartition top-k)
+on synthetic reviews spread over --groups apps, and checks that both give
+every group the same top keyword scores.
+
+Run from the repo root:
+    python benchmarks/bench_tfidf_themes.py [--rows 50000] [--groups 3 100 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from keyword_index import TOP_K, KeywordIndex  # noqa: E402
+from task_2_analysis import clean_for_tfidf  # noqa: E402
+from synthetic import synthetic_reviews  # noqa: E402
+
+
+def legacy_top_scores(df):
+    tfidf = TfidfVectorizer(stop_words='english', ngram_range=(1, 2), max_features=100)
+    tfidf.fit(df['text'])
+    out = {}
+    for group in df['group'].unique():
+        X = tfidf.transform(df[df['group'] == group]['text'])
+        scores = X.sum(axis=0).A1
+        out[group] = scores[scores.argsort()[::-1][:TOP_K]]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--groups", type=int, nargs="+", default=[3, 100, 2000])
+    args = parser.parse_args()
+
+    df = synthetic_reviews(args.rows).rename(columns={"review": "text"})
+    df["text"] = clean_for_tfidf(df["text"])
+    rng = np.random.default_rng(0)
+    ok = True
+    print(f"rows: {len(df):,}")
+    for groups in args.groups:
+        df["group"] = rng.integers(0, groups, len(df))
+
+        start = time.perf_counter()
+        legacy = legacy_top_scores(df)
+        legacy_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = KeywordIndex().fit(df["text"], df["group"])
+        top = index.top_keywords(TOP_K)
+        new_s = time.perf_counter() - start
+
+        vocabulary = {name: i for i, name in enumerate(index.vocabulary)}
+        same = all(
+            np.allclose(index.sums[row][[vocabulary[kw] for kw in top[group]]], legacy[group])
+            for row, group in enumerate(index.groups)
+        )
+        ok &= same
+        print(f"{groups:>5} groups: per-group loop {legacy_s:7.2f}s  sparse product {new_s:7.2f}s  "
+              f"speedup {legacy_s / new_s:5.1f}x  same scores: {same}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
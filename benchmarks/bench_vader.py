@@ -0,0 +1,61 @@
+"""
+bench_vader.py
+--------------
+Benchmarks column-wise VADER scoring (vader_scoring.VaderScorer: dedupe +
+process pool) against the original per-row get_sentiment via .apply() on
+a synthetic review column, for increasing worker counts, and checks that
+every variant produces the same labels and scores.
+
+Run from the repo root:
+    python benchmarks/bench_vader.py [--rows 100000] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from vader_scoring import VaderScorer, get_sentiment  # noqa: E402
+from synthetic import synthetic_reviews  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--skip-legacy", action="store_true", help="Don't time the per-row baseline")
+    args = parser.parse_args()
+
+    texts = synthetic_reviews(args.rows, duplicate_rate=args.duplicate_rate)["review"]
+    print(f"rows: {len(texts):,}  unique: {texts.nunique():,}  cores: {os.cpu_count()}")
+
+    reference = VaderScorer(workers=0).compounds(texts)
+    if not args.skip_legacy:
+        start = time.perf_counter()
+        legacy = np.array([score for _, score in texts.apply(get_sentiment)], dtype=float)
+        legacy_s = time.perf_counter() - start
+        print(f"per-row apply:        {legacy_s:8.2f}s ({len(texts) / legacy_s:>10,.0f} rows/s)")
+        assert np.array_equal(legacy, reference)
+
+    ok = True
+    for workers in sorted(set(args.workers)):
+        with VaderScorer(workers, min_parallel=0) as scorer:
+            scorer.compounds(texts[:1])   # start the pool outside the timing
+            start = time.perf_counter()
+            scores = scorer.compounds(texts)
+            seconds = time.perf_counter() - start
+        same = np.array_equal(scores, reference)
+        ok &= same
+        print(f"dedupe + {workers:>2} workers:  {seconds:8.2f}s ({len(texts) / seconds:>10,.0f} rows/s)"
+              f"  identical: {same}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+load_test_service.py
+--------------------
+Load-tests sentiment_service.py and shows how the micro-batching window
+trades latency for batch size and throughput.
+
+For every window, a fresh service is started in this process (VADER by
+default, so it runs offline) and --clients threads each send --requests
+single-review POST /score requests back to back. Client-side latency
+percentiles and throughput are printed next to the service's own metrics.
+
+Run from the repo root:
+    python benchmarks/load_test_service.py [--windows-ms 0 1 5 10 20] [--clients 32]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from batch_inference import percentile  # noqa: E402
+import sentiment_service  # noqa: E402
+
+INPUT_FILE = "data/cleaned_reviews.csv"
+
+
+def client(url, texts, latencies, lock):
+    for text in texts:
+        body = json.dumps({"text": text}).encode()
+        start = time.perf_counter()
+        with urllib.request.urlopen(urllib.request.Request(url, data=body), timeout=60) as response:
+            response.read()
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+
+def run(scorer, window_ms, texts, clients, requests):
+    service = sentiment_service.SentimentService(
+        {"vader": scorer}, port=0, window=window_ms / 1000
+    )
+    service.start()
+    latencies, lock = [], threading.Lock()
+    threads = [
+        threading.Thread(target=client, args=(
+            f"{service.url}/score",
+            [texts[(c * requests + i) % len(texts)] for i in range(requests)],
+            latencies, lock
+        ))
+        for c in range(clients)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    metrics = service.metrics()["vader"]
+    service.close()
+    return {
+        "window_ms": window_ms,
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_batch": metrics["mean_batch_size"],
+        "batches": metrics["batches"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--windows-ms", type=float, nargs="+", default=[0, 1, 2, 5, 10, 20])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per client")
+    parser.add_argument("--model", choices=["vader", "distilbert"], default="vader")
+    parser.add_argument("--input", default=INPUT_FILE)
+    args = parser.parse_args()
+
+    texts = pd.read_csv(args.input)["review"].astype(str).tolist()
+    scorer = sentiment_service.vader_scorer() if args.model == "vader" else sentiment_service.distilbert_scorer()
+    scorer(texts[:1])   # load the model before timing
+
+    print(f"{args.clients} clients x {args.requests} requests, model={args.model}")
+    print(f"{'window':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'batch':>7} {'batches':>8}")
+    for window in args.windows_ms:
+        r = run(scorer, window, texts, args.clients, args.requests)
+        print(f"{r['window_ms']:>6.1f}ms {r['requests_per_sec']:>9,.0f} {r['p50_ms']:>8.2f} "
+              f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['mean_batch']:>7.1f} {r['batches']:>8}")
+
+
+if __name__ == "__main__":
+    main()
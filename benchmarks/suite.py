@@ -0,0 +1,453 @@
+"""
+suite.py
+--------
+Benchmarks every pipeline stage on the same synthetic reviews
+(synthetic.py) and keeps the results per commit, so a change can be
+checked for regressions.
+
+    clean_text          preprocess.clean_text on every raw text
+    preprocess_reviews  preprocess.preprocess_reviews, raw CSV -> cleaned Parquet
+    get_sentiment       vader_scoring.get_sentiment on every cleaned text
+    extract_keywords    spaCy noun chunks, one text at a time (--nlp-rows texts)
+    extract_keywords_batch  the same through nlp.pipe, as process_reviews runs it
+    assign_theme        theme_matcher on keyword strings
+    tfidf_themes        task_2_analysis.extract_themes (per-bank TF-IDF) from a database
+    db_load             insert_reviews.load_reviews into PostgreSQL
+    db_writeback        sentiment_writeback.write_sentiment of one score per review
+
+tfidf_themes reads from an in-memory SQLite database. db_load and
+db_writeback need PostgreSQL (--postgres, config.yaml or --dsn): they run
+in a scratch schema, bench_suite, that is dropped afterwards. Without
+--postgres they run on SQLite as a stand-in (executemany INSERT, and a
+staging table plus UPDATE ... FROM), which measures the same shape of
+work but not our COPY path, so they are reported as db_load[sqlite] and
+db_writeback[sqlite]. Stages whose dependencies are missing (the spaCy
+model, say) are reported as skipped.
+
+Each stage is timed --repeat times and its best time kept. With --save
+the results go to benchmarks/results/<commit>.json ("-dirty" if the tree
+has uncommitted changes); compare flags every stage that got slower by
+more than --tolerance between two saved runs (and exits with 1 if any did).
+
+Run from the repo root:
+    python benchmarks/suite.py run [--rows 20000] [--duplicate-rate 0.5] [--text-length 40] [--banks 3] [--save]
+    python benchmarks/suite.py run --only clean_text get_sentiment --postgres
+    python benchmarks/suite.py compare <base commit or file> [<head commit or file>] [--tolerance 0.1]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from synthetic import synthetic_reviews  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+TOLERANCE = 0.10
+SCHEMA = "bench_suite"
+
+
+class Skip(Exception):
+    """A stage that can't run here (missing dependency or server)."""
+
+
+def best_of(repeat, body, setup=None):
+    """Best wall time of body() over repeat runs, calling setup() untimed before each."""
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        body()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+# -------------------------
+# Stages
+# -------------------------
+# Each takes the benchmark context and returns (rows, seconds).
+def bench_clean_text(ctx):
+    from preprocess import clean_text
+    texts = ctx.raw["review"].tolist()
+    return len(texts), best_of(ctx.repeat, lambda: [clean_text(t) for t in texts])
+
+
+def bench_preprocess_reviews(ctx):
+    from preprocess import preprocess_reviews
+    raw_file = os.path.join(ctx.tmp, "raw.csv")
+    ctx.raw.to_csv(raw_file, index=False)
+    output = os.path.join(ctx.tmp, "cleaned.parquet")
+    return len(ctx.raw), best_of(ctx.repeat, lambda: preprocess_reviews(raw_file, output))
+
+
+def bench_get_sentiment(ctx):
+    try:
+        from vader_scoring import get_sentiment
+        get_sentiment("warm up")
+    except ImportError as e:
+        raise Skip(e)
+    texts = ctx.cleaned()
+    return len(texts), best_of(ctx.repeat, lambda: [get_sentiment(t) for t in texts])
+
+
+def _nlp():
+    try:
+        from task_2_sentiment_thematic_analysis import get_nlp
+        get_nlp()
+    except (ImportError, OSError) as e:
+        raise Skip(e)
+
+
+def bench_extract_keywords(ctx):
+    _nlp()
+    from task_2_sentiment_thematic_analysis import extract_keywords
+    texts = ctx.cleaned()[:ctx.nlp_rows]
+    return len(texts), best_of(ctx.repeat, lambda: [extract_keywords(t) for t in texts])
+
+
+def bench_extract_keywords_batch(ctx):
+    _nlp()
+    from task_2_sentiment_thematic_analysis import extract_keywords_batch
+    texts = ctx.cleaned()[:ctx.nlp_rows]
+    return len(texts), best_of(ctx.repeat, lambda: list(extract_keywords_batch(texts)))
+
+
+def bench_assign_theme(ctx):
+    from task_2_sentiment_thematic_analysis import assign_theme
+    assign_theme("warm up")       # compile the taxonomy outside the timing
+    # Noun-chunk-like keyword strings: the text's words in pairs
+    keywords = []
+    for text in ctx.cleaned():
+        words = text.split()
+        keywords.append(", ".join(" ".join(words[i:i + 2]) for i in range(0, len(words), 2)))
+    return len(keywords), best_of(ctx.repeat, lambda: [assign_theme(k) for k in keywords])
+
+
+def bench_tfidf_themes(ctx):
+    from db import SQLiteDatabase
+    from task_2_analysis import extract_themes
+    database = SQLiteDatabase()
+    try:
+        with database.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("CREATE TABLE reviews (review_id INTEGER PRIMARY KEY, bank_id INTEGER, review_text TEXT)")
+            banks = {name: i for i, name in enumerate(ctx.raw["bank"].unique(), start=1)}
+            cur.executemany("INSERT INTO reviews VALUES (%s, %s, %s)", [
+                (i, banks[bank], text) for i, (bank, text) in enumerate(zip(ctx.raw["bank"], ctx.cleaned()), start=1)
+            ])
+        index_file = os.path.join(ctx.tmp, "keyword_index.npz")
+        return len(ctx.raw), best_of(ctx.repeat, lambda: extract_themes(database, index_file=index_file))
+    finally:
+        database.close()
+
+
+def _cleaned_frame(ctx):
+    from preprocess import clean_reviews
+    return clean_reviews(ctx.raw.copy(), verbose=False).reset_index(drop=True)
+
+
+def _postgres(ctx):
+    try:
+        import psycopg2
+        from db import connect
+        conn = psycopg2.connect(ctx.dsn) if ctx.dsn else connect()
+    except Exception as e:
+        raise Skip(f"no PostgreSQL: {e}")
+    from migrate import migrate_cursor
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; SET search_path TO {SCHEMA}")
+    migrate_cursor(cur)
+    conn.commit()
+    cur.close()
+    return conn
+
+
+def _drop_schema(conn):
+    conn.rollback()
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    conn.commit()
+    conn.close()
+
+
+def bench_db_load(ctx):
+    if not ctx.postgres:
+        return _sqlite_load(ctx)
+    from insert_reviews import load_reviews
+    df = _cleaned_frame(ctx)
+    conn = _postgres(ctx)
+    try:
+        def empty():
+            cur = conn.cursor()
+            cur.execute("TRUNCATE reviews")
+            conn.commit()
+        return len(df), best_of(ctx.repeat, lambda: load_reviews(conn, df), setup=empty)
+    finally:
+        _drop_schema(conn)
+
+
+def bench_db_writeback(ctx):
+    if not ctx.postgres:
+        return _sqlite_writeback(ctx)
+    from insert_reviews import load_reviews
+    from sentiment_writeback import write_sentiment
+    df = _cleaned_frame(ctx)
+    conn = _postgres(ctx)
+    try:
+        load_reviews(conn, df)
+        cur = conn.cursor()
+        cur.execute("SELECT review_id FROM reviews")
+        ids = [row[0] for row in cur.fetchall()]
+        conn.commit()
+        cur.close()
+        results = [(review_id, ("positive", "neutral", "negative")[i % 3], (i % 200) / 100 - 1)
+                   for i, review_id in enumerate(ids)]
+        return len(results), best_of(ctx.repeat, lambda: write_sentiment(conn, results))
+    finally:
+        _drop_schema(conn)
+
+
+SQLITE_SCHEMA = """
+    CREATE TABLE reviews (
+        review_id INTEGER PRIMARY KEY, bank TEXT, review_text TEXT, rating INTEGER,
+        review_date TEXT, source TEXT, sentiment_label TEXT, sentiment_score REAL
+    )
+"""
+
+
+def _sqlite_rows(ctx):
+    df = _cleaned_frame(ctx)
+    return list(zip(df["bank"], df["review"], df["rating"].astype(int).tolist(), df["date"], df["source"]))
+
+
+def _sqlite_insert(database, rows):
+    with database.connection() as conn:
+        conn.cursor().executemany(
+            "INSERT INTO reviews (bank, review_text, rating, review_date, source) VALUES (%s, %s, %s, %s, %s)", rows
+        )
+
+
+def _sqlite_load(ctx):
+    from db import SQLiteDatabase
+    rows = _sqlite_rows(ctx)
+    database = SQLiteDatabase()
+
+    def empty():
+        with database.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("DROP TABLE IF EXISTS reviews")
+            cur.execute(SQLITE_SCHEMA)
+    try:
+        return len(rows), best_of(ctx.repeat, lambda: _sqlite_insert(database, rows), setup=empty)
+    finally:
+        database.close()
+
+
+def _sqlite_writeback(ctx):
+    from db import SQLiteDatabase
+    rows = _sqlite_rows(ctx)
+    results = [(i, ("positive", "neutral", "negative")[i % 3], (i % 200) / 100 - 1)
+               for i in range(1, len(rows) + 1)]
+    database = SQLiteDatabase()
+    with database.connection() as conn:
+        conn.cursor().execute(SQLITE_SCHEMA)
+    _sqlite_insert(database, rows)
+
+    def write():
+        with database.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("CREATE TEMP TABLE IF NOT EXISTS sentiment_staging "
+                        "(review_id INTEGER PRIMARY KEY, sentiment_label TEXT, sentiment_score REAL)")
+            cur.execute("DELETE FROM sentiment_staging")
+            cur.executemany("INSERT INTO sentiment_staging VALUES (%s, %s, %s)", results)
+            cur.execute("""
+                UPDATE reviews AS r
+                SET sentiment_label = s.sentiment_label, sentiment_score = s.sentiment_score
+                FROM sentiment_staging AS s
+                WHERE r.review_id = s.review_id
+            """)
+    try:
+        return len(results), best_of(ctx.repeat, write)
+    finally:
+        database.close()
+
+
+STAGES = {
+    "clean_text": bench_clean_text,
+    "preprocess_reviews": bench_preprocess_reviews,
+    "get_sentiment": bench_get_sentiment,
+    "extract_keywords": bench_extract_keywords,
+    "extract_keywords_batch": bench_extract_keywords_batch,
+    "assign_theme": bench_assign_theme,
+    "tfidf_themes": bench_tfidf_themes,
+    "db_load": bench_db_load,
+    "db_writeback": bench_db_writeback,
+}
+
+
+class Context:
+    """The synthetic data and options every stage gets."""
+
+    def __init__(self, args, tmp):
+        self.raw = synthetic_reviews(args.rows, duplicate_rate=args.duplicate_rate,
+                                     text_length=args.text_length, banks=args.banks, seed=args.seed)
+        self.repeat = args.repeat
+        self.nlp_rows = args.nlp_rows
+        self.postgres = args.postgres or bool(args.dsn)
+        self.dsn = args.dsn
+        self.tmp = tmp
+        self._cleaned = None
+
+    def cleaned(self):
+        if self._cleaned is None:
+            from preprocess import clean_text, map_unique
+            self._cleaned = map_unique(self.raw["review"], clean_text).tolist()
+        return self._cleaned
+
+
+# -------------------------
+# Results
+# -------------------------
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def current_commit():
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    dirty = _git("status", "--porcelain", "--untracked-files=no")
+    return f"{commit}-dirty" if dirty else commit
+
+
+def results_path(name):
+    """A results file: a path as given, else benchmarks/results/<name>.json."""
+    if os.path.exists(name):
+        return name
+    return os.path.join(RESULTS_DIR, f"{name}.json")
+
+
+def run(args):
+    params = {"rows": args.rows, "duplicate_rate": args.duplicate_rate, "text_length": args.text_length,
+              "banks": args.banks, "seed": args.seed, "repeat": args.repeat, "nlp_rows": args.nlp_rows}
+    report = {
+        "commit": current_commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} cores",
+        "params": params,
+        "results": {},
+        "skipped": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = Context(args, tmp)
+        print(f"{len(ctx.raw):,} rows, {ctx.raw['review'].nunique():,} distinct texts, "
+              f"{args.banks} banks (commit {report['commit']})\n")
+        print(f"{'stage':<26}{'rows':>10}{'seconds':>10}{'rows/s':>14}")
+        for name in args.only or STAGES:
+            label = name if ctx.postgres or not name.startswith("db_") else f"{name}[sqlite]"
+            try:
+                rows, seconds = STAGES[name](ctx)
+            except Skip as e:
+                report["skipped"][label] = str(e)
+                print(f"{label:<26}  skipped: {e}")
+                continue
+            report["results"][label] = {
+                "rows": rows, "seconds": round(seconds, 4),
+                "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+            }
+            print(f"{label:<26}{rows:>10,}{seconds:>10.3f}{rows / seconds:>14,.0f}")
+
+    if args.save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = results_path(report["commit"])
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved to {os.path.relpath(path, ROOT)}")
+    return report
+
+
+def compare(base, head, tolerance=TOLERANCE):
+    """
+    Lines comparing two reports stage by stage, and whether any stage got
+    slower than base by more than tolerance (a fraction of base's time).
+    """
+    lines = []
+    if base["params"] != head["params"]:
+        lines.append(f"warning: different parameters\n  base {base['params']}\n  head {head['params']}")
+    lines.append(f"{'stage':<26}{base['commit']:>14}{head['commit']:>14}{'change':>9}")
+    regressed = False
+    for name, result in head["results"].items():
+        before = base["results"].get(name)
+        if before is None:
+            lines.append(f"{name:<26}{'-':>14}{result['seconds']:>13.3f}s     new")
+            continue
+        change = result["seconds"] / before["seconds"] - 1 if before["seconds"] else 0.0
+        flag = ""
+        if change > tolerance:
+            flag, regressed = "  REGRESSION", True
+        elif change < -tolerance:
+            flag = "  faster"
+        lines.append(f"{name:<26}{before['seconds']:>13.3f}s{result['seconds']:>13.3f}s{change:>+9.1%}{flag}")
+    for name in base["results"].keys() - head["results"].keys():
+        lines.append(f"{name:<26}{base['results'][name]['seconds']:>13.3f}s{'-':>14}  not run")
+    return lines, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--rows", type=int, default=20_000)
+    run_parser.add_argument("--duplicate-rate", type=float, default=0.5,
+                            help="Fraction of rows repeating another row's text")
+    run_parser.add_argument("--text-length", type=int, default=None,
+                            help="Words per review (default: the bundled reviews' own lengths)")
+    run_parser.add_argument("--banks", type=int, default=3)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--nlp-rows", type=int, default=2000, help="Texts for the spaCy stages")
+    run_parser.add_argument("--only", nargs="+", choices=list(STAGES), metavar="STAGE",
+                            help=f"Stages to run ({', '.join(STAGES)})")
+    run_parser.add_argument("--postgres", action="store_true",
+                            help="Run the db stages on PostgreSQL (config.yaml) instead of SQLite")
+    run_parser.add_argument("--dsn", help="libpq connection string for the db stages (implies --postgres)")
+    run_parser.add_argument("--save", action="store_true", help="Save the results for this commit")
+
+    compare_parser = commands.add_parser("compare", help="Compare two saved runs")
+    compare_parser.add_argument("base", help="Commit (as saved) or results file")
+    compare_parser.add_argument("head", nargs="?", help="Commit or results file (default: the current commit)")
+    compare_parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                                help="Slowdown flagged as a regression (fraction; default 0.1)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run(args)
+        return
+
+    reports = []
+    for name in (args.base, args.head or current_commit()):
+        path = results_path(name)
+        if not os.path.exists(path):
+            parser.error(f"no saved results for {name} ({os.path.relpath(path, ROOT)}); run with --save first")
+        with open(path) as f:
+            reports.append(json.load(f))
+    lines, regressed = compare(*reports, tolerance=args.tolerance)
+    print("\n".join(lines))
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+synthetic.py
+------------
+Deterministic synthetic raw reviews for the benchmarks, shaped like
+data/raw/reviews.csv (review, rating, date, bank, source).
+
+Texts are built from the bundled scrape so they read like real reviews
+(VADER, spaCy and TF-IDF see the same vocabulary and grammar):
+- every distinct ("fresh") text is one or more bundled reviews joined
+  together and cut to text_length words (default: one bundled review as
+  it is), plus a short tag that makes it unique
+- duplicate_rate of the rows repeat a fresh text exactly, like the
+  "good app" / "thank you" reviews that dominate real scrapes
+- noise_rate of the fresh texts get an emoji and a URL for clean_text to strip
+- ratings follow the bundled rating distribution, dates are spread over
+  the year up to the newest bundled date, and rows are spread evenly over
+  `banks` banks (the three real ones first, then "Synthetic Bank <n>")
+
+The same arguments always give the same frame.
+"""
+
+import numpy as np
+import pandas as pd
+
+RAW_FILE = "data/raw/reviews.csv"
+BANKS = ["Commercial Bank of Ethiopia", "Bank of Abyssinia", "Dashen Bank"]
+NOISE = " 👍 https://t.co/x"
+DAYS = 365
+
+
+def bank_names(count):
+    return BANKS[:count] + [f"Synthetic Bank {i}" for i in range(len(BANKS) + 1, count + 1)]
+
+
+def _bundled(path):
+    raw = pd.read_csv(path)
+    raw = raw.dropna(subset=["review"])
+    return raw["review"].to_numpy(dtype=object), raw["rating"].to_numpy(), pd.to_datetime(raw["date"]).max()
+
+
+def synthetic_reviews(rows, duplicate_rate=0.5, text_length=None, banks=3, seed=0,
+                      noise_rate=0.2, source=RAW_FILE):
+    """rows raw reviews; see the module docstring for the parameters."""
+    rng = np.random.default_rng(seed)
+    base, ratings, newest = _bundled(source)
+    base_words = np.fromiter((len(t.split()) for t in base), dtype=np.int64, count=len(base))
+
+    fresh = max(1, rows - int(round(rows * duplicate_rate)))
+    texts = []
+    for i, start in enumerate(rng.integers(0, len(base), fresh).tolist()):
+        parts, words = [base[start]], base_words[start]
+        if text_length is not None:
+            while words < text_length:
+                extra = int(rng.integers(0, len(base)))
+                parts.append(base[extra])
+                words += base_words[extra]
+            parts = " ".join(parts).split()[:text_length]
+        texts.append(f"{' '.join(parts)} ref{i:x}")
+    texts = np.asarray(texts, dtype=object)
+    noisy = rng.random(fresh) < noise_rate
+    texts[noisy] = texts[noisy] + NOISE
+
+    # Every fresh text once, then duplicates of random fresh texts, shuffled
+    order = np.concatenate([np.arange(fresh), rng.integers(0, fresh, max(rows - fresh, 0))])[:rows]
+    rng.shuffle(order)
+
+    days = rng.integers(0, DAYS, rows)
+    dates = (newest - pd.to_timedelta(days, unit="D")).strftime("%Y-%m-%d")
+    return pd.DataFrame({
+        "review": texts[order],
+        "rating": rng.choice(ratings, rows),
+        "date": dates,
+        "bank": np.array(bank_names(banks), dtype=object)[np.arange(rows) % banks],
+        "source": "Google Play",
+    })
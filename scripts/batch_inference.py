@@ -0,0 +1,248 @@
+"""
+batch_inference.py
+------------------
+Batched, multi-process DistilBERT sentiment inference.
+
+- Texts are read as a stream, a window at a time
+- Each window is tokenized once (truncated to MAX_TOKENS tokens, not characters),
+  sorted by token length and cut into batches of similar length (bucketing)
+- Each batch is padded only to its own longest sequence (dynamic padding)
+- Batches run on a process pool; every worker loads the model once
+- Throughput (reviews/s) and p50/p95 per-batch latency are reported
+"""
+
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+
+from sentiment_cache import cached_scores
+
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+MODEL_REVISION = "main"
+BATCH_SIZE = 32
+MAX_TOKENS = 512
+WINDOW_BATCHES = 16          # batches' worth of texts bucketed together
+EMPTY_RESULT = ("Neutral", 0.5)
+
+
+# -------------------------
+# Helpers
+# -------------------------
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0-100) of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def bucket_batches(items, batch_size):
+    """
+    Group (key, input_ids) pairs into batches of similar token length.
+    Sorting by length keeps padding inside each batch to a minimum.
+    """
+    ordered = sorted(items, key=lambda item: len(item[1]))
+    return [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+
+
+def pad_batch(batch_ids, pad_id):
+    """Pad a batch of token id lists to the batch's own max length."""
+    width = max(len(ids) for ids in batch_ids)
+    input_ids = [ids + [pad_id] * (width - len(ids)) for ids in batch_ids]
+    attention_mask = [[1] * len(ids) + [0] * (width - len(ids)) for ids in batch_ids]
+    return input_ids, attention_mask
+
+
+class InferenceStats:
+    """Counters collected while the engine runs."""
+
+    def __init__(self):
+        self.reviews = 0
+        self.batches = 0
+        self.batch_latencies = []
+        self.started = None
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self):
+        return self.reviews / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return {
+            "reviews": self.reviews,
+            "batches": self.batches,
+            "seconds": round(self.elapsed, 3),
+            "reviews_per_sec": round(self.throughput, 1),
+            "p50_batch_ms": round(percentile(self.batch_latencies, 50) * 1000, 1),
+            "p95_batch_ms": round(percentile(self.batch_latencies, 95) * 1000, 1),
+        }
+
+
+# -------------------------
+# Worker side
+# -------------------------
+_worker = {}
+
+
+def _init_worker(model_name, threads):
+    """Load the model once per worker process."""
+    import torch
+    from transformers import AutoModelForSequenceClassification
+
+    torch.set_num_threads(threads)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name, revision=MODEL_REVISION)
+    model.eval()
+    _worker["model"] = model
+
+
+def predict_batch(batch_ids, pad_id):
+    """Run one padded batch through the worker's model; returns ([(label, score)], seconds)."""
+    import torch
+
+    start = time.perf_counter()
+    model = _worker["model"]
+    input_ids, attention_mask = pad_batch(batch_ids, pad_id)
+    with torch.inference_mode():
+        logits = model(
+            input_ids=torch.tensor(input_ids),
+            attention_mask=torch.tensor(attention_mask),
+        ).logits
+    scores, labels = logits.softmax(dim=-1).max(dim=-1)
+    id2label = model.config.id2label
+    results = [(id2label[int(l)], float(s)) for l, s in zip(labels, scores)]
+    return results, time.perf_counter() - start
+
+
+# -------------------------
+# Engine
+# -------------------------
+class BatchInferenceEngine:
+    """
+    Streams texts through DistilBERT in length-bucketed batches.
+
+    workers=0 runs in the current process (the model is loaded here once);
+    workers>=1 uses a process pool with one model per worker.
+    """
+
+    def __init__(self, model_name=MODEL_NAME, batch_size=BATCH_SIZE, workers=1,
+                 max_length=MAX_TOKENS, window_batches=WINDOW_BATCHES,
+                 tokenizer=None, predict_fn=predict_batch):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_length = max_length
+        self.window = batch_size * window_batches
+        self.predict_fn = predict_fn
+        self._tokenizer = tokenizer
+        self.stats = InferenceStats()
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name, revision=MODEL_REVISION)
+        return self._tokenizer
+
+    def _tokenize(self, window):
+        """Split a window into empty texts (answered directly) and tokenized ones."""
+        empty = [(key, text) for key, text in window
+                 if not isinstance(text, str) or text.strip() == ""]
+        valid = [(key, text) for key, text in window
+                 if isinstance(text, str) and text.strip() != ""]
+        if not valid:
+            return empty, []
+        encoded = self.tokenizer(
+            [text for _, text in valid], truncation=True, max_length=self.max_length
+        )["input_ids"]
+        return empty, list(zip([key for key, _ in valid], encoded))
+
+    def _windows(self, texts):
+        texts = iter(texts)
+        while True:
+            window = list(islice(texts, self.window))
+            if not window:
+                return
+            yield window
+
+    def _record(self, keys, results, seconds):
+        self.stats.batches += 1
+        self.stats.reviews += len(keys)
+        self.stats.batch_latencies.append(seconds)
+        self.stats.elapsed = time.perf_counter() - self.stats.started
+        for key, (label, score) in zip(keys, results):
+            yield key, label, score
+
+    def run(self, texts):
+        """
+        Score an iterable of (key, text) pairs. Yields (key, label, score)
+        as batches complete, so results arrive out of input order.
+        """
+        self.stats = InferenceStats()
+        self.stats.started = time.perf_counter()
+        pad_id = self.tokenizer.pad_token_id
+        if self.workers == 0:
+            yield from self._run_local(texts, pad_id)
+        else:
+            yield from self._run_pool(texts, pad_id)
+        self.stats.elapsed = time.perf_counter() - self.stats.started
+        logging.info(f"Inference stats: {self.stats.summary()}")
+
+    def _run_local(self, texts, pad_id):
+        if self.predict_fn is predict_batch and "model" not in _worker:
+            _init_worker(self.model_name, os.cpu_count() or 1)
+        for window in self._windows(texts):
+            empty, items = self._tokenize(window)
+            for key, _ in empty:
+                yield (key, *EMPTY_RESULT)
+            for batch in bucket_batches(items, self.batch_size):
+                keys = [key for key, _ in batch]
+                results, seconds = self.predict_fn([ids for _, ids in batch], pad_id)
+                yield from self._record(keys, results, seconds)
+
+    def _run_pool(self, texts, pad_id):
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                 initargs=(self.model_name, threads)) as pool:
+            pending = {}
+            max_pending = self.workers * 2
+            for window in self._windows(texts):
+                empty, items = self._tokenize(window)
+                for key, _ in empty:
+                    yield (key, *EMPTY_RESULT)
+                for batch in bucket_batches(items, self.batch_size):
+                    # Keep a bounded number of batches in flight
+                    while len(pending) >= max_pending:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield from self._record(pending.pop(future), *future.result())
+                    future = pool.submit(self.predict_fn, [ids for _, ids in batch], pad_id)
+                    pending[future] = [key for key, _ in batch]
+            for future in list(pending):
+                yield from self._record(pending.pop(future), *future.result())
+
+
+def score_texts(engine, texts):
+    """Run a list of texts through an engine; returns [(label, score)] in input order."""
+    results = [None] * len(texts)
+    for i, label, score in engine.run(enumerate(texts)):
+        results[i] = (label, score)
+    return results
+
+
+def analyze_sentiment_batch(texts, batch_size=BATCH_SIZE, workers=1, cache=None):
+    """
+    Score a sequence of texts; returns ([labels], [scores], stats) in input order.
+    Duplicate texts, and texts already in the SentimentCache, skip inference.
+    """
+    engine = BatchInferenceEngine(batch_size=batch_size, workers=workers)
+    results = cached_scores(
+        texts, lambda unique_texts: score_texts(engine, unique_texts),
+        cache, MODEL_NAME, MODEL_REVISION
+    )
+    labels = [label for label, _ in results]
+    scores = [score for _, score in results]
+    return labels, scores, engine.stats
@@ -0,0 +1,101 @@
+"""
+chunk_pipeline.py
+-----------------
+Overlapped read -> process -> write over a stream of chunks.
+
+run_overlapped(chunks, process, write) pulls chunks from the iterator in a
+reader thread, processes them in the calling thread and writes the
+results from a writer thread. The stages hand chunks over through bounded
+queues, so database reads and writes run while the previous chunk is
+being scored, and at most about 2 * depth + 3 chunks are alive at once:
+peak memory is set by the chunk size, not by the size of the table.
+
+The first exception in any stage stops the other two and is re-raised in
+the caller.
+"""
+
+import queue
+import threading
+
+QUEUE_DEPTH = 2            # chunks buffered between two stages
+POLL_SECONDS = 0.1         # how often a blocked stage checks for a failure elsewhere
+
+_DONE = object()
+
+
+class _Stages:
+    def __init__(self, depth):
+        self.to_process = queue.Queue(depth)
+        self.to_write = queue.Queue(depth)
+        self.failed = threading.Event()
+        self.errors = []
+
+    def fail(self, error):
+        self.errors.append(error)
+        self.failed.set()
+
+    def put(self, q, item):
+        """Put item on q; False if another stage failed while waiting for room."""
+        while not self.failed.is_set():
+            try:
+                q.put(item, timeout=POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, q):
+        """Next item on q, or _DONE once another stage has failed."""
+        while not self.failed.is_set():
+            try:
+                return q.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
+
+
+def run_overlapped(chunks, process, write, depth=QUEUE_DEPTH):
+    """
+    write(process(chunk)) for every chunk, in order, with iteration over
+    chunks and the writes each on their own thread.
+    """
+    stages = _Stages(depth)
+
+    def reader():
+        try:
+            for chunk in chunks:
+                if not stages.put(stages.to_process, chunk):
+                    return
+            stages.put(stages.to_process, _DONE)
+        except BaseException as e:
+            stages.fail(e)
+
+    def writer():
+        try:
+            while True:
+                result = stages.get(stages.to_write)
+                if result is _DONE:
+                    return
+                write(result)
+        except BaseException as e:
+            stages.fail(e)
+
+    threads = [
+        threading.Thread(target=reader, name="chunk-reader", daemon=True),
+        threading.Thread(target=writer, name="chunk-writer", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            chunk = stages.get(stages.to_process)
+            if chunk is _DONE or not stages.put(stages.to_write, process(chunk)):
+                break
+        stages.put(stages.to_write, _DONE)
+    except BaseException as e:
+        stages.fail(e)
+    finally:
+        for thread in threads:
+            thread.join()
+    if stages.errors:
+        raise stages.errors[0]
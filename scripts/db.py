@@ -0,0 +1,345 @@
+"""
+db.py
+-----
+Shared database access for the scripts, configured from config.yaml
+(db_host, db_name, db_user, db_pass; optional db_port, db_pool_size).
+
+- connect() / create_db_engine(): one psycopg2 connection / a SQLAlchemy
+  engine (for pandas.read_sql), for one-off scripts.
+- get_database(): the process-wide pooled Database.
+    with database.connection() as conn: ...   # commit on success, rollback on error
+    database.engine                            # pooled SQLAlchemy engine
+    database.iter_frames(sql, params)          # server-side cursor, DataFrame chunks
+- Prepared(name, sql): a statement PREPAREd once per connection and then
+  EXECUTEd, for writes repeated many times on the same connection.
+- SQLiteDatabase(path): the same interface on sqlite3, for tests and for
+  trying queries without a server. SQL is written for psycopg2 (%s and
+  %(name)s placeholders) and translated.
+
+Large SELECTs should go through iter_frames/iter_rows: rows are fetched
+chunk_size at a time from a named (server-side) cursor, so memory stays
+flat however many rows match.
+"""
+
+import itertools
+import re
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+import pandas as pd
+import yaml
+
+CONFIG_FILE = "config.yaml"
+DEFAULT_PORT = 5432
+POOL_SIZE = 8              # connections per pool (psycopg2 and SQLAlchemy each)
+CHUNK_SIZE = 10_000        # rows per fetch from a server-side cursor
+
+_cursor_ids = itertools.count()
+
+
+# -------------------------
+# Config
+# -------------------------
+def load_config(path=CONFIG_FILE):
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def connect_kwargs(config):
+    return {
+        "host": config["db_host"],
+        "port": config.get("db_port", DEFAULT_PORT),
+        "dbname": config["db_name"],
+        "user": config["db_user"],
+        "password": config["db_pass"],
+    }
+
+
+def connect(config=None):
+    """psycopg2 connection to the database named in config.yaml."""
+    import psycopg2
+    return psycopg2.connect(**connect_kwargs(config or load_config()))
+
+
+def create_db_engine(config=None, pool_size=None):
+    """SQLAlchemy engine for the same database (for pandas.read_sql)."""
+    from sqlalchemy import URL, create_engine
+    config = config or load_config()
+    kwargs = connect_kwargs(config)
+    url = URL.create(
+        "postgresql+psycopg2", username=kwargs["user"], password=kwargs["password"],
+        host=kwargs["host"], port=kwargs["port"], database=kwargs["dbname"]
+    )
+    return create_engine(
+        url, pool_size=pool_size or config.get("db_pool_size", POOL_SIZE), pool_pre_ping=True
+    )
+
+
+# -------------------------
+# Prepared statements
+# -------------------------
+class Prepared:
+    """
+    A statement with positional %s parameters, PREPAREd on first use on
+    each connection and EXECUTEd by name after that (parse and plan once
+    per connection). On SQLite it just executes; sqlite3 caches compiled
+    statements itself.
+    """
+
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+        self.n_params = sql.count("%s")
+        numbers = itertools.count(1)
+        self._numbered = re.sub(r"%s", lambda _: f"${next(numbers)}", sql)
+        self._prepared_on = weakref.WeakSet()
+
+    def execute(self, cur, params=()):
+        if isinstance(cur, _SQLiteCursor):
+            return cur.execute(self.sql, tuple(params))
+        conn = cur.connection
+        if conn not in self._prepared_on:
+            cur.execute(f"PREPARE {self.name} AS {self._numbered}")
+            self._prepared_on.add(conn)
+        if self.n_params:
+            cur.execute(f"EXECUTE {self.name} ({', '.join(['%s'] * self.n_params)})", tuple(params))
+        else:
+            cur.execute(f"EXECUTE {self.name}")
+        return cur
+
+
+# -------------------------
+# PostgreSQL
+# -------------------------
+class Database:
+    """
+    Pooled psycopg2 connections (up to pool_size; callers wait for a free
+    one) plus a pooled SQLAlchemy engine for pandas, both from config.yaml.
+    """
+
+    def __init__(self, config=None, pool_size=None):
+        from psycopg2.pool import ThreadedConnectionPool
+        self.config = config or load_config()
+        self.pool_size = pool_size or self.config.get("db_pool_size", POOL_SIZE)
+        self.pool = ThreadedConnectionPool(1, self.pool_size, **connect_kwargs(self.config))
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._engine = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        with self._lock:
+            if self._engine is None:
+                self._engine = create_db_engine(self.config, self.pool_size)
+            return self._engine
+
+    @contextmanager
+    def connection(self):
+        """A pooled connection; committed if the block succeeds, rolled back otherwise."""
+        self._slots.acquire()
+        try:
+            conn = self.pool.getconn()
+        except BaseException:
+            self._slots.release()
+            raise
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+            self._slots.release()
+
+    @contextmanager
+    def spare_connection(self):
+        """
+        A second connection for a caller that already holds one (e.g. to
+        read while it writes), or None if the pool has a single slot and
+        waiting for another would block forever.
+        """
+        if self.pool_size < 2:
+            yield None
+            return
+        with self.connection() as conn:
+            yield conn
+
+    def iter_rows(self, sql, params=None, chunk_size=CHUNK_SIZE):
+        """Rows of a query, streamed through a server-side cursor."""
+        return _iter_rows(self._iter_chunks(sql, params, chunk_size))
+
+    def iter_frames(self, sql, params=None, chunk_size=CHUNK_SIZE):
+        """A query's result as DataFrames of at most chunk_size rows (constant memory)."""
+        return _iter_frames(self._iter_chunks(sql, params, chunk_size))
+
+    def read_frame(self, sql, params=None, chunk_size=CHUNK_SIZE):
+        """A whole query result as one DataFrame (fetched in chunks)."""
+        return _concat(self._iter_chunks(sql, params, chunk_size))
+
+    def _iter_chunks(self, sql, params, chunk_size):
+        with self.connection() as conn:
+            cur = conn.cursor(name=f"stream_{next(_cursor_ids)}")
+            cur.itersize = chunk_size
+            try:
+                cur.execute(sql, params)
+                yield from _fetch_chunks(cur, chunk_size)
+            finally:
+                cur.close()
+
+    def close(self):
+        self.pool.closeall()
+        if self._engine is not None:
+            self._engine.dispose()
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_database(config=None):
+    """The process-wide pooled Database (created on first use)."""
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = Database(config)
+        return _database
+
+
+# -------------------------
+# SQLite (tests, offline)
+# -------------------------
+_NAMED_PARAM = re.compile(r"%\((\w+)\)s")
+
+
+def _sqlite_sql(sql):
+    """psycopg2 placeholders to sqlite3 ones."""
+    return _NAMED_PARAM.sub(r":\1", sql).replace("%s", "?")
+
+
+def _fetch_chunks(cur, chunk_size):
+    """(columns, rows) per fetchmany; a single empty chunk if there are no rows."""
+    first = True
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if rows or first:
+            yield [d[0] for d in cur.description] if cur.description else [], rows
+        if not rows:
+            return
+        first = False
+
+
+def _iter_rows(chunks):
+    for _, rows in chunks:
+        yield from rows
+
+
+def _iter_frames(chunks):
+    for columns, rows in chunks:
+        if rows:
+            yield _frame(rows, columns)
+
+
+def _concat(chunks):
+    columns, frames = [], []
+    for columns, rows in chunks:
+        if rows:
+            frames.append(_frame(rows, columns))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+
+def _frame(rows, columns):
+    # Decimals (NUMERIC, avg()) become floats, as with pandas.read_sql
+    return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+
+class SQLiteDatabase:
+    """Database's interface on a sqlite3 file (or ":memory:", shared by all connections)."""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._memory = sqlite3.connect(":memory:", check_same_thread=False) if path == ":memory:" else None
+        self._lock = threading.RLock()
+
+    @property
+    def engine(self):
+        """A sqlite3 connection, which pandas.read_sql accepts (with sqlite placeholders)."""
+        return self._connect()
+
+    def _connect(self):
+        return self._memory if self._memory is not None else sqlite3.connect(self.path)
+
+    @contextmanager
+    def connection(self):
+        with self._lock if self._memory is not None else _nullcontext():
+            conn = self._connect()
+            try:
+                yield _SQLiteConnection(conn)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                if self._memory is None:
+                    conn.close()
+
+    @contextmanager
+    def spare_connection(self):
+        """Always None: sqlite3 connections stay on the thread that uses them."""
+        yield None
+
+    def iter_rows(self, sql, params=None, chunk_size=CHUNK_SIZE):
+        return _iter_rows(self._iter_chunks(sql, params, chunk_size))
+
+    def iter_frames(self, sql, params=None, chunk_size=CHUNK_SIZE):
+        return _iter_frames(self._iter_chunks(sql, params, chunk_size))
+
+    def read_frame(self, sql, params=None, chunk_size=CHUNK_SIZE):
+        return _concat(self._iter_chunks(sql, params, chunk_size))
+
+    def _iter_chunks(self, sql, params, chunk_size):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            yield from _fetch_chunks(cur, chunk_size)
+
+    def close(self):
+        if self._memory is not None:
+            self._memory.close()
+
+
+class _SQLiteConnection:
+    """Wraps a sqlite3 connection so cursors take psycopg2-style SQL."""
+
+    def __init__(self, conn):
+        self.raw = conn
+
+    def cursor(self, *args, **kwargs):
+        return _SQLiteCursor(self.raw.cursor())
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+
+class _SQLiteCursor:
+    def __init__(self, cur):
+        self.raw = cur
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def execute(self, sql, params=None):
+        return self.raw.execute(_sqlite_sql(sql), params if params is not None else ())
+
+    def executemany(self, sql, rows):
+        return self.raw.executemany(_sqlite_sql(sql), rows)
+
+
+@contextmanager
+def _nullcontext():
+    yield
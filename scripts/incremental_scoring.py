@@ -0,0 +1,146 @@
+"""
+incremental_scoring.py
+----------------------
+Incremental sentiment scoring for the reviews table.
+
+Each scored row records the model/version that produced it and an md5 of
+the text it was scored on. A run only selects rows that were never scored,
+whose text changed, or that were scored by another model version, and it
+walks them in keyset-paginated chunks by review_id, writing back (and
+committing) one chunk at a time. Nightly runs therefore scale with the
+daily delta rather than with table size.
+
+Given a separate connection for reads, reading, scoring and writing
+overlap (chunk_pipeline.run_overlapped): the next chunk is fetched and the
+previous one written back while the current one is scored, and memory is
+bounded by chunk_size and the queue depth.
+
+Reads, scoring and write-back are timed as the score.read, score.model
+and score.write stages (instrumentation.py).
+"""
+
+import hashlib
+import logging
+from importlib.metadata import version, PackageNotFoundError
+
+from chunk_pipeline import QUEUE_DEPTH, run_overlapped
+from instrumentation import stage, timed
+from sentiment_cache import cached_scores
+from sentiment_writeback import write_sentiment
+
+CHUNK_SIZE = 5000
+VADER_MODEL_ID = "vader"
+
+
+def vader_version():
+    """Installed vaderSentiment version, recorded on rows scored with VADER."""
+    try:
+        return version('vaderSentiment')
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def text_hash(text):
+    """md5 of the review text; matches md5(COALESCE(review_text, '')) in PostgreSQL."""
+    return hashlib.md5((text or "").encode("utf-8")).hexdigest()
+
+
+def ensure_columns(cur):
+    """Add the bookkeeping columns to tables created before incremental scoring."""
+    cur.execute("ALTER TABLE reviews ADD COLUMN IF NOT EXISTS sentiment_model TEXT;")
+    cur.execute("ALTER TABLE reviews ADD COLUMN IF NOT EXISTS sentiment_hash TEXT;")
+
+
+PENDING_FILTER = """
+    AND (sentiment_label IS NULL
+         OR sentiment_model IS DISTINCT FROM %(model)s
+         OR sentiment_hash IS DISTINCT FROM md5(COALESCE(review_text, '')))
+"""
+
+
+def iter_pending_chunks(conn, model_version, chunk_size=CHUNK_SIZE, full=False):
+    """
+    Yield lists of (review_id, review_text) that need (re)scoring, ordered
+    by review_id. With full=True every row is yielded.
+    """
+    sql = f"""
+        SELECT review_id, review_text
+        FROM reviews
+        WHERE review_id > %(after)s
+        {"" if full else PENDING_FILTER}
+        ORDER BY review_id
+        LIMIT %(limit)s
+    """
+    after = 0
+    cur = conn.cursor()
+    try:
+        while True:
+            cur.execute(sql, {"after": after, "model": model_version, "limit": chunk_size})
+            rows = cur.fetchall()
+            if not rows:
+                return
+            yield rows
+            after = rows[-1][0]
+    finally:
+        cur.close()
+
+
+def _released(chunks, conn):
+    """Chunks read on conn, ending its read transaction after each one (and at the end)."""
+    try:
+        for rows in chunks:
+            conn.commit()
+            yield rows
+    finally:
+        conn.commit()
+
+
+def score_incrementally(conn, score_fn, model_id, model_version,
+                        chunk_size=CHUNK_SIZE, full=False, cache=None, score_many=None,
+                        read_conn=None, queue_depth=QUEUE_DEPTH):
+    """
+    Score pending reviews with score_fn(text) -> (label, score) and write
+    the results back chunk by chunk. score_many(texts) -> [(label, score)],
+    if given, scores a whole chunk at once instead (e.g. a VaderScorer).
+    With a SentimentCache, texts seen before (in this or earlier runs) are
+    not scored again. Returns the number of rows scored.
+
+    With a read_conn, chunks are read on it in a reader thread and written
+    on conn in a writer thread, overlapping with scoring. Without one,
+    every stage runs on the calling thread, one chunk after another, so
+    conn is never shared between threads.
+    """
+    if score_many is None:
+        score_many = lambda batch: [score_fn(t) for t in batch]  # noqa: E731
+    model_tag = f"{model_id}-{model_version}"
+    cur = conn.cursor()
+    ensure_columns(cur)
+    conn.commit()
+    cur.close()
+
+    def score_chunk(rows):
+        texts = [text for _, text in rows]
+        with stage("score.model", rows_in=len(texts)):
+            scores = cached_scores(texts, score_many, cache, model_id, model_version)
+        return [
+            (review_id, label, score, model_tag, text_hash(text))
+            for (review_id, text), (label, score) in zip(rows, scores)
+        ]
+
+    scored = 0
+
+    def write_chunk(results):
+        nonlocal scored
+        with stage("score.write", rows_in=len(results)):
+            write_sentiment(conn, results, batch_size=len(results), versioned=True)
+        scored += len(results)
+        logging.info(f"Scored {scored} reviews (up to review_id {results[-1][0]})")
+
+    if read_conn is None:
+        for rows in timed(iter_pending_chunks(conn, model_tag, chunk_size, full), "score.read"):
+            write_chunk(score_chunk(rows))
+    else:
+        chunks = _released(timed(iter_pending_chunks(read_conn, model_tag, chunk_size, full), "score.read"),
+                           read_conn)
+        run_overlapped(chunks, score_chunk, write_chunk, queue_depth)
+    return scored
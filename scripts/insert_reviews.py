@@ -1,86 +1,232 @@
 # scripts/insert_reviews.py
-import pandas as pd
-import psycopg2
-import yaml
-
-# ---Load config---
-with open('config.yaml') as f:
-    config = yaml.safe_load(f)
-
-DB_HOST = config['db_host']
-DB_NAME = config['db_name']
-DB_USER = config['db_user']
-DB_PASS = config['db_pass']
-CSV_PATH = config['csv_path']
-
-# --- LOAD CSV ---
-df = pd.read_csv(CSV_PATH)
-print(f"CSV loaded: {len(df)} reviews.")
-
-# --- CONNECT TO DATABASE ---
-conn = psycopg2.connect(
-    host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASS
+"""
+insert_reviews.py
+-----------------
+Loads cleaned reviews into PostgreSQL.
+
+The schema is brought up to date first (sql/migrations, see migrate.py).
+Bank ids are resolved once into an in-memory map, review rows are streamed
+into a temporary staging table (COPY FROM STDIN, or execute_values pages
+when COPY isn't allowed), the yearly partitions they need are created, and
+they are moved into `reviews` with a single INSERT ... ON CONFLICT on the
+natural key, so re-running the load is safe.
+"""
+
+import argparse
+import hashlib
+import math
+import time
+
+from psycopg2.extras import execute_values
+from db import connect, load_config
+from migrate import migrate_cursor
+from storage import read_columns, read_table
+
+PAGE_SIZE = 1000
+DEFAULT_SOURCE = 'Google Play'
+
+# Only these columns of the cleaned dataset are read
+INPUT_COLUMNS = ("review", "rating", "date", "bank", "sentiment_label", "sentiment_score", "source")
+
+STAGING_COLUMNS = (
+    "bank_id", "review_text", "rating", "review_date",
+    "sentiment_label", "sentiment_score", "source", "review_key",
 )
-cur = conn.cursor()
-
-# --- CREATE TABLES IF NOT EXIST ---
-cur.execute("""
-CREATE TABLE IF NOT EXISTS banks (
-    bank_id SERIAL PRIMARY KEY,
-    bank_name TEXT UNIQUE NOT NULL,
-    app_name TEXT
-);
-""")
-
-cur.execute("""
-CREATE TABLE IF NOT EXISTS reviews (
-    review_id SERIAL PRIMARY KEY,
-    bank_id INT REFERENCES banks(bank_id),
-    review_text TEXT,
-    rating INT,
-    review_date DATE,
-    sentiment_label TEXT,
-    sentiment_score FLOAT,
-    source TEXT
-);
-""")
-conn.commit()
-print("Tables verified or created.")
-
-
-# --- Insert Banks ---
-banks = df['bank'].unique()
-for bank in banks:
-    cur.execute("""
+
+
+# --- Tables ---
+def create_tables(cur):
+    """Apply any pending schema migrations (creates banks/reviews on a new database)."""
+    migrate_cursor(cur)
+
+
+# --- Banks ---
+def upsert_banks(cur, bank_names):
+    """Insert any missing banks and return a {bank_name: bank_id} map in one lookup."""
+    bank_names = [str(b) for b in bank_names]
+    execute_values(cur, """
         INSERT INTO banks (bank_name, app_name)
-        VALUES (%s, %s)
-        ON CONFLICT (bank_name) DO NOTHING;
-    """, (bank, f"{bank} Mobile App"))
-conn.commit()
-
-# --- Helper: get bank_id ---
-def get_bank_id(bank_name):
-    cur.execute("SELECT bank_id FROM banks WHERE bank_name=%s", (bank_name,))
-    return cur.fetchone()[0]
-
-# --- Insert Reviews ---
-for _, row in df.iterrows():
-    bank_id = get_bank_id(row['bank'])
-    cur.execute("""
-        INSERT INTO reviews 
-        (bank_id, review_text, rating, review_date, sentiment_label, sentiment_score, source)
-        VALUES (%s,%s,%s,%s,%s,%s,%s)
-    """, (
-        bank_id,
-        row['review'],
-        int(row['rating']),
-        row['date'],
-        row.get('sentiment_label', None),
-        float(row.get('sentiment_score', 0)),
-        row.get('source', 'Google Play')
-    ))
-
-conn.commit()
-cur.close()
-conn.close()
-print("All reviews inserted successfully!")
\ No newline at end of file
+        VALUES %s
+        ON CONFLICT (bank_name) DO NOTHING
+    """, [(bank, f"{bank} Mobile App") for bank in bank_names])
+    cur.execute(
+        "SELECT bank_name, bank_id FROM banks WHERE bank_name = ANY(%s)",
+        (bank_names,)
+    )
+    return dict(cur.fetchall())
+
+
+# --- Rows ---
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def review_key(bank, date, rating, text):
+    """Natural key of a review: digest of bank, date, rating and text."""
+    raw = "\x1f".join("" if _is_missing(v) else str(v) for v in (bank, date, rating, text))
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+def iter_review_rows(df, bank_ids):
+    """Yield staging tuples (in STAGING_COLUMNS order) for every review in df."""
+    n = len(df)
+    labels = df['sentiment_label'] if 'sentiment_label' in df else [None] * n
+    scores = df['sentiment_score'] if 'sentiment_score' in df else [0] * n
+    sources = df['source'] if 'source' in df else [DEFAULT_SOURCE] * n
+
+    for bank, text, rating, date, label, score, source in zip(
+        df['bank'], df['review'], df['rating'], df['date'], labels, scores, sources
+    ):
+        rating = int(rating)
+        date = None if _is_missing(date) else date
+        yield (
+            bank_ids[bank],
+            text,
+            rating,
+            date,
+            None if _is_missing(label) else str(label).lower(),
+            float(score),
+            DEFAULT_SOURCE if _is_missing(source) else source,
+            review_key(bank, date, rating, text),
+        )
+
+
+# --- COPY streaming ---
+def _copy_escape(value):
+    """Format one value for COPY's text format (\\N is NULL)."""
+    if _is_missing(value):
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class RowStream:
+    """File-like object that renders rows for COPY lazily, one line at a time."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ""
+        self.count = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += "\t".join(_copy_escape(v) for v in row) + "\n"
+            self.count += 1
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def stage_rows_copy(cur, rows):
+    """Stream rows into the staging table with COPY FROM STDIN."""
+    stream = RowStream(rows)
+    cur.copy_expert(
+        f"COPY reviews_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN",
+        stream
+    )
+    return stream.count
+
+
+def stage_rows_values(cur, rows, page_size=PAGE_SIZE):
+    """Fallback for servers where COPY is not allowed: multi-row INSERT pages."""
+    count = 0
+    page = []
+    sql = f"INSERT INTO reviews_staging ({', '.join(STAGING_COLUMNS)}) VALUES %s"
+    for row in rows:
+        page.append(row)
+        if len(page) >= page_size:
+            execute_values(cur, sql, page, page_size=page_size)
+            count += len(page)
+            page = []
+    if page:
+        execute_values(cur, sql, page, page_size=page_size)
+        count += len(page)
+    return count
+
+
+# --- Load ---
+def load_reviews(conn, df, method="copy", page_size=PAGE_SIZE):
+    """
+    Bulk-load df into reviews. Rows already present (same review_key) are
+    left untouched. Returns a dict with staged/inserted counts and rows/s.
+    """
+    start = time.perf_counter()
+    cur = conn.cursor()
+
+    create_tables(cur)
+    bank_ids = upsert_banks(cur, df['bank'].unique())
+
+    # Same column types as reviews (enums included), so COPY validates rows
+    columns = ", ".join(STAGING_COLUMNS)
+    cur.execute(f"""
+        CREATE TEMP TABLE reviews_staging ON COMMIT DROP AS
+        SELECT {columns} FROM reviews WITH NO DATA;
+    """)
+
+    rows = iter_review_rows(df, bank_ids)
+    if method == "copy":
+        staged = stage_rows_copy(cur, rows)
+    elif method == "values":
+        staged = stage_rows_values(cur, rows, page_size)
+    else:
+        raise ValueError(f"Unknown load method: {method}")
+
+    cur.execute(
+        "SELECT create_review_partitions(MIN(review_date), MAX(review_date)) FROM reviews_staging"
+    )
+    cur.execute(f"""
+        INSERT INTO reviews ({columns})
+        SELECT {columns} FROM reviews_staging
+        ON CONFLICT (review_key, review_date) DO NOTHING
+    """)
+    inserted = cur.rowcount
+    conn.commit()
+    cur.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        "staged": staged,
+        "inserted": inserted,
+        "seconds": seconds,
+        "rows_per_sec": staged / seconds if seconds > 0 else float("inf"),
+    }
+
+
+# --- Main ---
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load cleaned reviews into PostgreSQL.")
+    parser.add_argument("--input", help="Cleaned reviews, Parquet or CSV (defaults to cleaned_path in config.yaml)")
+    parser.add_argument("--method", choices=["copy", "values"], default="copy",
+                        help="COPY FROM STDIN, or execute_values pages when COPY isn't allowed")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = parser.parse_args()
+
+    config = load_config()
+    path = args.input or config['cleaned_path']
+    available = read_columns(path)
+    df = read_table(path, columns=[c for c in INPUT_COLUMNS if c in available])
+    print(f"Reviews loaded: {len(df)} reviews.")
+
+    conn = connect(config)
+    try:
+        stats = load_reviews(conn, df, method=args.method, page_size=args.page_size)
+    finally:
+        conn.close()
+
+    print(
+        f"Staged {stats['staged']} rows, inserted {stats['inserted']} new reviews "
+        f"in {stats['seconds']:.2f}s ({stats['rows_per_sec']:,.0f} rows/s)."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+instrumentation.py
+------------------
+Per-stage timings, row counts and counters for the pipeline scripts, a
+peak-RSS reading, optional cProfile capture, and two ways out: a JSON run
+report and a Prometheus text file (e.g. for node_exporter's textfile
+collector to scrape).
+
+Code marks its stages with
+
+    with stage("preprocess.clean", rows_in=len(df)) as s:
+        df = clean(df)
+        s.rows_out = len(df)
+
+and anything running inside a stage can count(name, n) (cache hits, say)
+without knowing which stage it is in: counts go to the innermost stage
+open on the calling thread. Stages are recorded in the current run; a
+name used again (per chunk, per page, from several threads) adds to the
+same entry, so seconds are busy time summed over calls and can exceed the
+run's wall time when threads overlap. Stage names are dotted by script
+("scrape.fetch", "preprocess.clean", "analyze.sentiment"); the pipeline's
+own stages are the undotted prefixes.
+
+Scripts start a run with instrumented(...) (or from_args() with the flags
+add_arguments() defines), which writes the reports when the run ends.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:      # Windows
+    resource = None
+
+METRIC_PREFIX = "review_pipeline"
+PROFILE_TOP = 25         # functions logged from a --profile capture
+
+_local = threading.local()
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024    # bytes on macOS, KiB on Linux
+
+
+# -------------------------
+# Stages & runs
+# -------------------------
+class Measurement:
+    """Rows and counters; what a stage() block sees, merged into the stage on exit."""
+
+    def __init__(self):
+        self.rows_in = None
+        self.rows_out = None
+        self.counters = {}
+
+    def add(self, rows_in=None, rows_out=None):
+        if rows_in is not None:
+            self.rows_in = (self.rows_in or 0) + rows_in
+        if rows_out is not None:
+            self.rows_out = (self.rows_out or 0) + rows_out
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+
+class StageMetrics(Measurement):
+    """Accumulated measurements of one named stage."""
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.peak_rss_bytes = None
+
+    @property
+    def rows_per_sec(self):
+        rows = self.rows_in if self.rows_in is not None else self.rows_out
+        if rows is None or self.seconds <= 0:
+            return None
+        return rows / self.seconds
+
+    def to_dict(self):
+        rate = self.rows_per_sec
+        return {
+            "stage": self.name,
+            "calls": self.calls,
+            "seconds": round(self.seconds, 3),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_per_sec": None if rate is None else round(rate, 1),
+            "counters": dict(self.counters),
+            "peak_rss_bytes": self.peak_rss_bytes,
+        }
+
+
+class Run:
+    """The stages of one script run, in the order they first started."""
+
+    def __init__(self, name="run"):
+        self.name = name
+        self.started = time.time()
+        self.seconds = None
+        self.status = "running"
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, rows_in=None, rows_out=None):
+        with self._lock:
+            metrics = self.stages.setdefault(name, StageMetrics(name))
+        measurement = Measurement()
+        measurement.add(rows_in, rows_out)
+        stack = _stack()
+        stack.append(measurement)
+        start = time.perf_counter()
+        try:
+            yield measurement
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                metrics.calls += 1
+                metrics.seconds += seconds
+                metrics.add(measurement.rows_in, measurement.rows_out)
+                for counter, n in measurement.counters.items():
+                    metrics.count(counter, n)
+                metrics.peak_rss_bytes = peak_rss_bytes()
+
+    def finish(self, status="ok"):
+        self.seconds = time.time() - self.started
+        self.status = status
+
+    def report(self):
+        with self._lock:
+            stages = [metrics.to_dict() for metrics in self.stages.values()]
+        seconds = self.seconds if self.seconds is not None else time.time() - self.started
+        return {
+            "run": self.name,
+            "status": self.status,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "seconds": round(seconds, 3),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "pid": os.getpid(),
+            "stages": stages,
+        }
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+_current = Run()
+
+
+def current():
+    return _current
+
+
+def start_run(name):
+    """Make a new, empty run the one stage() records into."""
+    global _current
+    _current = Run(name)
+    return _current
+
+
+def stage(name, rows_in=None, rows_out=None):
+    """Time a block as stage `name` of the current run (see the module docstring)."""
+    return _current.stage(name, rows_in, rows_out)
+
+
+def count(name, n=1):
+    """Add n to counter `name` of the innermost stage open on this thread (if any)."""
+    stack = _stack()
+    if stack:
+        stack[-1].count(name, n)
+
+
+def rows(rows_in=None, rows_out=None):
+    """Add rows to the innermost stage open on this thread (if any)."""
+    stack = _stack()
+    if stack:
+        stack[-1].add(rows_in, rows_out)
+
+
+def timed(iterable, name):
+    """Yield from iterable, timing each next() as stage `name` and counting len(item) as rows out."""
+    iterator = iter(iterable)
+    try:
+        while True:
+            with stage(name) as s:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                s.rows_out = len(item)
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+# -------------------------
+# Reports
+# -------------------------
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_json(report, path):
+    _write_atomic(path, json.dumps(report, indent=2) + "\n")
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def prometheus_text(report, prefix=METRIC_PREFIX):
+    """The report in the Prometheus text exposition format (all gauges)."""
+    run = f'run="{_label(report["run"])}"'
+    families = {}     # metric -> (help, [(labels, value)])
+
+    def sample(metric, help_text, labels, value):
+        if value is not None:
+            families.setdefault(f"{prefix}_{metric}", (help_text, []))[1].append((labels, value))
+
+    sample("run_seconds", "Wall time of the run", run, report["seconds"])
+    sample("run_success", "1 if the run finished without an error", run, int(report["status"] == "ok"))
+    sample("run_peak_rss_bytes", "Peak resident set size of the run's process", run, report["peak_rss_bytes"])
+    for s in report["stages"]:
+        labels = f'{run},stage="{_label(s["stage"])}"'
+        sample("stage_seconds", "Busy time of a stage, summed over its calls", labels, s["seconds"])
+        sample("stage_calls", "Times a stage ran", labels, s["calls"])
+        sample("stage_rows_in", "Rows a stage received", labels, s["rows_in"])
+        sample("stage_rows_out", "Rows a stage produced", labels, s["rows_out"])
+        sample("stage_rows_per_second", "Stage throughput (rows in, else rows out, per second)",
+               labels, s["rows_per_sec"])
+        for counter, value in sorted(s["counters"].items()):
+            sample(f"stage_{_metric_name(counter)}", f"Stage counter {counter}", labels, value)
+
+    lines = []
+    for metric, (help_text, samples) in families.items():
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.extend(f"{metric}{{{labels}}} {value}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(report, path):
+    _write_atomic(path, prometheus_text(report))
+
+
+# -------------------------
+# Script entry points
+# -------------------------
+def add_arguments(parser, json_file=None, prom_file=None):
+    """The --metrics-json / --metrics-prom / --profile flags (defaults: nothing written)."""
+    group = parser.add_argument_group("instrumentation")
+    group.add_argument("--metrics-json", metavar="PATH", default=json_file,
+                       help="Write a JSON run report (per-stage seconds, rows, rows/s, counters, peak RSS)")
+    group.add_argument("--metrics-prom", metavar="PATH", default=prom_file,
+                       help="Write the same metrics in Prometheus text format")
+    group.add_argument("--profile", metavar="PATH",
+                       help="Profile the run's main thread with cProfile and save the stats to PATH")
+
+
+@contextmanager
+def instrumented(name, json_file=None, prom_file=None, profile_file=None):
+    """
+    Start a run, optionally under cProfile; when it ends (also on an
+    error, with status "failed") write the requested reports.
+    """
+    run = start_run(name)
+    profiler = cProfile.Profile() if profile_file else None
+    if profiler is not None:
+        profiler.enable()
+    status = "failed"
+    try:
+        yield run
+        status = "ok"
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_file)
+            logging.info(f"Profile saved to {profile_file} (view with: python -m pstats {profile_file})")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        run.finish(status)
+        report = run.report()
+        if json_file:
+            write_json(report, json_file)
+            logging.info(f"Run report saved to {json_file}")
+        if prom_file:
+            write_prometheus(report, prom_file)
+            logging.info(f"Metrics saved to {prom_file}")
+
+
+def from_args(name, args):
+    """instrumented() with the flags from add_arguments()."""
+    return instrumented(name, args.metrics_json, args.metrics_prom, args.profile)
@@ -0,0 +1,166 @@
+"""
+keyword_index.py
+----------------
+Per-group (per bank / app) TF-IDF keyword aggregation.
+
+The corpus is vectorized once. Per-group TF-IDF sums come from a single
+sparse product of a group-indicator matrix (groups x documents) with the
+document-term matrix, and each group's top-k keywords are picked with
+argpartition instead of sorting every feature. The keywords and scores
+match fitting TfidfVectorizer and transforming each bank separately;
+equal scores are ordered by feature index, as the old stable sort of
+each bank's scores did.
+
+The index keeps its vocabulary, document-frequency counts and per-group
+sums, so new reviews can be added with update() without a refit: their
+document frequencies are added to the stored counts, and their TF-IDF rows
+(under the updated idf) are added to their group's sums. Sums already in
+the index keep the idf they were computed with, and the vocabulary stays
+fixed until the next fit(), so refit now and then to resync.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+MAX_FEATURES = 100
+NGRAM_RANGE = (1, 2)
+STOP_WORDS = "english"
+TOP_K = 10
+
+
+def top_k_indices(scores, k):
+    """
+    Indices of the k largest scores, largest first; equal scores are
+    ordered by index (the order a stable descending sort gives).
+    """
+    if len(scores) > k:
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(len(scores))
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:k]
+
+
+class KeywordIndex:
+    """TF-IDF keyword sums per group, fit once and updated incrementally."""
+
+    def __init__(self, max_features=MAX_FEATURES, ngram_range=NGRAM_RANGE, stop_words=STOP_WORDS):
+        self.max_features = max_features
+        self.ngram_range = tuple(ngram_range)
+        self.stop_words = stop_words
+        self.vocabulary = None      # feature names, in column order
+        self.df = None              # documents containing each feature
+        self.n_docs = 0
+        self.groups = []            # group keys, in first-seen order
+        self.sums = None            # (groups, features) TF-IDF sums
+        self.last_id = None         # highest review id folded in (for callers)
+
+    # -------------------------
+    # Vectorizing
+    # -------------------------
+    def _counter(self, vocabulary=None):
+        return CountVectorizer(
+            stop_words=self.stop_words, ngram_range=self.ngram_range,
+            max_features=None if vocabulary is not None else self.max_features,
+            vocabulary=vocabulary
+        )
+
+    def idf(self):
+        """Smoothed idf, as TfidfTransformer computes it."""
+        return np.log((self.n_docs + 1) / (self.df + 1.0)) + 1.0
+
+    def _tfidf(self, counts):
+        """L2-normalized TF-IDF rows for a count matrix under the current idf."""
+        X = sp.csr_matrix(counts, dtype=np.float64)
+        X.data *= self.idf()[X.indices]
+        return normalize(X, norm="l2", copy=False)
+
+    def _add(self, X, groups):
+        """Add the rows of X to the sums of their groups (one sparse product)."""
+        groups = [g.item() if isinstance(g, np.generic) else g for g in groups]
+        positions = {group: i for i, group in enumerate(self.groups)}
+        for group in pd.unique(pd.Series(groups, dtype=object)):
+            if group not in positions:
+                positions[group] = len(self.groups)
+                self.groups.append(group)
+        codes = np.fromiter((positions[g] for g in groups), dtype=np.int64, count=len(groups))
+        indicator = sp.csr_matrix(
+            (np.ones(len(codes)), (codes, np.arange(len(codes)))),
+            shape=(len(self.groups), len(codes))
+        )
+        added = (indicator @ X).toarray()
+        if self.sums is None:
+            self.sums = added
+        else:
+            grown = np.zeros((len(self.groups), added.shape[1]))
+            grown[:len(self.sums)] = self.sums
+            self.sums = grown + added
+
+    def fit(self, texts, groups, last_id=None):
+        """(Re)build the index from a full corpus."""
+        counter = self._counter()
+        counts = counter.fit_transform(texts)
+        self.vocabulary = counter.get_feature_names_out()
+        self.df = np.bincount(counts.indices, minlength=len(self.vocabulary)).astype(np.float64)
+        self.n_docs = counts.shape[0]
+        self.groups, self.sums = [], None
+        self._add(self._tfidf(counts), list(groups))
+        self.last_id = last_id
+        return self
+
+    def update(self, texts, groups, last_id=None):
+        """Fold new documents into the index without refitting the vocabulary."""
+        if self.vocabulary is None:
+            return self.fit(texts, groups, last_id)
+        texts, groups = list(texts), list(groups)
+        if not texts:
+            return self
+        counts = self._counter(list(self.vocabulary)).fit_transform(texts)
+        self.df += np.bincount(counts.indices, minlength=len(self.vocabulary))
+        self.n_docs += counts.shape[0]
+        self._add(self._tfidf(counts), groups)
+        if last_id is not None:
+            self.last_id = last_id
+        return self
+
+    def top_keywords(self, k=TOP_K):
+        """{group: [top k features]} in first-seen group order."""
+        return {
+            group: [str(self.vocabulary[i]) for i in top_k_indices(self.sums[row], k)]
+            for row, group in enumerate(self.groups)
+        }
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def save(self, path):
+        meta = {
+            "max_features": self.max_features, "ngram_range": list(self.ngram_range),
+            "stop_words": self.stop_words, "n_docs": self.n_docs,
+            "groups": self.groups,
+            "last_id": self.last_id.item() if isinstance(self.last_id, np.generic) else self.last_id,
+        }
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f, meta=np.array(json.dumps(meta)), vocabulary=self.vocabulary.astype(str),
+                df=self.df, sums=self.sums
+            )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            index = cls(meta["max_features"], meta["ngram_range"], meta["stop_words"])
+            index.vocabulary = data["vocabulary"].astype(object)
+            index.df = data["df"]
+            index.sums = data["sums"]
+        index.n_docs = meta["n_docs"]
+        index.groups = meta["groups"]
+        index.last_id = meta["last_id"]
+        return index
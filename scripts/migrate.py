@@ -0,0 +1,129 @@
+"""
+migrate.py
+----------
+Versioned schema migrations for the bank_reviews database.
+
+Migrations are the files in sql/migrations named NNNN_description.sql.
+They run in version order; each one is applied in the caller's
+transaction and recorded in schema_migrations, so it runs exactly once
+per database. Concurrent migrators are serialized with an advisory lock.
+
+    python scripts/migrate.py             # apply pending migrations
+    python scripts/migrate.py --status    # list applied / pending
+    python scripts/migrate.py --target 2  # apply up to version 2
+
+Needs PostgreSQL 15 or newer (0003 uses UNIQUE ... NULLS NOT DISTINCT).
+"""
+
+import argparse
+import os
+import re
+
+MIGRATIONS_DIR = "sql/migrations"
+LOCK_ID = 7_311_024            # pg_advisory_xact_lock key for migrations
+
+_NAME = re.compile(r"^(\d+)_([A-Za-z0-9_]+)\.sql$")
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def sql(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def __repr__(self):
+        return f"Migration({self.version}, {self.name!r})"
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """Migrations in directory, in version order."""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _NAME.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: {filename}")
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, filename))
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def applied_versions(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {version for (version,) in cur.fetchall()}
+
+
+def pending(cur, directory=MIGRATIONS_DIR, target=None):
+    applied = applied_versions(cur)
+    return [
+        m for m in discover(directory)
+        if m.version not in applied and (target is None or m.version <= target)
+    ]
+
+
+def migrate_cursor(cur, directory=MIGRATIONS_DIR, target=None):
+    """Apply pending migrations on cur without committing; returns those applied."""
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (LOCK_ID,))
+    todo = pending(cur, directory, target)
+    for migration in todo:
+        cur.execute(migration.sql())
+        cur.execute(
+            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+            (migration.version, migration.name)
+        )
+    return todo
+
+
+def migrate(conn, directory=MIGRATIONS_DIR, target=None):
+    """Apply pending migrations in one transaction; returns those applied."""
+    cur = conn.cursor()
+    try:
+        applied = migrate_cursor(cur, directory, target)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations (sql/migrations).")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations")
+    parser.add_argument("--target", type=int, help="Apply migrations up to this version only")
+    parser.add_argument("--dir", default=MIGRATIONS_DIR)
+    args = parser.parse_args()
+
+    from db import connect
+    conn = connect()
+    try:
+        if args.status:
+            cur = conn.cursor()
+            applied = applied_versions(cur)
+            conn.commit()
+            for m in discover(args.dir):
+                print(f"{m.version:04d} {m.name:<30} {'applied' if m.version in applied else 'pending'}")
+            return
+        applied = migrate(conn, args.dir, args.target)
+    finally:
+        conn.close()
+    for m in applied:
+        print(f"Applied {m.version:04d} {m.name}")
+    print(f"{len(applied)} migration(s) applied.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+model_server.py
+---------------
+Optional long-lived worker that keeps the sentiment model and spaCy loaded,
+so repeated small runs of the analysis scripts don't pay for loading them.
+
+    python scripts/model_server.py --preload      # leave running
+    python scripts/task_2_sentiment_thematic_analysis.py --server
+
+Clients talk to it over a multiprocessing.connection socket: by default the
+Unix socket data/model_server.sock (TCP on localhost:6010 where there are
+no Unix sockets), or --address host:port. Messages are pickled, so every
+connection must prove it knows the authkey first: MODEL_SERVER_AUTHKEY if
+set, otherwise a random key that the server writes to data/model_server.key
+(readable by its owner only) and clients read from there. A request is
+(op, texts) and the reply is a list with one result per text:
+- "sentiment": (label, score) from DistilBERT
+- "keywords": comma-separated noun chunks from spaCy
+"""
+
+import argparse
+import logging
+import os
+import secrets
+import socket
+import stat
+import threading
+from multiprocessing.connection import Client, Listener
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+ADDRESS = "data/model_server.sock" if hasattr(socket, "AF_UNIX") else ("localhost", 6010)
+AUTHKEY_ENV = "MODEL_SERVER_AUTHKEY"
+KEY_FILE = "data/model_server.key"
+REQUEST_SIZE = 1000   # texts per request sent by the client
+
+
+def parse_address(text):
+    """'host:port' -> (host, port); anything containing a '/' is a Unix socket path."""
+    if "/" in text:
+        return text
+    host, port = text.rsplit(":", 1)
+    return host, int(port)
+
+
+def format_address(address):
+    return address if isinstance(address, str) else f"{address[0]}:{address[1]}"
+
+
+def get_authkey(key_file=KEY_FILE, create=False):
+    """
+    MODEL_SERVER_AUTHKEY, else the key in key_file. With create (the server),
+    a missing key file is created with a new random key, mode 0600.
+    """
+    key = os.environ.get(AUTHKEY_ENV)
+    if key:
+        return key.encode()
+    if create and not os.path.exists(key_file):
+        os.makedirs(os.path.dirname(key_file) or ".", exist_ok=True)
+        try:
+            fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass    # another server got there first; use its key
+        else:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            logging.info(f"Wrote a new model server key to {key_file}")
+    try:
+        mode = os.stat(key_file).st_mode
+        with open(key_file) as f:
+            key = f.read().strip()
+    except FileNotFoundError:
+        raise RuntimeError(
+            f"No model server key: set {AUTHKEY_ENV} or start model_server.py, which writes {key_file}"
+        ) from None
+    if os.name == "posix" and mode & (stat.S_IRWXG | stat.S_IRWXO):
+        raise RuntimeError(f"{key_file} is readable by other users; chmod 600 it")
+    if not key:
+        raise RuntimeError(f"{key_file} is empty")
+    return key.encode()
+
+
+def _remove_stale_socket(path):
+    """Delete a Unix socket file left behind by a server that is no longer running."""
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.remove(path)
+        else:
+            raise RuntimeError(f"A model server is already listening on {path}")
+
+
+def default_handlers(batch_size=None):
+    """Ops served by default; each model is loaded on first use and then kept."""
+    from batch_inference import BATCH_SIZE, BatchInferenceEngine, score_texts
+    import task_2_sentiment_thematic_analysis as task_2
+
+    engine = BatchInferenceEngine(batch_size=batch_size or BATCH_SIZE, workers=0)
+
+    def sentiment(texts):
+        return score_texts(engine, texts)
+
+    def keywords(texts):
+        return list(task_2.extract_keywords_batch(texts))
+
+    return {"sentiment": sentiment, "keywords": keywords}
+
+
+# -------------------------
+# Server
+# -------------------------
+class ModelServer:
+    """
+    Serves handlers ({op: fn(texts) -> results}) to any number of clients.
+    Each client connection gets a thread; calls into the handlers are
+    serialized, since they share one copy of each model.
+    """
+
+    def __init__(self, handlers, address=ADDRESS, authkey=None):
+        self.handlers = handlers
+        self.authkey = authkey or get_authkey(create=True)
+        if isinstance(address, str):
+            _remove_stale_socket(address)
+        self.listener = Listener(address, authkey=self.authkey)
+        self.address = self.listener.address
+        if isinstance(self.address, str):
+            os.chmod(self.address, 0o600)
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._serving = threading.Event()
+
+    def serve_forever(self):
+        self._serving.set()
+        try:
+            while not self._closed.is_set():
+                try:
+                    conn = self.listener.accept()
+                except Exception as e:
+                    if self._closed.is_set():
+                        break
+                    logging.warning(f"Rejected connection: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self.listener.close()
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if op == "ping":
+                    conn.send(("ok", sorted(self.handlers)))
+                    continue
+                if op == "shutdown":
+                    conn.send(("ok", None))
+                    self.close()
+                    return
+                handler = self.handlers.get(op)
+                if handler is None:
+                    conn.send(("error", f"unknown op {op!r}"))
+                    continue
+                try:
+                    with self._lock:
+                        result = handler(payload)
+                except Exception as e:
+                    logging.error(f"{op} failed: {e}")
+                    conn.send(("error", repr(e)))
+                else:
+                    conn.send(("ok", result))
+
+    def close(self):
+        """Stop accepting clients and let serve_forever return."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._serving.is_set():
+            # accept() doesn't notice the listener closing; wake it with a connection
+            try:
+                Client(self.address, authkey=self.authkey).close()
+            except OSError:
+                pass
+        else:
+            self.listener.close()
+
+
+# -------------------------
+# Client
+# -------------------------
+class ModelClient:
+    """Connection to a running ModelServer."""
+
+    def __init__(self, address=ADDRESS, authkey=None, request_size=REQUEST_SIZE):
+        if isinstance(address, str):
+            address = parse_address(address)
+        self.conn = Client(address, authkey=authkey or get_authkey())
+        self.request_size = request_size
+
+    def call(self, op, payload=None):
+        self.conn.send((op, payload))
+        status, result = self.conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"model server: {result}")
+        return result
+
+    def _batched(self, op, texts):
+        texts = list(texts)
+        results = []
+        for i in range(0, len(texts), self.request_size):
+            results.extend(self.call(op, texts[i:i + self.request_size]))
+        return results
+
+    def sentiment(self, texts):
+        return self._batched("sentiment", texts)
+
+    def keywords(self, texts):
+        return self._batched("keywords", texts)
+
+    def ping(self):
+        return self.call("ping")
+
+    def shutdown(self):
+        return self.call("shutdown")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the review models loaded and serve them locally.")
+    parser.add_argument("--address", default=format_address(ADDRESS),
+                        help="host:port, or a Unix socket path (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--preload", action="store_true",
+                        help="Load the models now instead of on the first request")
+    args = parser.parse_args()
+
+    handlers = default_handlers(args.batch_size)
+    if args.preload:
+        for op, handler in handlers.items():
+            logging.info(f"Preloading {op}...")
+            handler(["warm up"])
+
+    server = ModelServer(handlers, parse_address(args.address))
+    logging.info(f"Model server listening on {args.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Model server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+near_duplicates.py
+------------------
+Near-duplicate review detection with MinHash and LSH banding.
+
+Each distinct cleaned text becomes an item with a MinHash signature
+(num_perm hashes) over the byte k-shingles of its words; equal positions
+estimate the Jaccard similarity of the shingle sets. Case and punctuation
+are ignored, so texts differing only by a punctuation mark get equal
+signatures. Signatures are split into bands of rows
+chosen from the Jaccard threshold; items sharing any band bucket are
+candidates, and a candidate whose estimated similarity reaches the
+threshold joins the item's cluster (union-find, single linkage). Each new
+item is only compared with its bucket-mates, so adding n reviews costs
+about n * bands lookups rather than n^2 comparisons.
+
+Identical texts map to the same item through a stable 64-bit digest, so
+re-adding a corpus hashes nothing new and each new scrape only hashes its
+new texts. The index (signatures, digests, clusters) is saved to .npz;
+the band buckets are rebuilt from the signatures on load.
+
+A cluster's id is the item id of its earliest text.
+"""
+
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+THRESHOLD = 0.8            # Jaccard similarity at which texts count as near-duplicates
+NUM_PERM = 64              # MinHash permutations (signature length)
+SHINGLE_SIZE = 5           # bytes per shingle (at most 8)
+SEED = 1
+SHINGLES_PER_BLOCK = 50_000
+
+_PRIME = np.uint64(4_294_967_311)          # smallest prime above 2^32
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_FNV = np.uint64(0x100000001B3)
+_NON_WORD = re.compile(r"[\W_]+")
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz     # numpy < 2.0 only has trapz
+
+
+# -------------------------
+# MinHash
+# -------------------------
+def lsh_params(threshold, num_perm, fp_weight=0.5):
+    """
+    (bands, rows) with bands * rows <= num_perm minimizing the weighted
+    probability of missing pairs above threshold and catching pairs below it.
+    """
+    s = np.linspace(0, 1, 1001)
+    best, best_error = None, None
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        p = 1 - (1 - s ** rows) ** bands
+        below, above = s < threshold, s >= threshold
+        error = (fp_weight * _trapezoid(p[below], s[below])
+                 + (1 - fp_weight) * _trapezoid(1 - p[above], s[above]))
+        if best_error is None or error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+def text_digests(texts):
+    """Stable 64-bit digest per text (the same in every process)."""
+    return pd.util.hash_array(np.asarray([t if isinstance(t, str) else "" for t in texts], dtype=object))
+
+
+def _shingle_hashes(texts, k):
+    """32-bit hashes of every byte k-shingle, and each text's start offset into them."""
+    encoded = [t.encode("utf-8").ljust(k, b"\0") for t in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    counts = lengths - k + 1
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    byte_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    positions = np.repeat(byte_starts - starts, counts) + np.arange(counts.sum())
+    values = np.zeros(len(positions), dtype=np.uint64)
+    for j in range(k):
+        values |= data[positions + j] << np.uint64(8 * j)
+    return (values * _MIX) >> np.uint64(32), starts
+
+
+class MinHasher:
+    """MinHash signatures of byte k-shingles, num_perm universal hashes (a * x + b) mod p."""
+
+    def __init__(self, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=SEED):
+        if not 1 <= shingle_size <= 8:
+            raise ValueError("shingle_size must be between 1 and 8")
+        rng = np.random.default_rng(seed)
+        # a, b < 2^32 keep a * x + b below 2^64 for 32-bit x
+        self.a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+        self.shingle_size = shingle_size
+
+    def signatures(self, texts):
+        """(len(texts), num_perm) uint32 signatures."""
+        texts = [_NON_WORD.sub(" ", t.lower()).strip() if isinstance(t, str) else "" for t in texts]
+        out = np.empty((len(texts), len(self.a)), dtype=np.uint32)
+        per_text = np.fromiter((max(len(t), self.shingle_size) for t in texts), dtype=np.int64, count=len(texts))
+        block_of = np.cumsum(per_text) // SHINGLES_PER_BLOCK
+        for block in np.unique(block_of):
+            rows = np.flatnonzero(block_of == block)
+            hashes, starts = _shingle_hashes([texts[i] for i in rows], self.shingle_size)
+            permuted = (hashes[:, None] * self.a + self.b) % _PRIME
+            out[rows] = np.minimum.reduceat(permuted, starts, axis=0).astype(np.uint32)
+        return out
+
+
+def _band_keys(signatures, bands, rows):
+    """(n, bands) uint64 bucket keys: an FNV-style fold of each band's rows."""
+    keys = np.zeros((len(signatures), bands), dtype=np.uint64)
+    sig = signatures.astype(np.uint64)
+    for r in range(rows):
+        keys = (keys * _FNV) ^ sig[:, r::rows][:, :bands]
+    return keys
+
+
+# -------------------------
+# Index
+# -------------------------
+class NearDuplicateIndex:
+    """Persistent, incrementally updated MinHash LSH index of review texts."""
+
+    def __init__(self, threshold=THRESHOLD, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=SEED):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self.digests = np.empty(0, dtype=np.uint64)
+        self.parents = []
+        self._items = {}                                # digest -> item id
+        self._buckets = [{} for _ in range(self.bands)]  # band -> key -> [item ids]
+
+    def __len__(self):
+        return len(self.parents)
+
+    def find(self, item):
+        root = item
+        while self.parents[root] != root:
+            root = self.parents[root]
+        while self.parents[item] != root:
+            self.parents[item], item = root, self.parents[item]
+        return root
+
+    def _union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parents[max(a, b)] = min(a, b)
+
+    def _insert(self, item, keys):
+        candidates = set()
+        for band, key in enumerate(keys.tolist()):
+            members = self._buckets[band].setdefault(key, [])
+            candidates.update(members)
+            members.append(item)
+        if not candidates:
+            return
+        candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self.signatures[candidates] == self.signatures[item]).mean(axis=1)
+        for other in candidates[similarity >= self.threshold].tolist():
+            self._union(item, other)
+
+    def add(self, texts):
+        """Index texts; returns each text's item id (new texts get new items)."""
+        texts = list(texts)
+        digests = text_digests(texts)
+        codes, unique = pd.factorize(digests)
+        items = np.empty(len(unique), dtype=np.int64)
+        new = []
+        for i, digest in enumerate(unique.tolist()):
+            item = self._items.get(digest)
+            if item is None:
+                new.append(i)
+            else:
+                items[i] = item
+        if new:
+            first = len(self.parents)
+            first_text = np.unique(codes, return_index=True)[1]
+            signatures = self.hasher.signatures([texts[j] for j in first_text[new]])
+            self.signatures = np.concatenate([self.signatures, signatures])
+            self.digests = np.concatenate([self.digests, unique[new].astype(np.uint64)])
+            keys = _band_keys(signatures, self.bands, self.rows)
+            for offset, i in enumerate(new):
+                item = first + offset
+                items[i] = item
+                self._items[int(unique[i])] = item
+                self.parents.append(item)
+                self._insert(item, keys[offset])
+        return items[codes]
+
+    def clusters(self, items):
+        """Cluster id (earliest item of the cluster) for each item id."""
+        return np.fromiter((self.find(i) for i in np.asarray(items).tolist()), dtype=np.int64, count=len(items))
+
+    def assign(self, texts):
+        """add(texts), then the cluster id of every text."""
+        return self.clusters(self.add(texts))
+
+    # -------------------------
+    # Persistence
+    # -------------------------
+    def save(self, path):
+        params = {"threshold": self.threshold, "num_perm": self.num_perm,
+                  "shingle_size": self.shingle_size, "seed": self.seed}
+        with open(path, "wb") as f:
+            np.savez(f, signatures=self.signatures, digests=self.digests,
+                     parents=np.asarray(self.parents, dtype=np.int64), params=json.dumps(params))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            index = cls(**json.loads(str(data["params"])))
+            index.signatures = data["signatures"]
+            index.digests = data["digests"]
+            index.parents = data["parents"].tolist()
+        index._items = dict(zip(index.digests.tolist(), range(len(index.digests))))
+        keys = _band_keys(index.signatures, index.bands, index.rows)
+        for band in range(index.bands):
+            buckets = index._buckets[band]
+            for item, key in enumerate(keys[:, band].tolist()):
+                buckets.setdefault(key, []).append(item)
+        return index
+
+
+# -------------------------
+# DataFrames
+# -------------------------
+def annotate(df, index, column="review", collapse=False):
+    """
+    Add cluster_id (and cluster_size, rows of the cluster in df) to df.
+    With collapse=True only the first row of each cluster is kept.
+    """
+    df = df.copy()
+    df["cluster_id"] = index.assign(df[column].tolist()) if len(df) else np.empty(0, dtype=np.int64)
+    df["cluster_size"] = df.groupby("cluster_id")["cluster_id"].transform("size")
+    if collapse:
+        df = df[~df["cluster_id"].duplicated()]
+    return df
+
+
+def representatives(cluster_ids):
+    """
+    (positions of the first row of each cluster, cluster number of every
+    row), so per-cluster results r can be spread back with r[numbers].
+    """
+    numbers, _ = pd.factorize(pd.Series(cluster_ids))
+    return np.flatnonzero(~pd.Series(numbers).duplicated().to_numpy()), numbers
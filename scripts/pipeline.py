@@ -0,0 +1,330 @@
+"""
+pipeline.py
+-----------
+Runs the whole review pipeline in one process:
+
+    scrape → preprocess → analyze → load → score → themes → report
+
+Every stage is an importable function, so a cleaned DataFrame goes straight
+from preprocessing to the next stages in memory instead of through a
+subprocess and a file round trip. A stage is skipped when the content hash
+of its inputs matches the one recorded in data/pipeline_state.json after
+its last successful run (and its outputs still exist); --force reruns
+everything.
+
+Each stage and the steps inside it (preprocess.clean, score.write, ...)
+are timed and counted through instrumentation.py. A table of seconds, rows
+in/out, rows/s and cache hits is printed at the end, and the same metrics
+plus peak RSS are written to data/run_report.json and, in Prometheus text
+format, data/metrics.prom. --profile also saves a cProfile capture.
+
+Usage:
+    python scripts/pipeline.py
+    python scripts/pipeline.py --stages preprocess,load,score
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+
+import instrumentation
+from storage import read_columns, read_table, resolve, write_table
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+RAW_DIR = "data/raw/reviews"
+CLEANED_FILE = "data/cleaned_reviews.parquet"
+PROCESSED_FILE = "data/reviews_processed.parquet"
+THEMES_FILE = "data/bank_themes.csv"
+THEMES_CONFIG = "themes.yaml"
+STATE_FILE = "data/pipeline_state.json"
+RUN_REPORT_FILE = "data/run_report.json"
+METRICS_FILE = "data/metrics.prom"
+
+
+# -------------------------
+# Content hashing & state
+# -------------------------
+def _hash_file(path, digest):
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+
+def content_hash(paths, extra=""):
+    """
+    sha1 over the contents of files and directories (every file below a
+    directory, in sorted order, skipping dot files) plus an extra string.
+    """
+    digest = hashlib.sha1(extra.encode())
+    for path in paths:
+        path = resolve(path)
+        digest.update(path.encode())
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.startswith("."):
+                        continue
+                    full = os.path.join(root, name)
+                    digest.update(os.path.relpath(full, path).encode())
+                    _hash_file(full, digest)
+        elif os.path.exists(path):
+            _hash_file(path, digest)
+        else:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_FILE):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+class Stage:
+    """
+    A named pipeline step. run(ctx) does the work; inputs/outputs are paths.
+    A stage without inputs (inputs=None) always runs. fingerprint() can add
+    anything else the result depends on, e.g. a model version.
+    """
+
+    def __init__(self, name, run, inputs=None, outputs=(), fingerprint=None):
+        self.name = name
+        self.run = run
+        self.inputs = inputs
+        self.outputs = outputs
+        self.fingerprint = fingerprint
+
+    def digest(self):
+        if self.inputs is None:
+            return None
+        return content_hash(self.inputs, self.fingerprint() if self.fingerprint else "")
+
+    def outputs_exist(self):
+        return all(os.path.exists(resolve(path)) for path in self.outputs)
+
+
+# -------------------------
+# Stages
+# -------------------------
+def _frame(ctx, key, path, columns=None):
+    """A DataFrame an earlier stage left in memory, or read from disk if it was skipped."""
+    if ctx.get(key) is not None:
+        df = ctx[key]
+        return df[[c for c in columns if c in df.columns]] if columns else df
+    if columns:
+        available = read_columns(path)
+        columns = [c for c in columns if c in available]
+    return read_table(path, columns=columns)
+
+
+def _cache(ctx):
+    from sentiment_cache import SentimentCache
+    return None if ctx.get("no_cache") else SentimentCache()
+
+
+def _vader_fingerprint():
+    from incremental_scoring import VADER_MODEL_ID, vader_version
+    return f"{VADER_MODEL_ID}-{vader_version()}"
+
+
+def scrape(ctx):
+    import scrape_reviews
+    writer = scrape_reviews.PartitionWriter(RAW_DIR, export_csv=ctx.get("csv", False))
+    written, _ = scrape_reviews.stream_all(
+        writer, state=scrape_reviews.load_state(),
+        max_pages=ctx.get("max_pages", scrape_reviews.MAX_PAGES),
+        checkpoint=scrape_reviews.save_state
+    )
+    logging.info(f"Scraped {written} new reviews")
+
+
+def preprocess(ctx):
+    from preprocess import preprocess_reviews
+    ctx["cleaned"] = preprocess_reviews(RAW_DIR, CLEANED_FILE, export_csv=ctx.get("csv", False),
+                                        near_duplicates=ctx.get("near_duplicates"))
+
+
+def analyze(ctx):
+    from task_2_sentiment_thematic_analysis import process_reviews
+    df = _frame(ctx, "cleaned", CLEANED_FILE).copy()
+    cache = _cache(ctx)
+    try:
+        df = process_reviews(df, workers=ctx.get("workers", 1), cache=cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    write_table(df, PROCESSED_FILE, export_csv=ctx.get("csv", False))
+    ctx["processed"] = df
+
+
+def load(ctx):
+    from db import get_database
+    from insert_reviews import INPUT_COLUMNS, load_reviews
+    df = _frame(ctx, "cleaned", CLEANED_FILE, columns=INPUT_COLUMNS)
+    with get_database().connection() as conn:
+        stats = load_reviews(conn, df)
+    instrumentation.rows(rows_in=len(df), rows_out=stats['inserted'])
+    logging.info(f"Inserted {stats['inserted']} new reviews ({stats['rows_per_sec']:,.0f} rows/s)")
+
+
+def score(ctx):
+    from db import get_database
+    from incremental_scoring import VADER_MODEL_ID, score_incrementally, vader_version
+    from vader_scoring import VaderScorer, get_sentiment
+    cache = _cache(ctx)
+    scorer = VaderScorer()
+    database = get_database()
+    try:
+        with database.connection() as conn, database.spare_connection() as read_conn:
+            scored = score_incrementally(conn, get_sentiment, VADER_MODEL_ID, vader_version(),
+                                         cache=cache, score_many=scorer, read_conn=read_conn)
+    finally:
+        scorer.close()
+        if cache is not None:
+            cache.close()
+    instrumentation.rows(rows_out=scored)
+    logging.info(f"Scored {scored} reviews")
+
+
+def themes(ctx):
+    from db import get_database
+    from task_2_analysis import extract_themes, save_themes
+    database = get_database()
+    save_themes(database, extract_themes(database), THEMES_FILE)
+
+
+def report(ctx):
+    from db import get_database
+    from task_4_analysis import run_report
+    run_report(get_database(), THEMES_FILE)
+
+
+# Database stages hash the cleaned file they loaded from, so they are
+# skipped too when nothing upstream changed.
+STAGES = [
+    Stage("scrape", scrape, outputs=[RAW_DIR]),
+    Stage("preprocess", preprocess, inputs=[RAW_DIR], outputs=[CLEANED_FILE]),
+    Stage("analyze", analyze, inputs=[CLEANED_FILE, THEMES_CONFIG], outputs=[PROCESSED_FILE]),
+    Stage("load", load, inputs=[CLEANED_FILE]),
+    Stage("score", score, inputs=[CLEANED_FILE], fingerprint=_vader_fingerprint),
+    Stage("themes", themes, inputs=[CLEANED_FILE], outputs=[THEMES_FILE]),
+    Stage("report", report, inputs=[CLEANED_FILE, THEMES_FILE], fingerprint=_vader_fingerprint),
+]
+
+
+# -------------------------
+# Runner
+# -------------------------
+def run_pipeline(stages, ctx=None, state_file=STATE_FILE, force=False):
+    """
+    Run stages in order, skipping those whose inputs are unchanged since
+    their last successful run. Returns a list of {stage, status, seconds}.
+    """
+    ctx = {} if ctx is None else ctx
+    state = load_state(state_file)
+    timings = []
+    for stage in stages:
+        start = time.perf_counter()
+        digest = stage.digest()
+        if not force and digest is not None and state.get(stage.name) == digest and stage.outputs_exist():
+            status = "skipped"
+            logging.info(f"[{stage.name}] inputs unchanged, skipping")
+        else:
+            logging.info(f"[{stage.name}] running")
+            with instrumentation.stage(stage.name):
+                stage.run(ctx)
+            status = "ran"
+            if digest is not None:
+                state[stage.name] = digest
+                save_state(state, state_file)
+        timings.append({
+            "stage": stage.name, "status": status,
+            "seconds": round(time.perf_counter() - start, 3)
+        })
+    return timings
+
+
+def _cell(value, spec):
+    return format(value, spec) if value is not None else "-"
+
+
+def format_timings(timings, report=None):
+    """
+    One line per pipeline stage. With a run report (instrumentation), also
+    rows in/out, rows/s and cache hits, each stage's steps below it, and
+    the peak RSS.
+    """
+    stages = {s["stage"]: s for s in report["stages"]} if report else {}
+    header = f"{'stage':<24}{'status':<10}{'seconds':>10}"
+    if report:
+        header += f"{'rows in':>13}{'rows out':>13}{'rows/s':>13}{'cache hits':>13}"
+    lines = [header]
+
+    def line(name, status, seconds, metrics):
+        text = f"{name:<24}{status:<10}{seconds:>10.3f}"
+        if report:
+            metrics = metrics or {}
+            text += "".join(f" {cell:>12}" for cell in (
+                _cell(metrics.get("rows_in"), ",d"), _cell(metrics.get("rows_out"), ",d"),
+                _cell(metrics.get("rows_per_sec"), ",.0f"),
+                _cell(metrics.get("counters", {}).get("cache_hits"), ",d"),
+            ))
+        lines.append(text)
+
+    for t in timings:
+        line(t["stage"], t["status"], t["seconds"], stages.get(t["stage"]))
+        for name, metrics in stages.items():
+            if t["status"] == "ran" and name.startswith(f"{t['stage']}."):
+                line(f"  {name}", "", metrics["seconds"], metrics)
+    lines.append(f"{'total':<34}{sum(t['seconds'] for t in timings):>10.3f}")
+    if report and report["peak_rss_bytes"] is not None:
+        lines.append(f"peak RSS: {report['peak_rss_bytes'] / 2**20:,.1f} MiB")
+    return "\n".join(lines)
+
+
+def main():
+    names = [stage.name for stage in STAGES]
+    parser = argparse.ArgumentParser(description="Run the review pipeline in one process.")
+    parser.add_argument("--stages", default=",".join(names),
+                        help=f"Comma-separated stages to run, in pipeline order ({', '.join(names)})")
+    parser.add_argument("--force", action="store_true", help="Run stages even if their inputs are unchanged")
+    parser.add_argument("--csv", action="store_true", help="Also export stage outputs as CSV")
+    parser.add_argument("--max-pages", type=int, default=None,
+                        help="Scraper backfill pages per app (0 = no limit; default: the scraper's)")
+    parser.add_argument("--workers", type=int, default=1, help="Inference processes for analyze")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Don't reuse cached sentiment scores")
+    parser.add_argument("--near-duplicates", choices=["annotate", "collapse", "off"], default="annotate",
+                        help="Cluster near-duplicate reviews in preprocess so analyze scores one per cluster")
+    instrumentation.add_arguments(parser, RUN_REPORT_FILE, METRICS_FILE)
+    args = parser.parse_args()
+
+    selected = args.stages.split(",")
+    unknown = set(selected) - set(names)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    ctx = {"csv": args.csv, "workers": args.workers, "no_cache": args.no_cache,
+           "near_duplicates": None if args.near_duplicates == "off" else args.near_duplicates}
+    if args.max_pages is not None:
+        ctx["max_pages"] = args.max_pages or None
+    with instrumentation.from_args("pipeline", args) as run:
+        timings = run_pipeline([s for s in STAGES if s.name in selected], ctx, force=args.force)
+    print(format_timings(timings, run.report()))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,23 +10,41 @@ Tasks performed:
 - Clean text (lowercase, remove noise)
 - Validate rating values (1–5)
 - Standardize bank names
+- Optionally cluster near-duplicate texts (MinHash/LSH, see
+  near_duplicates.py): annotate rows with cluster_id/cluster_size, or keep
+  one row per cluster
 - Save cleaned file
 
-Input:  reviews.csv
-Output: cleaned_reviews.csv
+Input:  raw/reviews/ (partitioned Parquet from the scraper; or reviews.parquet / reviews.csv)
+Output: cleaned_reviews.parquet (plus cleaned_reviews.csv with --csv)
+
+Raw files larger than memory can be processed with --chunksize: chunks are
+de-duplicated against a set of row digests from earlier chunks, cleaned,
+validated and appended to the output one at a time.
+
+With --near-duplicates the LSH index is loaded from / saved to
+--index-file, so texts seen in earlier runs are not hashed again.
+
+Stages (read, dedupe, clean, near_duplicates, write) are timed and counted
+through instrumentation.py; see --metrics-json / --metrics-prom / --profile.
 """
 
+import argparse
 import pandas as pd
+import numpy as np
 import re
 import logging
-import yaml
-
-# Load config
-with open('config.yaml') as f:
-    config = yaml.safe_load(f)
+import os
+import instrumentation
+from instrumentation import stage, timed
+from near_duplicates import THRESHOLD, NearDuplicateIndex, annotate
+from storage import TableWriter, iter_chunks, read_table, write_table
 
-INPUT_FILE = "data/raw/reviews.csv"
-OUTPUT_FILE = "data/cleaned_reviews.csv"
+INPUT_FILE = "data/raw/reviews"
+OUTPUT_FILE = "data/cleaned_reviews.parquet"
+CHUNK_SIZE = 100_000
+NEAR_DUPLICATE_INDEX_FILE = "data/near_duplicate_index.npz"
+NEAR_DUPLICATE_MODES = ("annotate", "collapse")
 
 
 # -------------------------------------------------------
@@ -40,16 +58,33 @@ logging.basicConfig(
 # -------------------------------------------------------
 # Text Cleaning
 # -------------------------------------------------------
+URL_PATTERN = re.compile(r"http\S+|www\S+")
+SYMBOL_PATTERN = re.compile(r"[^a-z0-9.,!? ]")
+SPACE_PATTERN = re.compile(r"\s+")
+
+
 def clean_text(text):
     """Normalize text: lowercase, remove URLs, remove symbols, trim spaces."""
     if not isinstance(text, str):
         return ""
     text = text.lower()
-    text = re.sub(r"http\S+|www\S+", "", text)            # remove URLs
-    text = re.sub(r"[^a-z0-9.,!? ]", " ", text)           # remove emojis/symbols
-    text = re.sub(r"\s+", " ", text)                      # remove extra spaces
+    text = URL_PATTERN.sub("", text)                      # remove URLs
+    text = SYMBOL_PATTERN.sub(" ", text)                  # remove emojis/symbols
+    text = SPACE_PATTERN.sub(" ", text)                   # remove extra spaces
     return text.strip()
 
+
+def map_unique(series, func):
+    """
+    Apply func once per distinct value of a column and map the results back.
+    Review columns repeat a lot ("good", "nice app") and the bank column
+    holds only a handful of values, so this is much cheaper than .apply().
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    mapped = np.empty(len(uniques), dtype=object)
+    mapped[:] = [func(value) for value in uniques]
+    return pd.Series(mapped[codes], index=series.index, name=series.name)
+
 # -------------------------------------------------------
 # Bank Name Normalization
 # -------------------------------------------------------
@@ -65,35 +100,159 @@ def standardize_bank_name(bank):
 # -------------------------------------------------------
 # Main Preprocessing
 # -------------------------------------------------------
-def preprocess_reviews(input_file=INPUT_FILE, output_file=OUTPUT_FILE):
-    logging.info(f"Loading raw reviews from {input_file}")
-    df = pd.read_csv(input_file)
+def clean_reviews(df, drop_duplicates=True, verbose=True, near_duplicates=None, collapse=False):
+    """
+    Run every cleaning/validation step on an in-memory DataFrame of raw reviews.
+    With a NearDuplicateIndex, cleaned texts are clustered (and, with
+    collapse=True, reduced to one row per cluster).
+    """
+    log = logging.info if verbose else logging.debug
 
-    logging.info("Dropping duplicates")
-    df = df.drop_duplicates()
+    if drop_duplicates:
+        log("Dropping duplicates")
+        df = df.drop_duplicates()
 
-    logging.info("Normalizing dates")
+    log("Normalizing dates")
     df['date'] = pd.to_datetime(df['date'], errors='coerce').dt.strftime('%Y-%m-%d')
 
-    logging.info("Cleaning review text")
-    df['review'] = df['review'].apply(clean_text)
+    log("Cleaning review text")
+    df['review'] = map_unique(df['review'], clean_text)
 
-    logging.info("Removing empty reviews")
+    log("Removing empty reviews")
     df = df[df['review'].str.strip() != ""]
 
-    logging.info("Validating ratings (1–5)")
+    log("Validating ratings (1–5)")
     df = df[df['rating'].between(1,5)]
 
-    logging.info("Standardizing bank names")
-    df['bank'] = df['bank'].apply(standardize_bank_name)
+    log("Standardizing bank names")
+    df['bank'] = map_unique(df['bank'], standardize_bank_name)
+
+    if near_duplicates is not None:
+        log("Clustering near-duplicate reviews")
+        with stage("preprocess.near_duplicates", rows_in=len(df)) as s:
+            known = len(near_duplicates)
+            df = annotate(df, near_duplicates, collapse=collapse)
+            s.rows_out = len(df)
+            s.count("new_texts", len(near_duplicates) - known)    # texts the index had to hash
+    return df
+
+
+def load_near_duplicate_index(path=NEAR_DUPLICATE_INDEX_FILE, threshold=THRESHOLD):
+    """The saved index at path (if its threshold matches), else a new one."""
+    if os.path.exists(path):
+        index = NearDuplicateIndex.load(path)
+        if index.threshold == threshold:
+            return index
+        logging.info(f"{path} was built for threshold {index.threshold}; rebuilding")
+    return NearDuplicateIndex(threshold)
+
+
+def preprocess_reviews(input_file=INPUT_FILE, output_file=OUTPUT_FILE, export_csv=False,
+                       near_duplicates=None, threshold=THRESHOLD, index_file=NEAR_DUPLICATE_INDEX_FILE):
+    """near_duplicates: None, "annotate" or "collapse"."""
+    logging.info(f"Loading raw reviews from {input_file}")
+    with stage("preprocess.read") as s:
+        df = read_table(input_file)
+        s.rows_out = len(df)
+
+    index = load_near_duplicate_index(index_file, threshold) if near_duplicates else None
+    with stage("preprocess.clean", rows_in=len(df)) as s:
+        df = clean_reviews(df, near_duplicates=index, collapse=near_duplicates == "collapse")
+        s.rows_out = len(df)
+    if index is not None:
+        index.save(index_file)
+        logging.info(f"{df['cluster_id'].nunique()} near-duplicate clusters in {len(df)} reviews")
 
     logging.info(f"Saving cleaned reviews to {output_file}")
-    df.to_csv(output_file, index=False)
+    with stage("preprocess.write", rows_in=len(df)):
+        write_table(df, output_file, export_csv=export_csv)
     logging.info("Preprocessing complete")
     return df
 
+
+# -------------------------------------------------------
+# Streaming Preprocessing
+# -------------------------------------------------------
+def drop_seen_rows(chunk, seen):
+    """
+    Drop rows already in `seen` (digests of earlier rows) or repeated within
+    the chunk, then add the new digests to `seen`. Each distinct raw row
+    costs one 64-bit digest in memory, never the row itself.
+    """
+    # Hash the text form so a row hashes the same whatever the chunk's dtypes
+    digests = pd.util.hash_pandas_object(chunk.astype(str), index=False).to_numpy()
+    keep = ~pd.Series(digests).duplicated().to_numpy()
+    keep &= np.fromiter((d not in seen for d in digests.tolist()), dtype=bool, count=len(digests))
+    seen.update(digests[keep].tolist())
+    return chunk[keep]
+
+
+def preprocess_reviews_streaming(input_file=INPUT_FILE, output_file=OUTPUT_FILE,
+                                 chunksize=CHUNK_SIZE, export_csv=False, near_duplicates=None,
+                                 threshold=THRESHOLD, index_file=NEAR_DUPLICATE_INDEX_FILE):
+    """
+    Chunked version of preprocess_reviews for raw files larger than memory.
+    Peak memory is set by chunksize (plus one digest per distinct raw row,
+    and the near-duplicate index if enabled). Clusters are assigned as of
+    the chunk a row is in; collapse keeps a row only if no earlier row of
+    its cluster was written. Returns (rows_read, rows_written).
+    """
+    logging.info(f"Streaming raw reviews from {input_file} in chunks of {chunksize}")
+    seen = set()
+    rows_in = rows_out = 0
+    index = load_near_duplicate_index(index_file, threshold) if near_duplicates else None
+    written_clusters = set()
+
+    with TableWriter(output_file, export_csv=export_csv) as writer:
+        for chunk in timed(iter_chunks(input_file, chunksize), "preprocess.read"):
+            rows_in += len(chunk)
+            with stage("preprocess.dedupe", rows_in=len(chunk)) as s:
+                chunk = drop_seen_rows(chunk, seen)
+                s.rows_out = len(chunk)
+            with stage("preprocess.clean", rows_in=len(chunk)) as s:
+                chunk['rating'] = pd.to_numeric(chunk['rating'], errors='coerce')
+                chunk = clean_reviews(chunk, drop_duplicates=False, verbose=False, near_duplicates=index,
+                                      collapse=near_duplicates == "collapse")
+                chunk['rating'] = chunk['rating'].astype(int)
+                if near_duplicates == "collapse":
+                    chunk = chunk[~chunk['cluster_id'].isin(written_clusters)]
+                    written_clusters.update(chunk['cluster_id'].tolist())
+                s.rows_out = len(chunk)
+
+            with stage("preprocess.write", rows_in=len(chunk)):
+                writer.write(chunk)
+            rows_out += len(chunk)
+            logging.info(f"Processed {rows_in} rows, {rows_out} written")
+
+    if index is not None:
+        index.save(index_file)
+    logging.info(f"Preprocessing complete: {rows_out} cleaned reviews saved to {output_file}")
+    return rows_in, rows_out
+
+
 # -------------------------------------------------------
 # Run preprocessing if called directly
 # -------------------------------------------------------
 if __name__ == "__main__":
-    preprocess_reviews()
+    parser = argparse.ArgumentParser(description="Clean raw scraped reviews.")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--chunksize", type=int,
+                        help="Stream the input in chunks of this many rows")
+    parser.add_argument("--csv", action="store_true",
+                        help="Also export the output as CSV")
+    parser.add_argument("--near-duplicates", choices=NEAR_DUPLICATE_MODES,
+                        help="Cluster near-duplicate reviews: annotate rows, or keep one per cluster")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="Jaccard similarity at which reviews are near-duplicates")
+    parser.add_argument("--index-file", default=NEAR_DUPLICATE_INDEX_FILE)
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    options = {"export_csv": args.csv, "near_duplicates": args.near_duplicates,
+               "threshold": args.threshold, "index_file": args.index_file}
+    with instrumentation.from_args("preprocess", args):
+        if args.chunksize:
+            preprocess_reviews_streaming(args.input, args.output, args.chunksize, **options)
+        else:
+            preprocess_reviews(args.input, args.output, **options)
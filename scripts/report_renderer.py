@@ -0,0 +1,230 @@
+"""
+report_renderer.py
+------------------
+Headless, parallel and cached rendering of the task 4 figures, plus the
+single-file report bundle.
+
+Each figure is a Figure(name, kind, data): data is the small aggregate it
+is drawn from (label counts, a rating histogram, a bank's keywords). A
+figure's key is a sha1 of its kind, data and RENDER_VERSION; keys of the
+PNGs in the figures directory are kept in .render_cache.json, and figures
+whose key and file are unchanged are not drawn again.
+
+The rest are drawn with the non-interactive Agg backend in a process pool,
+one figure per task, so rendering hundreds of apps scales with cores.
+write_bundle() puts every figure (inlined as base64 PNG) and the report's
+tables into one self-contained HTML file.
+"""
+
+import base64
+import hashlib
+import html
+import json
+import numbers
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+RENDER_VERSION = 1         # bump when a renderer changes, to redraw everything
+CACHE_FILE = ".render_cache.json"
+BUNDLE_FILE = "report.html"
+
+
+class Figure:
+    def __init__(self, name, kind, data):
+        self.name = name
+        self.kind = kind
+        self.data = data
+
+    @property
+    def filename(self):
+        return f"{self.name}.png"
+
+    def key(self):
+        payload = json.dumps([RENDER_VERSION, self.kind, self.data], sort_keys=True, default=_plain)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _plain(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, numbers.Number):     # Decimal from the database
+        return float(value)
+    raise TypeError(f"Can't hash {type(value).__name__} figure data")
+
+
+# -------------------------
+# Figures of the report
+# -------------------------
+def report_figures(summary, themes, avg_ratings, avg_sentiment, label_columns, ratings):
+    """The task 4 figures, each with only the aggregate it needs."""
+    banks = summary["bank_name"].tolist()
+    figures = [
+        Figure("sentiment_distribution", "sentiment_distribution", {
+            label: dict(zip(banks, summary[column].tolist())) for label, column in label_columns.items()
+        }),
+        Figure("rating_distribution", "rating_distribution", {
+            bank: [row[f"rating_{r}"] for r in ratings] for bank, (_, row) in zip(banks, summary.iterrows())
+        }),
+    ]
+    for bank_name, keywords in zip(themes["bank_name"], themes["top_keywords"]):
+        if isinstance(keywords, str) and keywords.strip():
+            figures.append(Figure(f"keyword_cloud_{bank_name}", "keyword_cloud",
+                                  {"bank": bank_name, "keywords": keywords}))
+    figures.append(Figure("average_rating_per_bank", "average_rating", avg_ratings.to_dict()))
+    figures.append(Figure("average_sentiment_per_bank", "average_sentiment", avg_sentiment.to_dict()))
+    return figures
+
+
+# -------------------------
+# Renderers (run in worker processes)
+# -------------------------
+def _sentiment_distribution(plt, data):
+    import pandas as pd
+    import seaborn as sns
+    counts = pd.DataFrame([
+        {"bank_name": bank, "sentiment_label": label, "count": count}
+        for label, per_bank in data.items() for bank, count in per_bank.items()
+    ])
+    plt.figure(figsize=(8, 5))
+    sns.barplot(data=counts, x="bank_name", y="count", hue="sentiment_label")
+    plt.title("Sentiment Distribution per Bank")
+    plt.xlabel("Bank")
+    plt.ylabel("Number of Reviews")
+    plt.xticks(rotation=15)
+
+
+def _rating_distribution(plt, data):
+    from rollups import box_stats
+    plt.figure(figsize=(8, 5))
+    plt.gca().bxp([box_stats(counts, label=bank) for bank, counts in data.items()], showfliers=True)
+    plt.title("Rating Distribution per Bank")
+    plt.xlabel("Bank")
+    plt.ylabel("Rating")
+    plt.xticks(rotation=15)
+
+
+def _keyword_cloud(plt, data):
+    from wordcloud import WordCloud
+    wordcloud = WordCloud(width=800, height=400, background_color="white").generate(data["keywords"])
+    plt.figure(figsize=(10, 5))
+    plt.imshow(wordcloud, interpolation="bilinear")
+    plt.axis("off")
+    plt.title(f"Top Keywords – {data['bank']}")
+
+
+def _average_bar(title, ylabel, ylim, palette):
+    def draw(plt, data):
+        import seaborn as sns
+        plt.figure(figsize=(8, 5))
+        sns.barplot(x=list(data), y=list(data.values()), hue=list(data), palette=palette, legend=False)
+        plt.title(title)
+        plt.xlabel("Bank")
+        plt.ylabel(ylabel)
+        plt.ylim(*ylim)
+        plt.xticks(rotation=15)
+    return draw
+
+
+RENDERERS = {
+    "sentiment_distribution": _sentiment_distribution,
+    "rating_distribution": _rating_distribution,
+    "keyword_cloud": _keyword_cloud,
+    "average_rating": _average_bar("Average Rating per Bank", "Average Rating", (0, 5), "Blues_d"),
+    "average_sentiment": _average_bar("Average Sentiment Score per Bank", "Average Sentiment Score",
+                                      (0, 1), "Greens_d"),
+}
+
+
+def _use_agg():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def render_one(kind, data, path):
+    """Draw one figure to path with the Agg backend."""
+    _use_agg()
+    import matplotlib.pyplot as plt
+    try:
+        RENDERERS[kind](plt, data)
+        plt.savefig(path)
+    finally:
+        plt.close("all")
+    return path
+
+
+# -------------------------
+# Cache and pool
+# -------------------------
+def _load_cache(figures_dir):
+    path = os.path.join(figures_dir, CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_cache(cache, figures_dir):
+    path = os.path.join(figures_dir, CACHE_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def render_figures(figures, figures_dir, workers=None, force=False):
+    """
+    Draw the figures whose data changed since they were last drawn into
+    figures_dir. workers: pool size (default one per core; 0 = this
+    process). Returns (names drawn, names skipped).
+    """
+    os.makedirs(figures_dir, exist_ok=True)
+    cache = _load_cache(figures_dir)
+    todo, skipped = [], []
+    for figure in figures:
+        path = os.path.join(figures_dir, figure.filename)
+        if not force and cache.get(figure.filename) == figure.key() and os.path.exists(path):
+            skipped.append(figure.name)
+        else:
+            todo.append(figure)
+
+    jobs = [(figure.kind, figure.data, os.path.join(figures_dir, figure.filename)) for figure in todo]
+    workers = os.cpu_count() or 1 if workers is None else workers
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            render_one(*job)
+    else:
+        with ProcessPoolExecutor(min(workers, len(jobs)), initializer=_use_agg) as pool:
+            list(pool.map(render_one, *zip(*jobs)))
+
+    for figure in todo:
+        cache[figure.filename] = figure.key()
+    _save_cache(cache, figures_dir)
+    return [figure.name for figure in todo], skipped
+
+
+# -------------------------
+# Bundle
+# -------------------------
+def write_bundle(path, figures, figures_dir, tables=(), title="Bank Review Report"):
+    """One self-contained HTML file: tables ((heading, DataFrame) pairs), then every figure."""
+    parts = [
+        "<!DOCTYPE html>", "<html><head><meta charset='utf-8'>",
+        f"<title>{html.escape(title)}</title>",
+        "<style>body{font-family:sans-serif;margin:2em}img{max-width:100%}"
+        "table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:4px}</style>",
+        "</head><body>", f"<h1>{html.escape(title)}</h1>",
+    ]
+    for heading, frame in tables:
+        parts.append(f"<h2>{html.escape(heading)}</h2>")
+        parts.append(frame.to_html(index=False, border=0))
+    parts.append("<h2>Figures</h2>")
+    for figure in figures:
+        with open(os.path.join(figures_dir, figure.filename), "rb") as f:
+            encoded = base64.b64encode(f.read()).decode("ascii")
+        parts.append(f"<figure><img alt='{html.escape(figure.name)}' src='data:image/png;base64,{encoded}'>"
+                     f"<figcaption>{html.escape(figure.name)}</figcaption></figure>")
+    parts.append("</body></html>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+    return path
@@ -0,0 +1,182 @@
+"""
+rollups.py
+----------
+Reporting queries that read pre-aggregated rollups instead of the reviews
+table.
+
+The 0004_review_rollups migration keeps review_daily_rollup (per bank and
+day: counts, rating sum and histogram, sentiment sum and label counts) up
+to date with statement-level triggers on reviews, and bank_review_summary
+rolls it up per bank. Report queries therefore cost banks x days, not
+reviews.
+
+Example texts per bank come from a TABLESAMPLE SYSTEM block sample sized
+from the rollup counts, ranked per bank with row_number(); only banks the
+sample left short are re-queried in full.
+
+    python scripts/rollups.py            # reinstall the rollup (migrate.py installs it)
+    python scripts/rollups.py --rebuild  # recount it from reviews
+"""
+
+import argparse
+
+import numpy as np
+
+from migrate import migrate
+
+ROLLUP_SQL = "sql/migrations/0004_review_rollups.sql"
+SAMPLE_OVERSAMPLE = 4      # expected sampled rows per bank, as a multiple of n
+RATINGS = (1, 2, 3, 4, 5)
+LABEL_COLUMNS = {"positive": "n_positive", "neutral": "n_neutral", "negative": "n_negative"}
+
+
+# -------------------------
+# Install
+# -------------------------
+def install_rollups(conn, sql_file=ROLLUP_SQL):
+    """Create (or replace) the rollup table, triggers and view, and recount."""
+    with open(sql_file, encoding="utf-8") as f:
+        ddl = f.read()
+    cur = conn.cursor()
+    cur.execute(ddl)
+    conn.commit()
+    cur.close()
+
+
+def ensure_rollups(conn):
+    """Apply pending migrations (the rollup is one). Returns True if any were applied."""
+    return bool(migrate(conn))
+
+
+def rebuild_rollups(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT rebuild_review_rollup()")
+    conn.commit()
+    cur.close()
+
+
+# -------------------------
+# Queries
+# -------------------------
+def bank_summary(database):
+    """One row per bank: counts, averages, label counts and rating histogram."""
+    return database.read_frame("SELECT * FROM bank_review_summary ORDER BY bank_id")
+
+
+def sample_percent(counts, n, oversample=SAMPLE_OVERSAMPLE):
+    """
+    TABLESAMPLE SYSTEM percentage that is expected to return
+    oversample * n rows per bank, given {bank_id: matching rows}.
+    None when the sample would be (nearly) the whole table.
+    """
+    total = sum(counts.values())
+    if not total:
+        return None
+    percent = 100.0 * oversample * n * len(counts) / total
+    return None if percent >= 50 else percent
+
+
+_SAMPLE_SQL = """
+    SELECT bank_id, review_text FROM (
+        SELECT bank_id, review_text,
+               row_number() OVER (PARTITION BY bank_id ORDER BY random()) AS pick
+        FROM reviews {tablesample}
+        WHERE sentiment_label = %(label)s AND bank_id = ANY(%(bank_ids)s)
+    ) ranked
+    WHERE pick <= %(n)s
+"""
+
+
+def _ranked_sample(database, label, bank_ids, n, percent=None):
+    tablesample = f"TABLESAMPLE SYSTEM ({percent:.6f})" if percent is not None else ""
+    samples = {}
+    for bank_id, text in database.iter_rows(
+        _SAMPLE_SQL.format(tablesample=tablesample),
+        {"label": label, "bank_ids": [int(b) for b in bank_ids], "n": n}
+    ):
+        samples.setdefault(bank_id, []).append(text)
+    return samples
+
+
+def sample_reviews(database, summary, label, n):
+    """
+    Up to n random review texts with the given sentiment label per bank
+    ({bank_id: [text]}), using the summary's label counts to size a block
+    sample. Block sampling picks whole pages, so texts are random but not
+    independent draws.
+    """
+    counts = {
+        int(bank_id): int(count)
+        for bank_id, count in zip(summary["bank_id"], summary[LABEL_COLUMNS[label]])
+    }
+    samples = {bank_id: [] for bank_id in counts}
+    wanted = [bank_id for bank_id, count in counts.items() if count]
+    percent = sample_percent({b: counts[b] for b in wanted}, n)
+    if percent is not None:
+        samples.update(_ranked_sample(database, label, wanted, n, percent))
+        wanted = [b for b in wanted if len(samples[b]) < min(n, counts[b])]
+    if wanted:
+        samples.update(_ranked_sample(database, label, wanted, n))
+    return samples
+
+
+# -------------------------
+# Rating distributions
+# -------------------------
+def _quantile(values, cumulative, q):
+    """np.percentile(linear) of the data described by values/cumulative counts."""
+    position = q * (cumulative[-1] - 1)
+    lo, hi = int(np.floor(position)), int(np.ceil(position))
+    at = lambda i: values[np.searchsorted(cumulative, i, side="right")]
+    return at(lo) + (at(hi) - at(lo)) * (position - lo)
+
+
+def box_stats(counts, values=RATINGS, whis=1.5, label=None):
+    """
+    Box plot statistics (matplotlib's Axes.bxp format) of the data that has
+    counts[i] occurrences of values[i], without expanding it. Matches
+    matplotlib.cbook.boxplot_stats on the expanded data, except that each
+    flier value is listed once.
+    """
+    values, counts = np.asarray(values, dtype=float), np.asarray(counts, dtype=np.int64)
+    present = counts > 0
+    values, counts = values[present], counts[present]
+    if not len(values):
+        return {"label": label, "mean": np.nan, "med": np.nan, "q1": np.nan, "q3": np.nan,
+                "iqr": np.nan, "whislo": np.nan, "whishi": np.nan, "fliers": np.array([])}
+    cumulative = np.cumsum(counts)
+    q1, med, q3 = (_quantile(values, cumulative, q) for q in (0.25, 0.5, 0.75))
+    iqr = q3 - q1
+    inside_hi = values[values <= q3 + whis * iqr]
+    inside_lo = values[values >= q1 - whis * iqr]
+    whishi = q3 if not len(inside_hi) or inside_hi.max() < q3 else inside_hi.max()
+    whislo = q1 if not len(inside_lo) or inside_lo.min() > q1 else inside_lo.min()
+    return {
+        "label": label,
+        "mean": float(np.dot(values, counts) / cumulative[-1]),
+        "med": med, "q1": q1, "q3": q3, "iqr": iqr,
+        "whislo": whislo, "whishi": whishi,
+        "fliers": values[(values < whislo) | (values > whishi)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Install or rebuild the review rollup tables.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Recount the rollup from reviews instead of reinstalling it")
+    args = parser.parse_args()
+
+    from db import connect
+    conn = connect()
+    try:
+        if args.rebuild:
+            rebuild_rollups(conn)
+        else:
+            install_rollups(conn)
+    finally:
+        conn.close()
+    print("Review rollup rebuilt." if args.rebuild else "Review rollup installed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,50 @@
 """
 scrape_reviews.py
 -----------------
-Scrapes reviews for three Ethiopian banks and saves them to CSV.
-Optionally, integrates preprocessing to produce cleaned_reviews.csv.
+Scrapes reviews for three Ethiopian banks and streams them to disk as an
+append-only, partitioned Parquet dataset:
+
+    data/raw/reviews/<app_id>/<YYYY-MM-DD>/part-<n>.parquet
+
+(plus a CSV copy of every part under data/raw/reviews_csv/ with --csv,
+kept out of the dataset directory, which readers treat as all Parquet). Every page of reviews is
+written to new part files as soon as it is fetched, and only then is the
+app's checkpoint in data/raw/scrape_state.json advanced, so memory stays
+flat however many pages are scraped and an interrupted run resumes from
+its last written page. Optionally, integrates preprocessing to produce
+cleaned_reviews.parquet.
+
+Apps are scraped concurrently (thread pool, one shared rate limiter since
+every app lives on the same host) and each app is paged through with
+continuation tokens. Per app, the state file keeps:
+- newest_seen: timestamp of the newest review fetched so far; later runs
+  stop as soon as they reach it, so they only fetch new reviews
+- head_token / head_newest: where an unfinished pass over new reviews
+  stopped, and the newest review it had seen
+- backfill_token: where a page-limited run stopped, so older reviews can be
+  fetched further back on the next run
+
+Rate-limit waits, page fetches and part writes are timed as the
+scrape.rate_limit, scrape.fetch and scrape.write stages (instrumentation.py;
+fetch and wait times are summed over the scraper threads).
 """
 
 from google_play_scraper import reviews, Sort
+from google_play_scraper.features.reviews import _ContinuationToken
+import argparse
+import itertools
+import json
+import os
+import queue
+import threading
+import time
 import pandas as pd
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import subprocess
+import instrumentation
+from instrumentation import stage
+from storage import write_table
 
 # -------------------------
 # Logging
@@ -26,60 +61,324 @@ APPS = [
 ]
 
 REVIEWS_PER_APP = 400
-RAW_OUTPUT_CSV = "data/raw/reviews.csv"
+PAGE_SIZE = 200
+MAX_PAGES = REVIEWS_PER_APP // PAGE_SIZE   # backfill pages per app per run
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = 2.0
+RAW_OUTPUT_DIR = "data/raw/reviews"
+RAW_CSV_DIR = "data/raw/reviews_csv"
+STATE_FILE = "data/raw/scrape_state.json"
+QUEUE_PAGES = 8   # fetched pages waiting to be written, across all apps
+
+
+# -------------------------
+# Rate limiting & state
+# -------------------------
+class RateLimiter:
+    """Thread-safe limiter: at most `rate` requests per second across all threads."""
+
+    def __init__(self, rate=REQUESTS_PER_SECOND):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_FILE):
+    """Write the state atomically so an interrupted run never leaves it half-written."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def token_to_dict(token):
+    if token is None or token.token is None:
+        return None
+    return {slot: getattr(token, slot) for slot in _ContinuationToken.__slots__}
+
+
+def token_from_dict(data):
+    return _ContinuationToken(**data) if data else None
 
 
 # -------------------------
 # Scraping Function
 # -------------------------
-def scrape_app_reviews(app_id, app_name, count=REVIEWS_PER_APP):
-    """Scrape reviews for a single app."""
+def to_record(r, app_name):
+    return {
+        "review": r["content"],
+        "rating": r["score"],
+        "date": r["at"].strftime("%Y-%m-%d"),
+        "bank": app_name,
+        "source": "Google Play"
+    }
+
+
+def _pages(app_id, fetch, limiter, page_size, token=None):
+    """Yield (reviews, token) pages, following continuation tokens until they run out."""
+    while True:
+        with stage("scrape.rate_limit"):
+            limiter.wait()
+        with stage("scrape.fetch") as s:
+            result, token = fetch(
+                app_id,
+                lang="en",
+                country="et",
+                sort=Sort.NEWEST,
+                count=page_size,
+                continuation_token=token
+            )
+            s.rows_out = len(result)
+            s.count("pages")
+        yield result, token
+        if not result or token is None or token.token is None:
+            return
+
+
+def _exhausted(result, token):
+    return not result or token is None or token.token is None
+
+
+def iter_app_reviews(app_id, app_name, state=None, fetch=reviews, limiter=None,
+                     page_size=PAGE_SIZE, max_pages=MAX_PAGES):
+    """
+    Scrape one app, yielding (records, state) per page. state is this app's
+    entry from the state file; the yielded state is the checkpoint to save
+    once that page's records are on disk. max_pages=None follows
+    continuation tokens to the end.
+    """
+    state = dict(state or {})
+    limiter = limiter or RateLimiter(rate=None)
+    newest_seen = datetime.fromisoformat(state["newest_seen"]) if state.get("newest_seen") else None
+    head_newest = datetime.fromisoformat(state["head_newest"]) if state.get("head_newest") else None
+    fetched = 0
+
+    # New reviews: from the top (or where an interrupted run stopped) until
+    # we reach what the last completed run saw
+    pages = 0
+    head = token_from_dict(state.get("head_token"))
+    for result, head in _pages(app_id, fetch, limiter, page_size, head):
+        pages += 1
+        fresh = [r for r in result if newest_seen is None or r["at"] > newest_seen]
+        for r in fresh:
+            if head_newest is None or r["at"] > head_newest:
+                head_newest = r["at"]
+        done = len(fresh) < len(result) or _exhausted(result, head)
+        # A first run is a backfill, so it is page-limited
+        limited = newest_seen is None and max_pages and pages >= max_pages
+        if done or limited:
+            if head_newest is not None:
+                state["newest_seen"] = head_newest.isoformat()
+            if newest_seen is None:
+                state["backfill_token"] = None if done else token_to_dict(head)
+            state["head_token"] = state["head_newest"] = None
+        else:
+            state["head_token"] = token_to_dict(head)
+            state["head_newest"] = head_newest.isoformat() if head_newest else None
+        fetched += len(fresh)
+        yield [to_record(r, app_name) for r in fresh], dict(state)
+        if done or limited:
+            break
+
+    # Older reviews: continue a backfill an earlier run left unfinished
+    backfill = token_from_dict(state.get("backfill_token")) if newest_seen else None
+    if backfill is not None:
+        pages = 0
+        for result, backfill in _pages(app_id, fetch, limiter, page_size, backfill):
+            pages += 1
+            state["backfill_token"] = token_to_dict(backfill)
+            fetched += len(result)
+            yield [to_record(r, app_name) for r in result], dict(state)
+            if max_pages and pages >= max_pages:
+                break
+
+    logging.info(f"{app_name}: {fetched} reviews")
+
+
+def scrape_app_reviews(app_id, app_name, state=None, fetch=reviews, limiter=None,
+                       page_size=PAGE_SIZE, max_pages=MAX_PAGES):
+    """
+    Scrape one app into memory. Returns (records, new_state); on an error
+    the records scraped so far are dropped and the old state is returned.
+    """
+    records = []
+    new_state = dict(state or {})
     try:
-        result, _ = reviews(
-            app_id,
-            lang="en",
-            country="et",
-            sort=Sort.NEWEST,
-            count=count
-        )
-        reviews_list = []
-        for r in result:
-            reviews_list.append({
-                "review": r["content"],
-                "rating": r["score"],
-                "date": r["at"].strftime("%Y-%m-%d"),
-                "bank": app_name,
-                "source": "Google Play"
-            })
-        return reviews_list
+        for page, new_state in iter_app_reviews(app_id, app_name, state, fetch, limiter,
+                                                page_size, max_pages):
+            records.extend(page)
     except Exception as e:
         logging.error(f"Could not scrape {app_name}: {e}")
-        return []
+        return [], dict(state or {})
+    return records, new_state
+
+
+def scrape_all(apps=APPS, state=None, fetch=reviews, max_workers=MAX_WORKERS,
+               rate=REQUESTS_PER_SECOND, page_size=PAGE_SIZE, max_pages=MAX_PAGES):
+    """Scrape every app concurrently into memory. Returns (records, new_state)."""
+    state = dict(state or {})
+    limiter = RateLimiter(rate)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            app["id"]: pool.submit(
+                scrape_app_reviews, app["id"], app["name"], state.get(app["id"]),
+                fetch, limiter, page_size, max_pages
+            )
+            for app in apps
+        }
+        all_reviews = []
+        for app_id, future in futures.items():
+            app_reviews, state[app_id] = future.result()
+            all_reviews.extend(app_reviews)
+    return all_reviews, state
+
 
 # -------------------------
-# Main Script
+# Streaming to disk
 # -------------------------
-def main():
-    all_reviews = []
+class PartitionWriter:
+    """
+    Append-only writer for <root>/<app_id>/<YYYY-MM-DD>/part-<n>.parquet.
+    Each write creates new part files (never rewrites old ones), written to
+    a temporary name and renamed into place so readers never see a partial file.
+    With export_csv, each part is also copied to the same layout under
+    csv_root (default: <root>_csv), outside the Parquet dataset.
+    """
 
-    for app in APPS:
-        logging.info(f"Scraping reviews for {app['name']}...")
-        app_reviews = scrape_app_reviews(app["id"], app["name"])
-        all_reviews.extend(app_reviews)
+    def __init__(self, root=RAW_OUTPUT_DIR, export_csv=False, csv_root=None):
+        self.root = str(root)
+        self.export_csv = export_csv
+        self.csv_root = str(csv_root) if csv_root else self.root.rstrip("/\\") + "_csv"
+        self._run = time.strftime("%Y%m%dT%H%M%S")
+        self._seq = itertools.count()
 
-    df = pd.DataFrame(all_reviews)
-    logging.info(f"Collected {len(df)} reviews.")
+    def write(self, app_id, records):
+        """Write one batch of records; returns the paths of the new part files."""
+        paths = []
+        if not records:
+            return paths
+        df = pd.DataFrame(records)
+        for date, part in df.groupby("date", sort=True):
+            directory = os.path.join(self.root, app_id, date)
+            os.makedirs(directory, exist_ok=True)
+            name = f"part-{self._run}-{next(self._seq):05d}.parquet"
+            path = os.path.join(directory, name)
+            tmp = os.path.join(directory, f".{name}")   # dot files are skipped by dataset readers
+            write_table(part.reset_index(drop=True), tmp)
+            os.replace(tmp, path)
+            if self.export_csv:
+                csv_dir = os.path.join(self.csv_root, app_id, date)
+                os.makedirs(csv_dir, exist_ok=True)
+                part.to_csv(os.path.join(csv_dir, os.path.splitext(name)[0] + ".csv"), index=False)
+            paths.append(path)
+        return paths
 
-    # Save raw CSV
-    df.to_csv(RAW_OUTPUT_CSV, index=False)
-    logging.info(f"Saved raw reviews to {RAW_OUTPUT_CSV}")
 
-    # Optional: Run preprocessing automatically
-    try:
-        subprocess.run(["python", "scripts/preprocess.py"], check=True)
-        logging.info("Preprocessing complete. Cleaned CSV saved.")
-    except Exception as e:
-        logging.error(f"Could not run preprocessing: {e}")
+def stream_all(writer, apps=APPS, state=None, fetch=reviews, max_workers=MAX_WORKERS,
+               rate=REQUESTS_PER_SECOND, page_size=PAGE_SIZE, max_pages=MAX_PAGES,
+               checkpoint=None, queue_pages=QUEUE_PAGES):
+    """
+    Scrape every app concurrently, writing each page through `writer` as it
+    arrives and then calling checkpoint(state) with the state covering it.
+    Scraper threads hand pages over a bounded queue, so at most queue_pages
+    pages are held in memory. Returns (reviews written, new_state).
+    """
+    state = dict(state or {})
+    start = {app["id"]: state.get(app["id"]) for app in apps}
+    limiter = RateLimiter(rate)
+    pages = queue.Queue(maxsize=queue_pages)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce(app):
+        try:
+            for records, app_state in iter_app_reviews(app["id"], app["name"], start[app["id"]],
+                                                       fetch, limiter, page_size, max_pages):
+                if not put((app["id"], records, app_state)):
+                    return
+        except Exception as e:
+            logging.error(f"Could not scrape {app['name']}: {e}")
+        finally:
+            put(done)
+
+    written = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for app in apps:
+            pool.submit(produce, app)
+        try:
+            remaining = len(apps)
+            while remaining:
+                item = pages.get()
+                if item is done:
+                    remaining -= 1
+                    continue
+                app_id, records, state[app_id] = item
+                with stage("scrape.write", rows_in=len(records)):
+                    writer.write(app_id, records)
+                written += len(records)
+                if checkpoint is not None:
+                    checkpoint(dict(state))
+        finally:
+            # Unblock scraper threads if writing failed
+            stop.set()
+    return written, state
+
+# -------------------------
+# Main Script
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Scrape Google Play reviews.")
+    parser.add_argument("--csv", action="store_true", help="Also export the raw reviews as CSV")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES,
+                        help=f"Backfill pages of {PAGE_SIZE} reviews per app per run (0 = no limit)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND,
+                        help="Max requests per second to Google Play")
+    parser.add_argument("--no-preprocess", action="store_true",
+                        help="Only scrape; don't clean the raw reviews afterwards")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumentation.from_args("scrape", args):
+        logging.info(f"Scraping reviews for {len(APPS)} apps...")
+        writer = PartitionWriter(RAW_OUTPUT_DIR, export_csv=args.csv, csv_root=RAW_CSV_DIR)
+        with stage("scrape") as s:
+            written, _ = stream_all(
+                writer, state=load_state(), max_workers=args.workers, rate=args.rate,
+                max_pages=args.max_pages or None, checkpoint=save_state
+            )
+            s.rows_out = written
+        logging.info(f"Saved {written} new reviews under {RAW_OUTPUT_DIR}")
+
+        # Optional: Run preprocessing in this process (see pipeline.py for the full pipeline)
+        if not args.no_preprocess:
+            from preprocess import preprocess_reviews
+            with stage("preprocess"):
+                preprocess_reviews(RAW_OUTPUT_DIR, export_csv=args.csv)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
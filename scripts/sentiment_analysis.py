@@ -1,58 +1,45 @@
 # sentiment_analysis.py
-import pandas as pd
-import psycopg2
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import argparse
+import instrumentation
+from chunk_pipeline import QUEUE_DEPTH
+from db import get_database
+from incremental_scoring import CHUNK_SIZE, VADER_MODEL_ID, score_incrementally, vader_version
+from sentiment_cache import SentimentCache
+from vader_scoring import VaderScorer, get_sentiment
 
-# --- CONFIGURATION ---
-DB_HOST = "localhost"
-DB_NAME = "bank_reviews"
-DB_USER = "postgres"
-DB_PASS = "1234beko"  # Replace with your actual password
 
-# --- CONNECT TO POSTGRES ---
-conn = psycopg2.connect(
-    host=DB_HOST,
-    database=DB_NAME,
-    user=DB_USER,
-    password=DB_PASS
-)
-cur = conn.cursor()
+def main():
+    parser = argparse.ArgumentParser(description="Score review sentiment with VADER.")
+    parser.add_argument("--full", action="store_true",
+                        help="Rescore every review, not only new or changed ones")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--queue-depth", type=int, default=QUEUE_DEPTH,
+                        help="Chunks buffered between reading, scoring and writing")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Don't reuse cached scores for previously seen texts")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="VADER processes (default: one per core; 0 = this process)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
 
-# --- LOAD REVIEWS ---
-df = pd.read_sql("SELECT review_id, review_text FROM reviews", conn)
-print(f"Loaded {len(df)} reviews.")
+    # --- ANALYZE AND UPDATE DATABASE (connection settings from config.yaml) ---
+    cache = None if args.no_cache else SentimentCache()
+    scorer = VaderScorer(args.workers)
+    try:
+        database = get_database()
+        with instrumentation.from_args("score", args), database.connection() as conn, \
+                database.spare_connection() as read_conn:
+            scored = score_incrementally(
+                conn, get_sentiment, VADER_MODEL_ID, vader_version(),
+                chunk_size=args.chunk_size, full=args.full, cache=cache, score_many=scorer,
+                read_conn=read_conn, queue_depth=args.queue_depth
+            )
+    finally:
+        scorer.close()
+        if cache is not None:
+            cache.close()
+    print(f"Sentiment analysis completed and database updated ({scored} reviews scored).")
 
-# --- INITIALIZE VADER ---
-analyzer = SentimentIntensityAnalyzer()
 
-# --- FUNCTION TO GET SENTIMENT ---
-def get_sentiment(text):
-    if not text:
-        return "neutral", 0
-    scores = analyzer.polarity_scores(text)
-    compound = scores['compound']
-    if compound >= 0.05:
-        return "positive", compound
-    elif compound <= -0.05:
-        return "negative", compound
-    else:
-        return "neutral", compound
-
-# --- ANALYZE AND UPDATE DATABASE ---
-for index, row in df.iterrows():
-    label, score = get_sentiment(row['review_text'])
-    cur.execute(
-        """
-        UPDATE reviews
-        SET sentiment_label = %s,
-            sentiment_score = %s
-        WHERE review_id = %s
-        """,
-        (label, score, row['review_id'])
-    )
-
-# --- COMMIT & CLOSE ---
-conn.commit()
-cur.close()
-conn.close()
-print("Sentiment analysis completed and database updated.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
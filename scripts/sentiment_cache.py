@@ -0,0 +1,183 @@
+"""
+sentiment_cache.py
+------------------
+Persistent sentiment result cache shared by every scorer in the repo.
+
+Results are keyed by (hash of the text, model id, model version) and stored in a SQLite file, with an in-process LRU in front of it. The
+file is bounded to `max_entries` rows (least recently used rows are evicted
+first) and hit/miss/eviction counters are kept for reporting.
+
+The hash is of the exact text the model is given: case, punctuation and
+emoticons all change VADER's and DistilBERT's scores ("not good :(" and
+"not good" differ), so no normalization is safe. Texts are already
+cleaned before they are scored, so repeats still share one entry. Files
+written with an older keying (CACHE_VERSION) are emptied on open.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+
+import instrumentation
+
+CACHE_FILE = "data/sentiment_cache.sqlite"
+CACHE_VERSION = 2     # 1 hashed clean_text(text), which merged texts scored differently
+MAX_ENTRIES = 1_000_000
+MEMORY_ENTRIES = 50_000
+
+
+def text_key(text):
+    """Hash of the text as the model sees it (non-strings, e.g. NaN, by their repr)."""
+    raw = f"s:{text}" if isinstance(text, str) else f"r:{text!r}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class SentimentCache:
+    """SQLite-backed (label, score) cache with an in-memory LRU in front."""
+
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_ENTRIES, memory_entries=MEMORY_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        self._db = sqlite3.connect(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment_cache (
+                text_hash TEXT NOT NULL,
+                model_id TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                label TEXT NOT NULL,
+                score REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (text_hash, model_id, model_version)
+            ) WITHOUT ROWID
+        """)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS sentiment_cache_last_used ON sentiment_cache (last_used)"
+        )
+        (version,) = self._db.execute("PRAGMA user_version").fetchone()
+        if version != CACHE_VERSION:
+            cleared = self._db.execute("DELETE FROM sentiment_cache").rowcount
+            if cleared:
+                logging.info(f"Sentiment cache keys changed; cleared {cleared} old entries from {path}")
+            self._db.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+        self._db.commit()
+
+    # -------------------------
+    # In-process LRU
+    # -------------------------
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # -------------------------
+    # Lookups
+    # -------------------------
+    def get_many(self, hashes, model_id, model_version):
+        """Return {text_hash: (label, score)} for the hashes that are cached."""
+        found = {}
+        missing = []
+        for h in set(hashes):
+            key = (h, model_id, model_version)
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[h] = self._memory[key]
+            else:
+                missing.append(h)
+
+        now = time.time()
+        # SQLite limits bound parameters per statement, so look up in slices
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = self._db.execute(
+                f"SELECT text_hash, label, score FROM sentiment_cache "
+                f"WHERE model_id = ? AND model_version = ? AND text_hash IN ({marks})",
+                (model_id, model_version, *chunk)
+            ).fetchall()
+            for h, label, score in rows:
+                found[h] = (label, score)
+                self._remember((h, model_id, model_version), (label, score))
+            self._db.executemany(
+                "UPDATE sentiment_cache SET last_used = ? "
+                "WHERE text_hash = ? AND model_id = ? AND model_version = ?",
+                [(now, h, model_id, model_version) for h, _, _ in rows]
+            )
+        self._db.commit()
+        return found
+
+    def put_many(self, items, model_id, model_version):
+        """Store {text_hash: (label, score)} results."""
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO sentiment_cache VALUES (?, ?, ?, ?, ?, ?)",
+            [(h, model_id, model_version, label, float(score), now)
+             for h, (label, score) in items.items()]
+        )
+        for h, value in items.items():
+            self._remember((h, model_id, model_version), value)
+        self._evict()
+        self._db.commit()
+
+    def _evict(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM sentiment_cache WHERE (text_hash, model_id, model_version) IN ("
+                "SELECT text_hash, model_id, model_version FROM sentiment_cache "
+                "ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self.evictions += excess
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def close(self):
+        self._db.close()
+
+
+def cached_scores(texts, score_many, cache, model_id, model_version):
+    """
+    Score texts through the cache. score_many(list_of_texts) -> [(label, score)]
+    is only called once per distinct text that isn't cached yet.
+    Returns [(label, score)] in input order.
+    """
+    texts = list(texts)
+    keys = [text_key(t) for t in texts]
+    found = cache.get_many(keys, model_id, model_version) if cache is not None else {}
+
+    to_score = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in to_score:
+            to_score[key] = text
+
+    if cache is not None:
+        cache.misses += len(to_score)
+        cache.hits += len(texts) - len(to_score)
+        instrumentation.count("cache_hits", len(texts) - len(to_score))
+        instrumentation.count("cache_misses", len(to_score))
+
+    if to_score:
+        fresh = dict(zip(to_score, score_many(list(to_score.values()))))
+        if cache is not None:
+            cache.put_many(fresh, model_id, model_version)
+        found.update(fresh)
+
+    if cache is not None:
+        logging.info(f"Sentiment cache: {cache.stats()}")
+    return [found[k] for k in keys]
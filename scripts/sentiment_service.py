@@ -0,0 +1,356 @@
+"""
+sentiment_service.py
+--------------------
+Local HTTP service that scores reviews as they arrive.
+
+    python scripts/sentiment_service.py [--port 8008] [--window-ms 5]
+
+    POST /score    {"texts": ["...", ...], "model": "vader"}   (or "text": "...")
+                   -> {"model": "vader", "results": [{"label": ..., "score": ...}]}
+    GET  /metrics  throughput, queue depth and latency histograms per model
+    GET  /health
+
+Models: "vader" (vader_scoring.py) and "distilbert"
+(the batched DistilBERT engine; loaded on first use).
+
+Concurrent requests are micro-batched: a scorer thread per model takes the
+first waiting request, keeps collecting requests until the batch holds
+--max-batch texts or --window-ms has passed since the first one, and
+scores them together. The window bounds the latency added by batching.
+Scorers are plain functions (texts -> [(label, score)]), so the service can
+be run and tested offline with any scorer.
+"""
+
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from batch_inference import percentile
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+HOST = "127.0.0.1"
+PORT = 8008
+MAX_BATCH = 64                 # texts per micro-batch
+BATCH_WINDOW = 0.005           # seconds to wait for more requests after the first
+MAX_TEXTS_PER_REQUEST = 1000
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+RECENT_SAMPLES = 10_000        # latencies kept for percentiles
+
+
+# -------------------------
+# Scorers
+# -------------------------
+def vader_scorer():
+    from vader_scoring import VaderScorer
+    return VaderScorer(workers=0)
+
+
+def distilbert_scorer():
+    """DistilBERT in this process; the model is loaded by the first batch."""
+    from batch_inference import BatchInferenceEngine, score_texts
+    engine = BatchInferenceEngine(workers=0)
+    return lambda texts: score_texts(engine, texts)
+
+
+# -------------------------
+# Metrics
+# -------------------------
+class LatencyHistogram:
+    """Cumulative latency histogram (Prometheus-style buckets) plus recent percentiles."""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        for i, bound in enumerate(self.buckets_ms):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def snapshot(self):
+        cumulative, buckets = 0, {}
+        for bound, n in zip(list(self.buckets_ms) + ["+Inf"], self.counts):
+            cumulative += n
+            buckets[f"le_{bound}" if bound == "+Inf" else f"le_{bound}ms"] = cumulative
+        recent = list(self.recent)
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(percentile(recent, 50) * 1000, 2),
+            "p95_ms": round(percentile(recent, 95) * 1000, 2),
+            "p99_ms": round(percentile(recent, 99) * 1000, 2),
+            "buckets": buckets,
+        }
+
+
+class ModelMetrics:
+    """Counters for one model's batcher."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.errors = 0
+        self.request_latency = LatencyHistogram()
+        self.batch_latency = LatencyHistogram()
+
+    def record_batch(self, requests, texts, seconds, failed=False):
+        with self.lock:
+            self.requests += requests
+            self.texts += texts
+            self.batches += 1
+            self.errors += requests if failed else 0
+            self.batch_latency.observe(seconds)
+
+    def record_request(self, seconds):
+        with self.lock:
+            self.request_latency.observe(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            uptime = time.monotonic() - self.started
+            return {
+                "requests": self.requests,
+                "texts": self.texts,
+                "batches": self.batches,
+                "errors": self.errors,
+                "texts_per_sec": round(self.texts / uptime, 1) if uptime > 0 else 0.0,
+                "mean_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+                "request_latency": self.request_latency.snapshot(),
+                "batch_latency": self.batch_latency.snapshot(),
+            }
+
+
+# -------------------------
+# Micro-batching
+# -------------------------
+class MicroBatcher:
+    """
+    Collects submitted requests into micro-batches for score_many(texts).
+    A batch closes when it holds max_batch texts or `window` seconds after
+    its first request arrived (window=0 only takes what is already waiting).
+    """
+
+    def __init__(self, score_many, max_batch=MAX_BATCH, window=BATCH_WINDOW):
+        self.score_many = score_many
+        self.max_batch = max_batch
+        self.window = window
+        self.metrics = ModelMetrics()
+        self._queue = queue.Queue()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, texts):
+        """Queue a list of texts; returns a Future of their [(label, score)]."""
+        future = Future()
+        self._queue.put((list(texts), future, time.perf_counter()))
+        return future
+
+    def score(self, texts, timeout=None):
+        return self.submit(texts).result(timeout)
+
+    def _collect(self, first):
+        batch, size = [first], len(first[0])
+        deadline = first[2] + self.window
+        while size < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped = True
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _loop(self):
+        while not self._stopped:
+            first = self._queue.get()
+            if first is None:
+                return
+            self._run(self._collect(first))
+
+    def _run(self, batch):
+        texts = [text for item in batch for text in item[0]]
+        start = time.perf_counter()
+        try:
+            results = self.score_many(texts)
+        except Exception as e:
+            logging.error(f"Scoring a batch of {len(texts)} texts failed: {e}")
+            self.metrics.record_batch(len(batch), len(texts), time.perf_counter() - start, failed=True)
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        done = time.perf_counter()
+        self.metrics.record_batch(len(batch), len(texts), done - start)
+        offset = 0
+        for item_texts, future, submitted in batch:
+            future.set_result(results[offset:offset + len(item_texts)])
+            offset += len(item_texts)
+            self.metrics.record_request(done - submitted)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+# -------------------------
+# HTTP
+# -------------------------
+class ScoringHandler(BaseHTTPRequestHandler):
+    server_version = "ReviewSentiment/1.0"
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            self._send(200, {"status": "ok", "models": sorted(service.batchers)})
+        elif self.path == "/metrics":
+            self._send(200, service.metrics())
+        else:
+            self._send(404, {"error": f"no route {self.path}"})
+
+    def do_POST(self):
+        service = self.server.service
+        if self.path != "/score":
+            self._send(404, {"error": f"no route {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            texts = request["texts"] if "texts" in request else [request["text"]]
+            if not isinstance(texts, list) or len(texts) > MAX_TEXTS_PER_REQUEST:
+                raise ValueError(f"texts must be a list of at most {MAX_TEXTS_PER_REQUEST} strings")
+        except (ValueError, KeyError, TypeError) as e:
+            self._send(400, {"error": f"bad request: {e}"})
+            return
+
+        model = request.get("model", service.default_model)
+        batcher = service.batchers.get(model)
+        if batcher is None:
+            self._send(404, {"error": f"unknown model {model!r}"})
+            return
+        try:
+            results = batcher.score(texts)
+        except Exception as e:
+            self._send(500, {"error": repr(e)})
+            return
+        self._send(200, {
+            "model": model,
+            "results": [{"label": label, "score": score} for label, score in results],
+        })
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128   # listen backlog; the socketserver default of 5 drops bursts
+
+
+class SentimentService:
+    """An HTTP server with one MicroBatcher per scorer ({model: fn(texts) -> results})."""
+
+    def __init__(self, scorers, host=HOST, port=PORT, max_batch=MAX_BATCH,
+                 window=BATCH_WINDOW, default_model="vader"):
+        self.batchers = {
+            name: MicroBatcher(fn, max_batch=max_batch, window=window)
+            for name, fn in scorers.items()
+        }
+        self.default_model = default_model if default_model in scorers else next(iter(scorers))
+        self.httpd = _HTTPServer((host, port), ScoringHandler)
+        self.httpd.service = self
+        self._serving = False
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def metrics(self):
+        return {
+            name: {"queue_depth": batcher.queue_depth, **batcher.metrics.snapshot()}
+            for name, batcher in self.batchers.items()
+        }
+
+    def serve_forever(self):
+        self._serving = True
+        self.httpd.serve_forever()
+
+    def start(self):
+        """Serve from a background thread (tests, load tests)."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        if self._serving:
+            self.httpd.shutdown()
+        self.httpd.server_close()
+        for batcher in self.batchers.values():
+            batcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score review sentiment over HTTP with micro-batching.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW * 1000,
+                        help="How long a batch waits for more requests after the first")
+    parser.add_argument("--models", default="vader,distilbert",
+                        help="Comma-separated models to serve (vader, distilbert)")
+    args = parser.parse_args()
+
+    available = {"vader": vader_scorer, "distilbert": distilbert_scorer}
+    unknown = set(args.models.split(",")) - set(available)
+    if unknown:
+        parser.error(f"unknown models: {', '.join(sorted(unknown))}")
+    scorers = {name: available[name]() for name in args.models.split(",")}
+    service = SentimentService(scorers, args.host, args.port,
+                               max_batch=args.max_batch, window=args.window_ms / 1000)
+    logging.info(f"Sentiment service listening on {service.url} (models: {', '.join(scorers)})")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Sentiment service stopped")
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+sentiment_writeback.py
+----------------------
+Set-based write-back of sentiment results to the reviews table.
+
+(review_id, label, score) triples are COPY'd into a temporary table and
+applied with a single UPDATE ... FROM join per batch. Each batch is
+committed on its own, so a crash only loses the batch in flight. The
+staging table lives for the session (emptied on commit) and the UPDATE is
+a prepared statement, so later batches skip the DDL and the planning.
+
+Works with a psycopg2 connection, or a SQLAlchemy engine's
+`engine.raw_connection()`.
+"""
+
+import logging
+from itertools import islice
+
+from db import Prepared
+from insert_reviews import RowStream
+
+BATCH_SIZE = 10000
+
+SENTIMENT_COLUMNS = ("review_id", "sentiment_label", "sentiment_score")
+VERSION_COLUMNS = ("sentiment_model", "sentiment_hash")
+
+
+# Column types come from reviews, so labels are COPY'd straight into its enum
+STAGING_SQL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS sentiment_staging ON COMMIT DELETE ROWS AS
+    SELECT {', '.join(SENTIMENT_COLUMNS + VERSION_COLUMNS)} FROM reviews WITH NO DATA
+"""
+
+
+def _update_statement(name, columns):
+    assignments = ",\n            ".join(f"{c} = s.{c}" for c in columns[1:])
+    return Prepared(name, f"""
+        UPDATE reviews AS r
+        SET {assignments}
+        FROM sentiment_staging AS s
+        WHERE r.review_id = s.review_id
+    """)
+
+
+UPDATE_SENTIMENT = _update_statement("update_sentiment", SENTIMENT_COLUMNS)
+UPDATE_SENTIMENT_VERSIONED = _update_statement(
+    "update_sentiment_versioned", SENTIMENT_COLUMNS + VERSION_COLUMNS
+)
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_batch(cur, batch, versioned=False):
+    """
+    Apply one batch of (review_id, label, score) triples; returns rows updated.
+    With versioned=True rows are (review_id, label, score, model, text_hash)
+    and the model/hash bookkeeping columns are set too.
+    """
+    columns = SENTIMENT_COLUMNS + (VERSION_COLUMNS if versioned else ())
+    cur.execute(STAGING_SQL)
+    cur.copy_expert(
+        f"COPY sentiment_staging ({', '.join(columns)}) FROM STDIN",
+        RowStream(batch)
+    )
+    (UPDATE_SENTIMENT_VERSIONED if versioned else UPDATE_SENTIMENT).execute(cur)
+    return cur.rowcount
+
+
+def write_sentiment(conn, results, batch_size=BATCH_SIZE, versioned=False):
+    """
+    Write (review_id, label, score) triples back to reviews, committing
+    every batch_size rows. Returns the total number of rows updated.
+    """
+    updated = 0
+    cur = conn.cursor()
+    try:
+        for batch in _batches(results, batch_size):
+            updated += write_batch(cur, batch, versioned)
+            conn.commit()
+            logging.info(f"Sentiment write-back: {updated} rows updated")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return updated
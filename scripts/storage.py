@@ -0,0 +1,164 @@
+"""
+storage.py
+----------
+Typed columnar storage for the datasets handed between pipeline stages.
+
+Stages read and write Parquet with real column types:
+- bank, source, sentiment_label, identified_theme: categorical (dictionary-encoded)
+- rating: int8
+- date: date32
+so nothing is re-parsed or re-inferred downstream. Reads support column
+projection and are memory-mapped.
+
+Paths ending in .csv are read/written as plain CSV, which stays available
+as an export format (write_table(..., export_csv=True) writes a CSV copy
+next to the Parquet file). A directory is read as one dataset made of all
+the Parquet files below it (e.g. the scraper's partitioned raw output).
+If an input doesn't exist yet, the .parquet and then the .csv file with the
+same name are tried instead (e.g. the CSVs bundled in data/).
+"""
+
+import logging
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+CATEGORICAL_COLUMNS = ("bank", "source", "sentiment_label", "identified_theme")
+INT8_COLUMNS = ("rating",)
+DATE_COLUMNS = ("date",)
+
+
+def is_parquet(path):
+    return str(path).endswith(".parquet") or os.path.isdir(path)
+
+
+def csv_path(path):
+    """The CSV sibling of a Parquet path."""
+    return os.path.splitext(str(path))[0] + ".csv"
+
+
+def resolve(path):
+    """Fall back to the .parquet, then .csv, file of the same name if path doesn't exist."""
+    path = str(path)
+    if os.path.exists(path):
+        return path
+    stem = os.path.splitext(path)[0] if path.endswith((".parquet", ".csv")) else path
+    for candidate in (stem + ".parquet", stem + ".csv"):
+        if os.path.exists(candidate):
+            logging.info(f"{path} not found, reading {candidate} instead")
+            return candidate
+    return path
+
+
+# -------------------------
+# Arrow conversion
+# -------------------------
+def _column_to_arrow(name, values):
+    if name in DATE_COLUMNS:
+        timestamps = pd.to_datetime(values, errors="coerce")
+        return pa.array(timestamps, type=pa.timestamp("ns"), from_pandas=True).cast(pa.date32())
+    if name in INT8_COLUMNS:
+        return pa.array(pd.to_numeric(values, errors="coerce"), from_pandas=True).cast(pa.int8())
+    if name in CATEGORICAL_COLUMNS:
+        strings = pa.array(values.astype(object), type=pa.string(), from_pandas=True)
+        return strings.dictionary_encode()
+    if values.dtype == object or isinstance(values.dtype, pd.CategoricalDtype):
+        return pa.array(values.astype(object), type=pa.string(), from_pandas=True)
+    return pa.array(values, from_pandas=True)
+
+
+def to_arrow(df):
+    """Convert a DataFrame to an Arrow table with the pipeline's column types."""
+    return pa.table(
+        [_column_to_arrow(name, df[name]) for name in df.columns],
+        names=[str(name) for name in df.columns]
+    )
+
+
+# -------------------------
+# Read / write
+# -------------------------
+def read_table(path, columns=None):
+    """Read a dataset (Parquet or CSV), optionally projecting columns."""
+    path = resolve(path)
+    if is_parquet(path):
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+    return pd.read_csv(path, usecols=columns)
+
+
+def read_columns(path):
+    """Column names of a dataset without reading its rows."""
+    path = resolve(path)
+    if os.path.isdir(path):
+        return ds.dataset(path, format="parquet").schema.names
+    if is_parquet(path):
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def write_table(df, path, export_csv=False):
+    """Write a dataset by extension; export_csv also writes a CSV next to a Parquet file."""
+    if is_parquet(path):
+        pq.write_table(to_arrow(df), path)
+        if export_csv:
+            df.to_csv(csv_path(path), index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def iter_chunks(path, chunksize, columns=None):
+    """
+    Yield DataFrames of at most chunksize rows. CSV chunks are read as text
+    (so dtypes don't change from chunk to chunk); Parquet chunks keep their types.
+    """
+    path = resolve(path)
+    if os.path.isdir(path):
+        dataset = ds.dataset(path, format="parquet")
+        for batch in dataset.to_batches(columns=columns, batch_size=chunksize):
+            if batch.num_rows:
+                yield batch.to_pandas(integer_object_nulls=True)
+    elif is_parquet(path):
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas(integer_object_nulls=True)
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns, dtype=str)
+
+
+class TableWriter:
+    """Appends DataFrame chunks to one Parquet or CSV file."""
+
+    def __init__(self, path, export_csv=False):
+        self.path = str(path)
+        self.export_csv = export_csv and is_parquet(path)
+        self._parquet = None
+        self._csv_started = False
+
+    def _append_csv(self, df, path):
+        df.to_csv(path, mode="a" if self._csv_started else "w",
+                  header=not self._csv_started, index=False)
+
+    def write(self, df):
+        if is_parquet(self.path):
+            table = to_arrow(df)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table.cast(self._parquet.schema))
+            if self.export_csv:
+                self._append_csv(df, csv_path(self.path))
+        else:
+            self._append_csv(df, self.path)
+        self._csv_started = True
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
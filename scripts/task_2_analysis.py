@@ -1,90 +1,121 @@
 # scripts/task_2_analysis.py
-from sqlalchemy import create_engine, Table, MetaData, update
+import argparse
+import os
 import pandas as pd
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from sklearn.feature_extraction.text import TfidfVectorizer
+from chunk_pipeline import QUEUE_DEPTH
+from db import get_database
+from incremental_scoring import CHUNK_SIZE, VADER_MODEL_ID, score_incrementally, vader_version
+from sentiment_cache import SentimentCache
+from keyword_index import TOP_K, KeywordIndex
+from vader_scoring import VaderScorer, get_sentiment
 import re
 
-# --- DATABASE CONNECTION ---
-DB_USER = "postgres"
-DB_PASS = "1234beko"
-DB_HOST = "localhost"
-DB_NAME = "bank_reviews"
-
-engine = create_engine(f'postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}')
-
-# --- LOAD REVIEWS ---
-df = pd.read_sql("SELECT review_id, review_text, bank_id FROM reviews", engine)
-print(f"Loaded {len(df)} reviews.")
+KEYWORD_INDEX_FILE = "data/keyword_index.npz"
 
 # --- SENTIMENT ANALYSIS ---
-analyzer = SentimentIntensityAnalyzer()
-
-def get_sentiment(text):
-    if not text:
-        return "neutral", 0
-    scores = analyzer.polarity_scores(text)
-    compound = scores['compound']
-    if compound >= 0.05:
-        return "positive", compound
-    elif compound <= -0.05:
-        return "negative", compound
-    else:
-        return "neutral", compound
-
-df['sentiment_label'], df['sentiment_score'] = zip(*df['review_text'].apply(get_sentiment))
-
-# --- UPDATE DATABASE SAFELY (no table overwrite) ---
-meta = MetaData()
-reviews_table = Table('reviews', meta, autoload_with=engine)
-
-with engine.begin() as conn:
-    for _, row in df.iterrows():
-        stmt = (
-            update(reviews_table)
-            .where(reviews_table.c.review_id == row['review_id'])
-            .values(
-                sentiment_label=row['sentiment_label'],
-                sentiment_score=row['sentiment_score']
+def update_sentiment(database, full=False, chunk_size=CHUNK_SIZE, cache=None, workers=None,
+                     queue_depth=QUEUE_DEPTH):
+    """
+    Score new or changed reviews and write them back (no table overwrite),
+    reading, scoring and writing chunks concurrently.
+    """
+    scorer = VaderScorer(workers)
+    try:
+        with database.connection() as conn, database.spare_connection() as read_conn:
+            scored = score_incrementally(
+                conn, get_sentiment, VADER_MODEL_ID, vader_version(),
+                chunk_size=chunk_size, full=full, cache=cache, score_many=scorer,
+                read_conn=read_conn, queue_depth=queue_depth
             )
-        )
-        conn.execute(stmt)
+    finally:
+        scorer.close()
+    print(f"Sentiment analysis updated safely in the database ({scored} reviews scored).")
 
-print("Sentiment analysis updated safely in the database.")
 
 # --- THEME / KEYWORD EXTRACTION ---
-df['cleaned'] = df['review_text'].str.lower().str.replace(r'[^a-z0-9\s]', '', regex=True)
-
-vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1,2), max_features=100)
-vectorizer.fit(df['cleaned'])
-feature_names = vectorizer.get_feature_names_out()
-
-themes = {}
-for bank_id in df['bank_id'].unique():
-    bank_texts = df[df['bank_id']==bank_id]['cleaned']
-    X = vectorizer.transform(bank_texts)
-    summed = X.sum(axis=0)
-    keywords_scores = [(feature_names[i], summed[0,i]) for i in range(len(feature_names))]
-    keywords_scores.sort(key=lambda x: x[1], reverse=True)
-    
+def clean_for_tfidf(texts):
+    return texts.fillna('').str.lower().str.replace(r'[^a-z0-9\s]', '', regex=True)
+
+
+def extract_themes(database, incremental=False, index_file=KEYWORD_INDEX_FILE):
+    """
+    Top 10 TF-IDF keywords per bank_id. The keyword index is saved to
+    index_file; with incremental=True, only reviews added since it was
+    saved are streamed in chunks and folded into it (no refit).
+    """
+    index = None
+    if incremental and os.path.exists(index_file):
+        index = KeywordIndex.load(index_file)
+        loaded = 0
+        for df in database.iter_frames(
+            "SELECT review_id, review_text, bank_id FROM reviews "
+            "WHERE review_id > %(after)s ORDER BY review_id",
+            {"after": index.last_id or 0}
+        ):
+            index.update(clean_for_tfidf(df['review_text']), df['bank_id'], last_id=df['review_id'].max())
+            loaded += len(df)
+        print(f"Loaded {loaded} new reviews.")
+    else:
+        df = database.read_frame("SELECT review_id, review_text, bank_id FROM reviews ORDER BY review_id")
+        print(f"Loaded {len(df)} reviews.")
+        index = KeywordIndex().fit(
+            clean_for_tfidf(df['review_text']), df['bank_id'],
+            last_id=df['review_id'].max() if len(df) else None
+        )
+    index.save(index_file)
+
     # Top 10 keywords, remove 'nan'
-    keywords = [kw for kw, score in keywords_scores[:10] if kw != 'nan']
-    themes[int(bank_id)] = keywords
-
-# --- DISPLAY THEMES ---
-bank_df = pd.read_sql("SELECT bank_id, bank_name FROM banks", engine)
-for bank_id, keywords in themes.items():
-    bank_name = bank_df[bank_df['bank_id']==bank_id]['bank_name'].values[0]
-    print(f"{bank_name}: {keywords}")
-
-# --- SAVE THEMES TO CSV ---
-theme_data = []
-for bank_id, keywords in themes.items():
-    theme_data.append({
-        "bank_id": bank_id,
-        "top_keywords": ", ".join(keywords)
-    })
-
-df_themes = pd.DataFrame(theme_data)
-df_themes.to_csv("data/bank_themes.csv", index=False)
-print("Themes saved to data/bank_themes.csv")
\ No newline at end of file
+    return {
+        int(bank_id): [kw for kw in keywords if kw != 'nan']
+        for bank_id, keywords in index.top_keywords(TOP_K).items()
+    }
+
+
+def save_themes(database, themes, output_file="data/bank_themes.csv"):
+    # --- DISPLAY THEMES ---
+    bank_df = database.read_frame("SELECT bank_id, bank_name FROM banks")
+    for bank_id, keywords in themes.items():
+        bank_name = bank_df[bank_df['bank_id']==bank_id]['bank_name'].values[0]
+        print(f"{bank_name}: {keywords}")
+
+    # --- SAVE THEMES TO CSV ---
+    theme_data = []
+    for bank_id, keywords in themes.items():
+        theme_data.append({
+            "bank_id": bank_id,
+            "top_keywords": ", ".join(keywords)
+        })
+
+    df_themes = pd.DataFrame(theme_data)
+    df_themes.to_csv(output_file, index=False)
+    print(f"Themes saved to {output_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VADER sentiment and TF-IDF themes from the database.")
+    parser.add_argument("--full", action="store_true",
+                        help="Rescore every review, not only new or changed ones")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--queue-depth", type=int, default=QUEUE_DEPTH,
+                        help="Chunks buffered between reading, scoring and writing")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Don't reuse cached scores for previously seen texts")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="VADER processes (default: one per core; 0 = this process)")
+    parser.add_argument("--update-themes", action="store_true",
+                        help="Fold new reviews into the saved keyword index instead of refitting it")
+    args = parser.parse_args()
+
+    database = get_database()
+    cache = None if args.no_cache else SentimentCache()
+    try:
+        update_sentiment(database, full=args.full, chunk_size=args.chunk_size, cache=cache,
+                         workers=args.workers, queue_depth=args.queue_depth)
+    finally:
+        if cache is not None:
+            cache.close()
+    save_themes(database, extract_themes(database, incremental=args.update_themes))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,44 @@
 task_2_sentiment_thematic_analysis.py
 -------------------------------------
 Task 2: Sentiment Analysis & Thematic Extraction for Fintech App Reviews
-- Sentiment: Hugging Face DistilBERT (positive/negative)
-- Keyword Extraction: spaCy noun chunks
-- Theme Assignment: rule-based clustering
-- Output: reviews_processed.csv
+- Sentiment: Hugging Face DistilBERT (positive/negative), batched across a
+  process pool (see batch_inference.py)
+- Keyword Extraction: spaCy noun chunks (streamed through nlp.pipe)
+- Theme Assignment: rule-based clustering (taxonomy in themes.yaml)
+- Near-duplicates: if preprocessing added cluster_id, the models run once
+  per cluster (on its first review) and the results are copied to the rest
+- Output: reviews_processed.parquet (plus reviews_processed.csv with --csv)
+
+Models are loaded on first use. With --server, both run in a warm
+model_server.py process instead, so nothing heavy is loaded here.
+
+Each step is timed as an analyze.* stage (rows in = texts the models saw,
+rows out = rows filled; sentiment cache hits are counted), see
+instrumentation.py and --metrics-json / --metrics-prom / --profile.
 """
 
-import pandas as pd
-from transformers import pipeline
-import spacy
+import argparse
+import numpy as np
 import logging
+from functools import lru_cache
+import instrumentation
+from instrumentation import stage
+from batch_inference import BATCH_SIZE, MODEL_NAME, MODEL_REVISION, analyze_sentiment_batch
+from model_server import ADDRESS, ModelClient, format_address
+from near_duplicates import representatives
+from sentiment_cache import SentimentCache, cached_scores
+from theme_matcher import ThemeMatcher
+from storage import read_table, write_table
 
 # -------------------------
 # Config
 # -------------------------
-INPUT_FILE = "data/cleaned_reviews.csv"
-OUTPUT_FILE = "data/reviews_processed.csv"
+INPUT_FILE = "data/cleaned_reviews.parquet"
+OUTPUT_FILE = "data/reviews_processed.parquet"
+SPACY_MODEL = "en_core_web_sm"
+SPACY_BATCH_SIZE = 1000
+# Noun chunks only need the tagger/parser; these components are skipped
+KEYWORD_DISABLED_PIPES = ["ner", "lemmatizer"]
 
 # -------------------------
 # Logging
@@ -25,19 +47,30 @@ OUTPUT_FILE = "data/reviews_processed.csv"
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
 
 # -------------------------
-# Load NLP tools
+# Load NLP tools (on first use, so importing this module stays cheap)
 # -------------------------
-logging.info("Loading Hugging Face sentiment model...")
-sentiment_analyzer = pipeline(
-    "sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english", device=-1
-)
-
-logging.info("Loading spaCy model for keyword extraction...")
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    logging.error("spaCy model not found. Run: python -m spacy download en_core_web_sm")
-    raise
+@lru_cache(maxsize=None)
+def get_sentiment_analyzer():
+    from transformers import pipeline
+    logging.info("Loading Hugging Face sentiment model...")
+    return pipeline("sentiment-analysis", model=MODEL_NAME, device=-1)
+
+
+@lru_cache(maxsize=None)
+def get_nlp():
+    import spacy
+    logging.info("Loading spaCy model for keyword extraction...")
+    try:
+        return spacy.load(SPACY_MODEL)
+    except OSError:
+        logging.error(f"spaCy model not found. Run: python -m spacy download {SPACY_MODEL}")
+        raise
+
+
+@lru_cache(maxsize=None)
+def get_theme_matcher():
+    return ThemeMatcher.from_file()
+
 
 # -------------------------
 # Functions
@@ -46,56 +79,138 @@ def analyze_sentiment(text):
     """Returns sentiment label and score using DistilBERT. Handles non-strings."""
     if not isinstance(text, str) or text.strip() == "":
         return "Neutral", 0.5
-    result = sentiment_analyzer(text[:512])[0]
+    result = get_sentiment_analyzer()(text[:512])[0]
     return result["label"], result["score"]
 
 
+def _keywords_from_doc(doc):
+    keywords = [chunk.text for chunk in doc.noun_chunks if len(chunk.text.split()) <= 3]
+    return ", ".join(keywords)
+
+
 def extract_keywords(text):
     """Extract noun chunks as keywords. Safely handle non-string values."""
     if not isinstance(text, str):
         text = ""
-    doc = nlp(text.lower())
-    keywords = [chunk.text for chunk in doc.noun_chunks if len(chunk.text.split()) <= 3]
-    return ", ".join(keywords)
+    return _keywords_from_doc(get_nlp()(text.lower()))
+
+
+def extract_keywords_batch(texts, batch_size=SPACY_BATCH_SIZE, n_process=1):
+    """
+    Streaming version of extract_keywords over many texts (same output).
+    Uses nlp.pipe with batching and n_process workers, and skips the
+    components noun chunks don't need (NER, lemmatizer).
+    """
+    nlp = get_nlp()
+    disable = [name for name in KEYWORD_DISABLED_PIPES if name in nlp.pipe_names]
+    texts = (text.lower() if isinstance(text, str) else "" for text in texts)
+    for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disable):
+        yield _keywords_from_doc(doc)
 
 
 def assign_theme(keywords):
-    """Assign review to a theme based on keywords"""
-    keywords = keywords.lower()
-    if any(k in keywords for k in ["login", "password", "account"]):
-        return "Account Access Issues"
-    elif any(k in keywords for k in ["transfer", "payment", "transaction", "slow"]):
-        return "Transaction Performance"
-    elif any(k in keywords for k in ["ui", "interface", "layout", "design"]):
-        return "User Interface & Experience"
-    elif any(k in keywords for k in ["support", "help", "customer"]):
-        return "Customer Support"
+    """Assign review to a theme based on keywords (see themes.yaml)"""
+    return get_theme_matcher().assign(keywords)
+
+
+def process_reviews(df, batch_size=BATCH_SIZE, workers=1, cache=None, n_process=1,
+                    multi_label=False, client=None):
+    """
+    Add sentiment, keywords and themes to a DataFrame of cleaned reviews.
+    With a ModelClient, both models run in the model server instead of here.
+    Rows sharing a cluster_id get the results of the cluster's first row.
+    """
+    if "cluster_id" in df.columns:
+        first, spread = representatives(df["cluster_id"])
+        logging.info(f"Analyzing {len(first)} cluster representatives for {len(df)} reviews")
     else:
-        return "Feature / Others"
-
+        first, spread = np.arange(len(df)), None
+    texts = df["review"].iloc[first].tolist()
 
-# -------------------------
-# Main
-# -------------------------
-def main():
-    logging.info(f"Loading data from {INPUT_FILE}")
-    df = pd.read_csv(INPUT_FILE)
+    def per_row(values, dtype=object):
+        return values if spread is None else np.asarray(values, dtype=dtype)[spread]
 
     # Sentiment analysis
     logging.info("Analyzing sentiment...")
-    df["sentiment_label"], df["sentiment_score"] = zip(*df["review"].apply(analyze_sentiment))
+    with stage("analyze.sentiment", rows_in=len(texts), rows_out=len(df)):
+        if client is None:
+            labels, scores, stats = analyze_sentiment_batch(
+                texts, batch_size=batch_size, workers=workers, cache=cache
+            )
+            summary = stats.summary()
+            logging.info(
+                f"Sentiment: {summary['reviews_per_sec']} reviews/s, "
+                f"p50 {summary['p50_batch_ms']} ms / p95 {summary['p95_batch_ms']} ms per batch"
+            )
+        else:
+            results = cached_scores(texts, client.sentiment, cache, MODEL_NAME, MODEL_REVISION)
+            labels = [label for label, _ in results]
+            scores = [score for _, score in results]
+        df["sentiment_label"] = per_row(labels)
+        df["sentiment_score"] = per_row(scores, dtype=float)
 
     # Keyword extraction
     logging.info("Extracting keywords...")
-    df["keywords"] = df["review"].apply(extract_keywords)
+    with stage("analyze.keywords", rows_in=len(texts), rows_out=len(df)):
+        if client is None:
+            df["keywords"] = per_row(list(extract_keywords_batch(texts, n_process=n_process)))
+        else:
+            df["keywords"] = per_row(client.keywords(texts))
 
     # Theme assignment
     logging.info("Assigning themes...")
-    df["identified_theme"] = df["keywords"].apply(assign_theme)
+    with stage("analyze.themes", rows_in=len(df), rows_out=len(df)):
+        theme_matcher = get_theme_matcher()
+        df["identified_theme"] = theme_matcher.assign_series(df["keywords"])
+        if multi_label:
+            df["identified_themes"] = theme_matcher.match_series(df["keywords"])
+    return df
 
-    # Save processed dataset
-    df.to_csv(OUTPUT_FILE, index=False)
-    logging.info(f"Processed reviews saved to {OUTPUT_FILE}")
+
+# -------------------------
+# Main
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="DistilBERT sentiment, keywords and themes.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Inference processes (0 = run in this process)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Don't reuse cached scores for previously seen texts")
+    parser.add_argument("--n-process", type=int, default=1,
+                        help="spaCy processes for keyword extraction")
+    parser.add_argument("--multi-label", action="store_true",
+                        help="Also write every matched theme to identified_themes")
+    parser.add_argument("--csv", action="store_true", help="Also export the output as CSV")
+    parser.add_argument("--server", nargs="?", const=format_address(ADDRESS), metavar="ADDRESS",
+                        help="Use a running model_server.py instead of loading the models here "
+                             "(at its default address unless given)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumentation.from_args("analyze", args):
+        logging.info(f"Loading data from {INPUT_FILE}")
+        with stage("analyze.read") as s:
+            df = read_table(INPUT_FILE)
+            s.rows_out = len(df)
+
+        cache = None if args.no_cache else SentimentCache()
+        client = ModelClient(args.server) if args.server else None
+        try:
+            df = process_reviews(
+                df, batch_size=args.batch_size, workers=args.workers, cache=cache,
+                n_process=args.n_process, multi_label=args.multi_label, client=client
+            )
+        finally:
+            if cache is not None:
+                cache.close()
+            if client is not None:
+                client.close()
+
+        # Save processed dataset
+        with stage("analyze.write", rows_in=len(df)):
+            write_table(df, OUTPUT_FILE, export_csv=args.csv)
+        logging.info(f"Processed reviews saved to {OUTPUT_FILE}")
 
 
 if __name__ == "__main__":
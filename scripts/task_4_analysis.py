@@ -1,190 +1,194 @@
 # scripts/task_4_analysis.py
 
 # --- IMPORT LIBRARIES ---
+import argparse
 import pandas as pd
-from sqlalchemy import create_engine
-import matplotlib.pyplot as plt
-import seaborn as sns
-from wordcloud import WordCloud
 import os
-import yaml
+from db import get_database
+import report_renderer
+import rollups
 
-# --- STEP 0: LOAD CONFIG AND CREATE FIGURES DIRECTORY ---
-with open('config.yaml') as f:
-    config = yaml.safe_load(f)
+THEMES_FILE = "data/bank_themes.csv"
+RECOMMENDATIONS_FILE = "data/bank_recommendations.csv"
+FIGURES_DIR = "figures"
+REPORT_FILE = os.path.join(FIGURES_DIR, report_renderer.BUNDLE_FILE)
+SAMPLES_PER_BANK = 5
 
-DB_USER = config['db_user']
-DB_PASS = config['db_pass']
-DB_HOST = config['db_host']
-DB_NAME = config['db_name']
-
-if not os.path.exists("figures"):
-    os.makedirs("figures")
 
 # --- STEP 1: LOAD DATA ---
-engine = create_engine(f'postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}')
+# Only per-bank aggregates are read (the bank_review_summary rollup, see
+# rollups.py), so the report doesn't slow down as the reviews table grows.
+def load_data(database, themes_file=THEMES_FILE):
+    # Load per-bank aggregates from PostgreSQL
+    summary = rollups.bank_summary(database)
 
-# Load reviews and banks from PostgreSQL
-reviews = pd.read_sql("SELECT * FROM reviews", engine)
-banks = pd.read_sql("SELECT * FROM banks", engine)
+    # Load top keywords/themes CSV
+    themes = pd.read_csv(themes_file)
 
-# Load top keywords/themes CSV
-themes = pd.read_csv("data/bank_themes.csv")
+    # Quick check
+    print("Bank summary:")
+    print(summary[['bank_name', 'n_reviews', 'avg_rating', 'avg_sentiment']])
+    print("\nThemes sample:")
+    print(themes.head())
+    return summary, themes
 
-# Quick check
-print("Reviews sample:")
-print(reviews.head())
-print("\nThemes sample:")
-print(themes.head())
 
 # --- STEP 2: IDENTIFY DRIVERS AND PAIN POINTS ---
-drivers = {}
-pain_points = {}
-
-for bank_id in reviews['bank_id'].unique():
-    bank_reviews = reviews[reviews['bank_id'] == bank_id]
-    
-    # Drivers: top positive review samples
-    pos_reviews = bank_reviews[bank_reviews['sentiment_label'] == 'positive']
-    drivers[bank_id] = pos_reviews['review_text'].sample(min(5, len(pos_reviews))).tolist()
-    
-    # Pain points: top negative review samples
-    neg_reviews = bank_reviews[bank_reviews['sentiment_label'] == 'negative']
-    pain_points[bank_id] = neg_reviews['review_text'].sample(min(5, len(neg_reviews))).tolist()
+def sample_reviews(database, summary, label, n=SAMPLES_PER_BANK):
+    """Up to n random review texts with the given sentiment label, per bank_id."""
+    return rollups.sample_reviews(database, summary, label, n)
 
-# --- STEP 3: ADD BANK NAMES ---
-bank_mapping = dict(zip(banks['bank_id'], banks['bank_name']))
-reviews['bank_name'] = reviews['bank_id'].map(bank_mapping)
-themes['bank_name'] = themes['bank_id'].map(bank_mapping)
 
-# Print for verification
-print("\nDrivers per bank:")
-for bank_id, texts in drivers.items():
-    print(f"{bank_mapping[bank_id]}: {texts}")
+# --- STEP 3: ADD BANK NAMES ---
+def add_bank_names(summary, themes):
+    bank_mapping = dict(zip(summary['bank_id'], summary['bank_name']))
+    themes['bank_name'] = themes['bank_id'].map(bank_mapping)
+    return bank_mapping
 
-print("\nPain points per bank:")
-for bank_id, texts in pain_points.items():
-    print(f"{bank_mapping[bank_id]}: {texts}")
 
 # --- STEP 4: COMPARE BANKS (AVERAGE RATINGS AND SENTIMENT) ---
-avg_ratings = reviews.groupby('bank_name')['rating'].mean()
-avg_sentiment = reviews.groupby('bank_name')['sentiment_score'].mean()
+def compare_banks(summary):
+    by_bank = summary.set_index('bank_name').sort_index()
+    avg_ratings = by_bank['avg_rating'].rename('rating')
+    avg_sentiment = by_bank['avg_sentiment'].rename('sentiment_score')
+
+    print("\nAverage ratings per bank:")
+    print(avg_ratings)
+    print("\nAverage sentiment per bank:")
+    print(avg_sentiment)
+    return avg_ratings, avg_sentiment
 
-print("\nAverage ratings per bank:")
-print(avg_ratings)
-print("\nAverage sentiment per bank:")
-print(avg_sentiment)
 
 # --- STEP 5: VISUALIZATIONS ---
-# 1. Sentiment Distribution
-plt.figure(figsize=(8,5))
-sns.countplot(data=reviews, x='bank_name', hue='sentiment_label')
-plt.title("Sentiment Distribution per Bank")
-plt.xlabel("Bank")
-plt.ylabel("Number of Reviews")
-plt.xticks(rotation=15)
-plt.savefig("figures/sentiment_distribution.png")
-plt.show()
-
-# 2. Rating Distribution
-plt.figure(figsize=(8,5))
-sns.boxplot(data=reviews, x='bank_name', y='rating')
-plt.title("Rating Distribution per Bank")
-plt.xlabel("Bank")
-plt.ylabel("Rating")
-plt.xticks(rotation=15)
-plt.savefig("figures/rating_distribution.png")
-plt.show()
-
-# 3. Keyword Clouds per Bank
-for idx, row in themes.iterrows():
-    bank_name = row['bank_name']
-    keywords_text = row['top_keywords']
-    
-    # Skip if empty
-    if not isinstance(keywords_text, str) or keywords_text.strip() == "":
-        continue
-    
-    wordcloud = WordCloud(width=800, height=400, background_color='white').generate(keywords_text)
-    plt.figure(figsize=(10,5))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis('off')
-    plt.title(f"Top Keywords – {bank_name}")
-    plt.savefig(f"figures/keyword_cloud_{bank_name}.png")
-    plt.show()
-
-# 4. Average Rating and Sentiment per Bank
-# Average Rating per Bank
-plt.figure(figsize=(8,5))
-sns.barplot(x=avg_ratings.index, y=avg_ratings.values, palette="Blues_d")
-plt.title("Average Rating per Bank")
-plt.xlabel("Bank")
-plt.ylabel("Average Rating")
-plt.ylim(0,5)
-plt.xticks(rotation=15)  # optional: rotate names for readability
-plt.savefig("figures/average_rating_per_bank.png")
-plt.show()
-
-# Average Sentiment per Bank
-plt.figure(figsize=(8,5))
-sns.barplot(x=avg_sentiment.index, y=avg_sentiment.values, palette="Greens_d")
-plt.title("Average Sentiment Score per Bank")
-plt.xlabel("Bank")
-plt.ylabel("Average Sentiment Score")
-plt.ylim(0,1)
-plt.xticks(rotation=15)
-plt.savefig("figures/average_sentiment_per_bank.png")
-plt.show()
+# Figures are drawn headless (Agg) in a process pool by report_renderer,
+# and only those whose aggregate changed since the last run are redrawn.
+# matplotlib, seaborn and wordcloud are only imported by the renderer, so
+# the report's CSV output doesn't pay for loading them.
+def plot_figures(summary, themes, avg_ratings, avg_sentiment, figures_dir=FIGURES_DIR, workers=None):
+    figures = report_renderer.report_figures(summary, themes, avg_ratings, avg_sentiment,
+                                             rollups.LABEL_COLUMNS, rollups.RATINGS)
+    drawn, skipped = report_renderer.render_figures(figures, figures_dir, workers)
+    print(f"\nFigures: {len(drawn)} drawn, {len(skipped)} unchanged, in {figures_dir}/")
+    return figures
+
 
 # --- STEP 6: RECOMMENDATIONS ---
-print("\n--- Recommendations per Bank ---")
-recommendations = {}
-
-for bank_id in reviews['bank_id'].unique():
-    bank_name = bank_mapping[bank_id]
-    driver_examples = drivers[bank_id][:2] if len(drivers[bank_id]) >= 2 else drivers[bank_id]
-    pain_examples = pain_points[bank_id][:2] if len(pain_points[bank_id]) >= 2 else pain_points[bank_id]
-    
-    # Example recommendation logic
-    recs = []
-    if any("login" in text.lower() or "error" in text.lower() for text in pain_examples):
-        recs.append("Improve login reliability")
-    if any("slow" in text.lower() or "lag" in text.lower() for text in pain_examples):
-        recs.append("Optimize app speed and response time")
-    if any("crash" in text.lower() for text in pain_examples):
-        recs.append("Fix app stability issues")
-    if len(recs) == 0:
-        recs.append("Maintain current strengths")
-    
-    recommendations[bank_name] = {
-        "drivers": driver_examples,
-        "pain_points": pain_examples,
-        "recommendations": recs
-    }
-
-# Print recommendations
-for bank, info in recommendations.items():
-    print(f"\nBank: {bank}")
-    print(f"Drivers: {info['drivers']}")
-    print(f"Pain Points: {info['pain_points']}")
-    print(f"Recommendations: {info['recommendations']}")
+def build_recommendations(summary, drivers, pain_points, bank_mapping):
+    recommendations = {}
+
+    for bank_id in summary['bank_id']:
+        bank_name = bank_mapping[bank_id]
+        driver_examples = drivers[bank_id][:2] if len(drivers[bank_id]) >= 2 else drivers[bank_id]
+        pain_examples = pain_points[bank_id][:2] if len(pain_points[bank_id]) >= 2 else pain_points[bank_id]
+
+        # Example recommendation logic
+        recs = []
+        if any("login" in text.lower() or "error" in text.lower() for text in pain_examples):
+            recs.append("Improve login reliability")
+        if any("slow" in text.lower() or "lag" in text.lower() for text in pain_examples):
+            recs.append("Optimize app speed and response time")
+        if any("crash" in text.lower() for text in pain_examples):
+            recs.append("Fix app stability issues")
+        if len(recs) == 0:
+            recs.append("Maintain current strengths")
+
+        recommendations[bank_name] = {
+            "drivers": driver_examples,
+            "pain_points": pain_examples,
+            "recommendations": recs
+        }
+    return recommendations
+
 
 # --- STEP 7: SAVE RECOMMENDATIONS CSV ---
-rec_data = []
-for bank, info in recommendations.items():
-    rec_data.append({
-        "bank_name": bank,
-        "drivers": " | ".join(info['drivers']),
-        "pain_points": " | ".join(info['pain_points']),
-        "recommendations": " | ".join(info['recommendations'])
-    })
-
-df_recommendations = pd.DataFrame(rec_data)
-df_recommendations.to_csv("data/bank_recommendations.csv", index=False)
-print("\nRecommendations saved to data/bank_recommendations.csv")
-
-# --- STEP 7: ETHICS / REVIEW BIAS NOTE ---
-print("\n--- Review Bias Note ---")
-print("The review dataset may contain a negative skew, as dissatisfied users are more likely to leave reviews.")
-print("Additionally, review counts per rating are uneven, which can influence average sentiment and rating metrics.")
-print("This should be considered when interpreting insights and recommendations.")
\ No newline at end of file
+def save_recommendations(recommendations, output_file=RECOMMENDATIONS_FILE):
+    rec_data = []
+    for bank, info in recommendations.items():
+        rec_data.append({
+            "bank_name": bank,
+            "drivers": " | ".join(info['drivers']),
+            "pain_points": " | ".join(info['pain_points']),
+            "recommendations": " | ".join(info['recommendations'])
+        })
+
+    df_recommendations = pd.DataFrame(rec_data)
+    df_recommendations.to_csv(output_file, index=False)
+    print(f"\nRecommendations saved to {output_file}")
+    return df_recommendations
+
+
+# --- STEP 8: ETHICS / REVIEW BIAS NOTE ---
+def print_bias_note():
+    print("\n--- Review Bias Note ---")
+    print("The review dataset may contain a negative skew, as dissatisfied users are more likely to leave reviews.")
+    print("Additionally, review counts per rating are uneven, which can influence average sentiment and rating metrics.")
+    print("This should be considered when interpreting insights and recommendations.")
+
+
+def run_report(database, themes_file=THEMES_FILE, figures_dir=FIGURES_DIR,
+               output_file=RECOMMENDATIONS_FILE, figures=True, report_file=REPORT_FILE, workers=None):
+    """
+    Insights, figures and recommendations from the reviews in the database.
+    With figures, everything is also bundled into one HTML file, report_file.
+    """
+    with database.connection() as conn:
+        if rollups.ensure_rollups(conn):
+            print("Applied pending schema migrations (includes the review rollup).")
+    summary, themes = load_data(database, themes_file)
+
+    drivers = sample_reviews(database, summary, 'positive')
+    pain_points = sample_reviews(database, summary, 'negative')
+    bank_mapping = add_bank_names(summary, themes)
+
+    # Print for verification
+    print("\nDrivers per bank:")
+    for bank_id, texts in drivers.items():
+        print(f"{bank_mapping[bank_id]}: {texts}")
+
+    print("\nPain points per bank:")
+    for bank_id, texts in pain_points.items():
+        print(f"{bank_mapping[bank_id]}: {texts}")
+
+    avg_ratings, avg_sentiment = compare_banks(summary)
+    rendered = plot_figures(summary, themes, avg_ratings, avg_sentiment, figures_dir, workers) if figures else None
+
+    print("\n--- Recommendations per Bank ---")
+    recommendations = build_recommendations(summary, drivers, pain_points, bank_mapping)
+
+    # Print recommendations
+    for bank, info in recommendations.items():
+        print(f"\nBank: {bank}")
+        print(f"Drivers: {info['drivers']}")
+        print(f"Pain Points: {info['pain_points']}")
+        print(f"Recommendations: {info['recommendations']}")
+
+    df_recommendations = save_recommendations(recommendations, output_file)
+    if rendered is not None:
+        report_renderer.write_bundle(report_file, rendered, figures_dir, [
+            ("Summary per bank", summary.drop(columns="bank_id")),
+            ("Recommendations", df_recommendations),
+        ])
+        print(f"Report bundle saved to {report_file}")
+    print_bias_note()
+    return recommendations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Insights, figures and recommendations per bank.")
+    parser.add_argument("--show", action="store_true",
+                        help="Open the report bundle in a browser when done")
+    parser.add_argument("--no-figures", action="store_true",
+                        help="Skip the figures (and their plotting libraries); only write the CSV")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes drawing figures (default: one per core; 0 = none)")
+    parser.add_argument("--report-file", default=REPORT_FILE)
+    args = parser.parse_args()
+
+    run_report(get_database(), figures=not args.no_figures, report_file=args.report_file, workers=args.workers)
+    if args.show and not args.no_figures:
+        import webbrowser
+        webbrowser.open(f"file://{os.path.abspath(args.report_file)}")
+
+
+if __name__ == "__main__":
+    main()
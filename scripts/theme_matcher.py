@@ -0,0 +1,95 @@
+"""
+theme_matcher.py
+----------------
+Rule-based theme assignment driven by themes.yaml.
+
+All terms of all themes are compiled once into a single word-boundary
+regex (one named group per theme), so matching cost doesn't grow with one
+`in` scan per term, and "ui" no longer matches inside "build" or "guide".
+Matching runs over a whole pandas column at once (str.extractall).
+"""
+
+import re
+
+import pandas as pd
+import yaml
+
+THEMES_FILE = "themes.yaml"
+
+
+def _term_pattern(term):
+    """Whole-word pattern for a term; a trailing * allows any word ending."""
+    if term.endswith("*"):
+        return r"\b" + re.escape(term[:-1].lower()) + r"\w*\b"
+    return r"\b" + re.escape(term.lower()) + r"\b"
+
+
+class ThemeMatcher:
+    """Compiled theme taxonomy: [(theme, [terms])] in priority order."""
+
+    def __init__(self, themes, default="Feature / Others"):
+        self.names = [name for name, _ in themes]
+        self.default = default
+        groups = []
+        for i, (_, terms) in enumerate(themes):
+            # Longer terms first so e.g. "customer service" wins over "customer"
+            alternatives = "|".join(_term_pattern(t) for t in sorted(terms, key=len, reverse=True))
+            groups.append(f"(?P<t{i}>{alternatives})")
+        self.regex = re.compile("|".join(groups))
+
+    @classmethod
+    def from_file(cls, path=THEMES_FILE):
+        with open(path) as f:
+            config = yaml.safe_load(f)
+        themes = sorted(
+            enumerate(config["themes"]),
+            key=lambda item: (item[1].get("priority", item[0]), item[0])
+        )
+        return cls(
+            [(theme["name"], theme["terms"]) for _, theme in themes],
+            default=config.get("default", "Feature / Others")
+        )
+
+    # -------------------------
+    # Single text
+    # -------------------------
+    def match(self, text):
+        """All themes found in text, in priority order."""
+        if not isinstance(text, str):
+            return []
+        found = {int(m.lastgroup[1:]) for m in self.regex.finditer(text.lower())}
+        return [self.names[i] for i in sorted(found)]
+
+    def assign(self, text):
+        """Highest-priority theme found in text, or the default theme."""
+        matches = self.match(text)
+        return matches[0] if matches else self.default
+
+    # -------------------------
+    # Whole column
+    # -------------------------
+    def match_frame(self, texts):
+        """Boolean DataFrame (rows x themes, priority order) of theme hits."""
+        texts = pd.Series(texts)
+        index = texts.index
+        lowered = texts.where(texts.map(type) == str, "").str.lower().reset_index(drop=True)
+        found = lowered.str.extractall(self.regex)
+        hits = found.notna().groupby(level=0).any()
+        hits = hits.reindex(range(len(lowered)), fill_value=False)
+        hits = hits.reindex(columns=[f"t{i}" for i in range(len(self.names))], fill_value=False)
+        hits.columns = self.names
+        hits.index = index
+        return hits.astype(bool)
+
+    def assign_series(self, texts):
+        """Vectorized assign(): highest-priority theme per row."""
+        hits = self.match_frame(texts)
+        if not self.names:
+            return pd.Series(self.default, index=hits.index)
+        return hits.idxmax(axis=1).where(hits.any(axis=1), self.default)
+
+    def match_series(self, texts, sep=", "):
+        """Vectorized multi-label output: every matched theme per row, joined by sep."""
+        hits = self.match_frame(texts)
+        names = pd.Series(self.names)
+        return hits.apply(lambda row: sep.join(names[row.values]) or self.default, axis=1)
@@ -0,0 +1,128 @@
+"""
+vader_scoring.py
+----------------
+VADER sentiment shared by sentiment_analysis.py, task_2_analysis.py and
+the sentiment service.
+
+- get_sentiment(text): one text -> (label, compound)
+- score_many(texts) / VaderScorer: a whole column at once. Texts are
+  de-duplicated first (pd.factorize), the unique texts are split into
+  chunks across a process pool (each worker builds the lexicon once), and
+  the compound scores are scattered back to every row.
+
+Labels use the same thresholds everywhere: compound >= +0.05 is positive,
+<= -0.05 negative, anything in between neutral. Empty or missing text is
+neutral with a score of 0.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+CHUNK_SIZE = 2000          # unique texts per task sent to a worker
+MIN_PARALLEL = 5000        # fewer unique texts than this are scored in-process
+
+
+@lru_cache(maxsize=None)
+def get_analyzer():
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+
+def label_for(compound):
+    if compound >= POSITIVE_THRESHOLD:
+        return "positive"
+    elif compound <= NEGATIVE_THRESHOLD:
+        return "negative"
+    else:
+        return "neutral"
+
+
+def labels_for(compounds):
+    """Vectorized label_for over an array of compound scores."""
+    compounds = np.asarray(compounds, dtype=float)
+    return np.select(
+        [compounds >= POSITIVE_THRESHOLD, compounds <= NEGATIVE_THRESHOLD],
+        ["positive", "negative"], default="neutral"
+    )
+
+
+def compound(text):
+    if not isinstance(text, str) or not text:
+        return 0
+    return get_analyzer().polarity_scores(text)["compound"]
+
+
+def get_sentiment(text):
+    """(label, compound score) for one text."""
+    score = compound(text)
+    return label_for(score), score
+
+
+def _score_chunk(texts):
+    return [compound(text) for text in texts]
+
+
+# -------------------------
+# Column scoring
+# -------------------------
+class VaderScorer:
+    """
+    Scores lists of texts, de-duplicated and spread over `workers` processes.
+    The pool is started on first use and reused until close(), so scoring
+    many chunks (e.g. incremental DB scoring) pays for it once.
+    workers=0 scores in this process.
+    """
+
+    def __init__(self, workers=None, chunk_size=CHUNK_SIZE, min_parallel=MIN_PARALLEL):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.min_parallel = min_parallel
+        self._pool = None
+
+    def compounds(self, texts):
+        """Compound score per text, as a float array in input order."""
+        texts = pd.Series(texts, dtype=object).where(lambda s: s.map(type) == str, "")
+        codes, uniques = pd.factorize(texts)
+        uniques = list(uniques)
+        if self.workers and len(uniques) >= self.min_parallel:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, initializer=get_analyzer)
+            chunks = [uniques[i:i + self.chunk_size] for i in range(0, len(uniques), self.chunk_size)]
+            unique_scores = [s for chunk in self._pool.map(_score_chunk, chunks) for s in chunk]
+        else:
+            unique_scores = _score_chunk(uniques)
+        return np.asarray(unique_scores, dtype=float)[codes] if len(codes) else np.empty(0)
+
+    def score_frame(self, texts):
+        """DataFrame of sentiment_label / sentiment_score aligned with texts."""
+        scores = self.compounds(texts)
+        index = texts.index if isinstance(texts, pd.Series) else None
+        return pd.DataFrame({"sentiment_label": labels_for(scores), "sentiment_score": scores}, index=index)
+
+    def __call__(self, texts):
+        """[(label, score)] per text, like get_sentiment on each."""
+        scores = self.compounds(texts)
+        return [(label_for(s), float(s)) for s in scores]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def score_many(texts, workers=None):
+    """One-off column scoring: [(label, score)] per text."""
+    with VaderScorer(workers) as scorer:
+        return scorer(texts)
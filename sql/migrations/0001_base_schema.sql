@@ -0,0 +1,73 @@
+-- 0001_base_schema.sql: banks and reviews, as the loader expects them
+--
+-- Brings databases created by either of the old DDLs (sql/schema.sql or
+-- the inline CREATE TABLEs in insert_reviews.py) to the same shape:
+-- bank_name is UNIQUE (the loader upserts on it) and review_key is the
+-- reviews natural key.
+
+CREATE TABLE IF NOT EXISTS banks (
+    bank_id SERIAL PRIMARY KEY,
+    bank_name TEXT NOT NULL,
+    app_name TEXT
+);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_indexes
+        WHERE schemaname = current_schema() AND tablename = 'banks'
+          AND indexdef LIKE 'CREATE UNIQUE INDEX % (bank_name)'
+    ) THEN
+        ALTER TABLE banks ADD CONSTRAINT banks_bank_name_key UNIQUE (bank_name);
+    END IF;
+END;
+$$;
+
+CREATE TABLE IF NOT EXISTS reviews (
+    review_id SERIAL PRIMARY KEY,
+    bank_id INT REFERENCES banks(bank_id),
+    review_text TEXT,
+    rating INT,
+    review_date DATE,
+    sentiment_label TEXT,
+    sentiment_score FLOAT,
+    sentiment_model TEXT,
+    sentiment_hash TEXT,
+    source TEXT,
+    review_key TEXT
+);
+
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS sentiment_model TEXT;
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS sentiment_hash TEXT;
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS source TEXT;
+ALTER TABLE reviews ADD COLUMN IF NOT EXISTS review_key TEXT;
+
+-- Rows loaded before review_key existed get the key the loader computes
+-- (insert_reviews.review_key: md5 of bank, date, rating and text joined by
+-- \x1f, missing values as ''), so reloading them is a no-op. Exact
+-- duplicates among them, which the old loader allowed, keep one row on
+-- the plain key; the others get '<key>-<review_id>' so the index builds.
+UPDATE reviews AS r
+SET review_key = CASE
+    WHEN k.n = 1 AND NOT EXISTS (SELECT 1 FROM reviews AS o WHERE o.review_key = k.key) THEN k.key
+    ELSE k.key || '-' || r.review_id
+END
+FROM (
+    SELECT review_id, key, row_number() OVER (PARTITION BY key ORDER BY review_id) AS n
+    FROM (
+        SELECT r.review_id, md5(concat_ws(E'\x1f',
+            coalesce(b.bank_name, ''), coalesce(to_char(r.review_date, 'YYYY-MM-DD'), ''),
+            coalesce(r.rating::text, ''), coalesce(r.review_text, ''))) AS key
+        FROM reviews AS r LEFT JOIN banks AS b ON b.bank_id = r.bank_id
+        WHERE r.review_key IS NULL
+    ) AS keys
+) AS k
+WHERE r.review_id = k.review_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS reviews_review_key_idx ON reviews (review_key);
+
+INSERT INTO banks (bank_name, app_name) VALUES
+    ('Commercial Bank of Ethiopia', 'CBE Mobile App'),
+    ('Bank of Abyssinia', 'BOA Mobile App'),
+    ('Dashen Bank', 'Dashen Mobile App')
+ON CONFLICT (bank_name) DO NOTHING;
@@ -0,0 +1,37 @@
+-- 0002_review_enums.sql: enum types for sentiment_label and source
+--
+-- Both columns were free text. Labels are lowercased on the way in (the
+-- DistilBERT pipeline writes POSITIVE/NEGATIVE); anything that still isn't
+-- a known label becomes NULL, so it is picked up by the next scoring run.
+-- review_source starts with every source already in the table; new
+-- sources need a migration: ALTER TYPE review_source ADD VALUE '...'.
+
+DO $$
+BEGIN
+    IF to_regtype('review_sentiment') IS NULL THEN
+        CREATE TYPE review_sentiment AS ENUM ('positive', 'neutral', 'negative');
+    END IF;
+    IF to_regtype('review_source') IS NULL THEN
+        EXECUTE (
+            SELECT format('CREATE TYPE review_source AS ENUM (%s)',
+                          string_agg(quote_literal(source), ', ' ORDER BY source <> 'Google Play', source))
+            FROM (
+                SELECT 'Google Play' AS source
+                UNION
+                SELECT DISTINCT trim(source::TEXT) FROM reviews WHERE trim(source::TEXT) <> ''
+            ) sources
+        );
+    END IF;
+END;
+$$;
+
+ALTER TABLE reviews
+    ALTER COLUMN sentiment_label TYPE review_sentiment USING (
+        CASE WHEN lower(trim(sentiment_label::TEXT)) IN ('positive', 'neutral', 'negative')
+             THEN lower(trim(sentiment_label::TEXT))::review_sentiment
+        END
+    ),
+    ALTER COLUMN source TYPE review_source USING (
+        COALESCE(NULLIF(trim(source::TEXT), ''), 'Google Play')::review_source
+    ),
+    ALTER COLUMN source SET DEFAULT 'Google Play';
@@ -0,0 +1,124 @@
+-- 0003_partition_reviews.sql: range-partition reviews by review_date, add indexes
+--
+-- reviews becomes a partitioned table with one partition per year
+-- (reviews_y2025, ...) plus reviews_undated, the DEFAULT partition for
+-- reviews without a date. Writers call create_review_partitions() for the
+-- dates they are about to insert; rows that land in reviews_undated for a
+-- year that has no partition yet are moved when it is created.
+--
+-- Indexes follow the access paths:
+--   (bank_id, review_date)       per-bank, per-date queries and rollup rebuilds
+--   (bank_id, sentiment_label)   per-bank label counts and example samples
+--   (review_date)                date ranges inside a partition
+--   (review_id)                  keyset pagination (incremental scoring, keywords)
+--   (review_key, review_date)    the natural key; unique keys of a partitioned
+--                                table must include review_date, which the key
+--                                is derived from anyway. NULLS NOT DISTINCT
+--                                (PostgreSQL 15+) keeps undated reviews unique.
+-- review_id keeps its sequence but is no longer a primary key, for the same
+-- reason; it is only ever assigned from the sequence.
+
+-- The natural key index below treats NULL keys as equal, so every row
+-- needs its key first. 0001 fills them, but databases that applied 0001
+-- before it did can still have rows without one: same backfill as there.
+UPDATE reviews AS r
+SET review_key = CASE
+    WHEN k.n = 1 AND NOT EXISTS (SELECT 1 FROM reviews AS o WHERE o.review_key = k.key) THEN k.key
+    ELSE k.key || '-' || r.review_id
+END
+FROM (
+    SELECT review_id, key, row_number() OVER (PARTITION BY key ORDER BY review_id) AS n
+    FROM (
+        SELECT r.review_id, md5(concat_ws(E'\x1f',
+            coalesce(b.bank_name, ''), coalesce(to_char(r.review_date, 'YYYY-MM-DD'), ''),
+            coalesce(r.rating::text, ''), coalesce(r.review_text, ''))) AS key
+        FROM reviews AS r LEFT JOIN banks AS b ON b.bank_id = r.bank_id
+        WHERE r.review_key IS NULL
+    ) AS keys
+) AS k
+WHERE r.review_id = k.review_id;
+
+ALTER TABLE reviews RENAME TO reviews_unpartitioned;
+
+CREATE TABLE reviews (
+    review_id INT NOT NULL,
+    bank_id INT REFERENCES banks(bank_id),
+    review_text TEXT,
+    rating SMALLINT CHECK (rating BETWEEN 1 AND 5),
+    review_date DATE,
+    sentiment_label review_sentiment,
+    sentiment_score DOUBLE PRECISION,
+    sentiment_model TEXT,
+    sentiment_hash TEXT,
+    source review_source DEFAULT 'Google Play',
+    review_key TEXT
+) PARTITION BY RANGE (review_date);
+
+CREATE TABLE reviews_undated PARTITION OF reviews DEFAULT;
+
+-- Keep the existing id sequence (dropping the old table would drop it)
+DO $$
+DECLARE
+    seq TEXT := pg_get_serial_sequence('reviews_unpartitioned', 'review_id');
+BEGIN
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY reviews.review_id', seq);
+    EXECUTE format('ALTER TABLE reviews ALTER COLUMN review_id SET DEFAULT nextval(%L)', seq);
+END;
+$$;
+
+-- Yearly partitions covering [first_date, last_date]; returns how many
+-- were created. Safe to call concurrently with reads; callers that insert
+-- should call it first, in the same transaction.
+CREATE OR REPLACE FUNCTION create_review_partitions(first_date DATE, last_date DATE) RETURNS INT
+LANGUAGE plpgsql AS $$
+DECLARE
+    year INT;
+    part_name TEXT;
+    created INT := 0;
+BEGIN
+    IF first_date IS NULL OR last_date IS NULL
+       OR NOT isfinite(first_date) OR NOT isfinite(last_date) THEN
+        RETURN 0;
+    END IF;
+    FOR year IN EXTRACT(YEAR FROM first_date)::INT .. EXTRACT(YEAR FROM last_date)::INT LOOP
+        part_name := format('reviews_y%s', year);
+        CONTINUE WHEN to_regclass(part_name) IS NOT NULL;
+        -- Build it detached, move that year's rows out of the default
+        -- partition, then attach (attaching checks the default holds none)
+        EXECUTE format('CREATE TABLE %I (LIKE reviews INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part_name);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM reviews_undated WHERE review_date >= %L AND review_date < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            make_date(year, 1, 1), make_date(year + 1, 1, 1), part_name
+        );
+        EXECUTE format(
+            'ALTER TABLE reviews ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            part_name, make_date(year, 1, 1), make_date(year + 1, 1, 1)
+        );
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+SELECT create_review_partitions(MIN(review_date), MAX(review_date)) FROM reviews_unpartitioned;
+
+INSERT INTO reviews (
+    review_id, bank_id, review_text, rating, review_date, sentiment_label,
+    sentiment_score, sentiment_model, sentiment_hash, source, review_key
+)
+SELECT review_id, bank_id, review_text, rating, review_date, sentiment_label,
+       sentiment_score, sentiment_model, sentiment_hash, source, review_key
+FROM reviews_unpartitioned;
+
+DROP TABLE reviews_unpartitioned;
+
+-- Built after the copy (cheaper than maintaining them row by row);
+-- partitions created later get them automatically.
+CREATE UNIQUE INDEX reviews_review_key_idx ON reviews (review_key, review_date) NULLS NOT DISTINCT;
+CREATE INDEX reviews_review_id_idx ON reviews (review_id);
+CREATE INDEX reviews_bank_date_idx ON reviews (bank_id, review_date);
+CREATE INDEX reviews_bank_label_idx ON reviews (bank_id, sentiment_label);
+CREATE INDEX reviews_date_idx ON reviews (review_date);
+
+ANALYZE reviews;
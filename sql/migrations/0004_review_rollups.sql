@@ -0,0 +1,154 @@
+-- 0004_review_rollups.sql: per-bank, per-day review aggregates for reporting
+--
+-- review_daily_rollup holds counts, rating sums/histogram and sentiment
+-- sums/label counts per (bank_id, review_date). Statement-level triggers
+-- fold every INSERT, UPDATE and DELETE on reviews into it (one grouped
+-- upsert per statement, so bulk loads and sentiment write-backs stay
+-- cheap), and bank_review_summary rolls it up per bank. Reports read the
+-- summary instead of scanning reviews.
+--
+-- Safe to rerun: the last statement rebuilds the rollup from reviews.
+-- Reviews without a date are counted under '-infinity'; reviews without
+-- a bank are not counted.
+
+CREATE TABLE IF NOT EXISTS review_daily_rollup (
+    bank_id INT NOT NULL,
+    review_date DATE NOT NULL,
+    n_reviews INT NOT NULL DEFAULT 0,
+    n_rated INT NOT NULL DEFAULT 0,
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    rating_1 INT NOT NULL DEFAULT 0,
+    rating_2 INT NOT NULL DEFAULT 0,
+    rating_3 INT NOT NULL DEFAULT 0,
+    rating_4 INT NOT NULL DEFAULT 0,
+    rating_5 INT NOT NULL DEFAULT 0,
+    n_scored INT NOT NULL DEFAULT 0,
+    sentiment_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    n_positive INT NOT NULL DEFAULT 0,
+    n_neutral INT NOT NULL DEFAULT 0,
+    n_negative INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bank_id, review_date)
+);
+
+-- Aggregates of `source` (a query over reviews-shaped rows with a `sign`
+-- column: +1 to add a row, -1 to remove it), grouped like the rollup.
+CREATE OR REPLACE FUNCTION review_rollup_delta_sql(source TEXT) RETURNS TEXT
+LANGUAGE sql AS $$
+    SELECT format($q$
+        SELECT bank_id,
+               COALESCE(review_date, '-infinity'::date) AS review_date,
+               SUM(sign) AS n_reviews,
+               SUM(CASE WHEN rating IS NOT NULL THEN sign ELSE 0 END) AS n_rated,
+               SUM(sign * COALESCE(rating, 0)) AS rating_sum,
+               SUM(CASE WHEN rating = 1 THEN sign ELSE 0 END) AS rating_1,
+               SUM(CASE WHEN rating = 2 THEN sign ELSE 0 END) AS rating_2,
+               SUM(CASE WHEN rating = 3 THEN sign ELSE 0 END) AS rating_3,
+               SUM(CASE WHEN rating = 4 THEN sign ELSE 0 END) AS rating_4,
+               SUM(CASE WHEN rating = 5 THEN sign ELSE 0 END) AS rating_5,
+               SUM(CASE WHEN sentiment_score IS NOT NULL THEN sign ELSE 0 END) AS n_scored,
+               SUM(sign * COALESCE(sentiment_score, 0)) AS sentiment_sum,
+               SUM(CASE WHEN sentiment_label = 'positive' THEN sign ELSE 0 END) AS n_positive,
+               SUM(CASE WHEN sentiment_label = 'neutral' THEN sign ELSE 0 END) AS n_neutral,
+               SUM(CASE WHEN sentiment_label = 'negative' THEN sign ELSE 0 END) AS n_negative
+        FROM (%s) AS changed
+        WHERE bank_id IS NOT NULL
+        GROUP BY 1, 2
+    $q$, source)
+$$;
+
+CREATE OR REPLACE FUNCTION review_rollup_trigger() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    source TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        source := 'SELECT 1 AS sign, bank_id, review_date, rating, sentiment_score, sentiment_label FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        source := 'SELECT -1 AS sign, bank_id, review_date, rating, sentiment_score, sentiment_label FROM old_rows';
+    ELSE
+        source := 'SELECT 1 AS sign, bank_id, review_date, rating, sentiment_score, sentiment_label FROM new_rows '
+               || 'UNION ALL '
+               || 'SELECT -1, bank_id, review_date, rating, sentiment_score, sentiment_label FROM old_rows';
+    END IF;
+
+    EXECUTE format($q$
+        INSERT INTO review_daily_rollup AS r
+        %s
+        ON CONFLICT (bank_id, review_date) DO UPDATE SET
+            n_reviews = r.n_reviews + EXCLUDED.n_reviews,
+            n_rated = r.n_rated + EXCLUDED.n_rated,
+            rating_sum = r.rating_sum + EXCLUDED.rating_sum,
+            rating_1 = r.rating_1 + EXCLUDED.rating_1,
+            rating_2 = r.rating_2 + EXCLUDED.rating_2,
+            rating_3 = r.rating_3 + EXCLUDED.rating_3,
+            rating_4 = r.rating_4 + EXCLUDED.rating_4,
+            rating_5 = r.rating_5 + EXCLUDED.rating_5,
+            n_scored = r.n_scored + EXCLUDED.n_scored,
+            sentiment_sum = r.sentiment_sum + EXCLUDED.sentiment_sum,
+            n_positive = r.n_positive + EXCLUDED.n_positive,
+            n_neutral = r.n_neutral + EXCLUDED.n_neutral,
+            n_negative = r.n_negative + EXCLUDED.n_negative
+    $q$, review_rollup_delta_sql(source));
+
+    IF TG_OP <> 'INSERT' THEN
+        DELETE FROM review_daily_rollup WHERE n_reviews = 0;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Transition tables need one trigger per event
+DROP TRIGGER IF EXISTS reviews_rollup_insert ON reviews;
+CREATE TRIGGER reviews_rollup_insert
+    AFTER INSERT ON reviews
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION review_rollup_trigger();
+
+DROP TRIGGER IF EXISTS reviews_rollup_update ON reviews;
+CREATE TRIGGER reviews_rollup_update
+    AFTER UPDATE ON reviews
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION review_rollup_trigger();
+
+DROP TRIGGER IF EXISTS reviews_rollup_delete ON reviews;
+CREATE TRIGGER reviews_rollup_delete
+    AFTER DELETE ON reviews
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION review_rollup_trigger();
+
+-- Full recount, for installing the rollup on an existing reviews table
+-- (or resyncing after bulk changes made with triggers disabled)
+CREATE OR REPLACE FUNCTION rebuild_review_rollup() RETURNS VOID
+LANGUAGE plpgsql AS $$
+BEGIN
+    LOCK TABLE reviews IN SHARE MODE;
+    DELETE FROM review_daily_rollup;
+    EXECUTE 'INSERT INTO review_daily_rollup '
+         || review_rollup_delta_sql('SELECT 1 AS sign, * FROM reviews');
+END;
+$$;
+
+-- One row per bank; reads banks x days rollup rows, not reviews
+CREATE OR REPLACE VIEW bank_review_summary AS
+SELECT b.bank_id,
+       b.bank_name,
+       SUM(r.n_reviews)::BIGINT AS n_reviews,
+       SUM(r.n_rated)::BIGINT AS n_rated,
+       SUM(r.rating_sum)::DOUBLE PRECISION / NULLIF(SUM(r.n_rated), 0) AS avg_rating,
+       SUM(r.n_scored)::BIGINT AS n_scored,
+       SUM(r.sentiment_sum) / NULLIF(SUM(r.n_scored), 0) AS avg_sentiment,
+       SUM(r.n_positive)::BIGINT AS n_positive,
+       SUM(r.n_neutral)::BIGINT AS n_neutral,
+       SUM(r.n_negative)::BIGINT AS n_negative,
+       SUM(r.rating_1)::BIGINT AS rating_1,
+       SUM(r.rating_2)::BIGINT AS rating_2,
+       SUM(r.rating_3)::BIGINT AS rating_3,
+       SUM(r.rating_4)::BIGINT AS rating_4,
+       SUM(r.rating_5)::BIGINT AS rating_5,
+       MIN(r.review_date) FILTER (WHERE r.review_date > '-infinity') AS first_review,
+       MAX(r.review_date) AS last_review
+FROM review_daily_rollup r
+JOIN banks b ON b.bank_id = r.bank_id
+GROUP BY b.bank_id, b.bank_name;
+
+SELECT rebuild_review_rollup();
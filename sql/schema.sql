@@ -1,30 +1,19 @@
 -- schema.sql for bank_reviews database
+--
+-- The schema itself lives in sql/migrations and is applied with
+--     python scripts/migrate.py
+-- (insert_reviews.py also applies pending migrations before loading).
+-- This script only resets a database so the migrations start from scratch.
 
--- Drop tables if they already exist (safe to rerun)
+-- Drop everything the migrations create (safe to rerun)
+DROP VIEW IF EXISTS bank_review_summary;
+DROP TABLE IF EXISTS review_daily_rollup;
 DROP TABLE IF EXISTS reviews;
 DROP TABLE IF EXISTS banks;
-
--- Create banks table
-CREATE TABLE banks (
-    bank_id SERIAL PRIMARY KEY,
-    bank_name VARCHAR(255) NOT NULL,
-    app_name VARCHAR(255) NOT NULL
-);
-
--- Create reviews table
-CREATE TABLE reviews (
-    review_id SERIAL PRIMARY KEY,
-    bank_id INT NOT NULL REFERENCES banks(bank_id) ON DELETE CASCADE,
-    review_text TEXT NOT NULL,
-    rating INT CHECK (rating >= 1 AND rating <= 5),
-    review_date DATE,
-    sentiment_label VARCHAR(50),
-    sentiment_score FLOAT,
-    source VARCHAR(50)
-);
-
--- Optional: Insert sample banks (so you can link reviews immediately)
-INSERT INTO banks (bank_name, app_name) VALUES
-('Commercial Bank of Ethiopia', 'CBE Mobile App'),
-('Bank of Abyssinia', 'BOA Mobile App'),
-('Dashen Bank', 'Dashen Mobile App');
\ No newline at end of file
+DROP TABLE IF EXISTS schema_migrations;
+DROP FUNCTION IF EXISTS review_rollup_trigger();
+DROP FUNCTION IF EXISTS review_rollup_delta_sql(TEXT);
+DROP FUNCTION IF EXISTS rebuild_review_rollup();
+DROP FUNCTION IF EXISTS create_review_partitions(DATE, DATE);
+DROP TYPE IF EXISTS review_sentiment;
+DROP TYPE IF EXISTS review_source;
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Scripts import each other as top-level modules (they are run as
+# `python scripts/<name>.py` from the repo root), so mirror that here.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+os.chdir(ROOT)
@@ -0,0 +1,60 @@
+"""Minimal stand-ins for psycopg2 connections, for tests that run without PostgreSQL."""
+
+
+class FakeConnection:
+    encoding = "UTF8"
+
+    def __init__(self, fetch_results=None):
+        self.cursors = []
+        self.commits = 0
+        self.fetch_results = list(fetch_results or [])
+
+    def cursor(self, *args, **kwargs):
+        cur = FakeCursor(self)
+        self.cursors.append(cur)
+        return cur
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    @property
+    def statements(self):
+        return [sql for cur in self.cursors for sql in cur.statements]
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.statements = []
+        self.params = []
+        self.copied = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        if isinstance(sql, bytes):
+            sql = sql.decode("utf-8")
+        self.statements.append(sql)
+        self.params.append(params)
+
+    def mogrify(self, template, args):
+        return (template.decode() % tuple(repr(a) for a in args)).encode()
+
+    def copy_expert(self, sql, stream, size=8192):
+        self.statements.append(sql)
+        while True:
+            chunk = stream.read(size)
+            if not chunk:
+                break
+            self.copied.append(chunk)
+
+    def fetchall(self):
+        return self.connection.fetch_results.pop(0)
+
+    def close(self):
+        pass
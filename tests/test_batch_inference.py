@@ -0,0 +1,48 @@
+from batch_inference import BatchInferenceEngine, bucket_batches, pad_batch, percentile
+
+
+class FakeTokenizer:
+    pad_token_id = 0
+
+    def __call__(self, texts, truncation=True, max_length=512):
+        ids = [[len(w) for w in t.split()][:max_length] for t in texts]
+        return {"input_ids": ids}
+
+
+def fake_predict(batch_ids, pad_id):
+    input_ids, _ = pad_batch(batch_ids, pad_id)
+    assert len({len(row) for row in input_ids}) == 1
+    return [("POSITIVE", float(len(ids))) for ids in batch_ids], 0.01
+
+
+def test_bucket_batches_groups_similar_lengths():
+    items = [(i, [1] * n) for i, n in enumerate([5, 1, 4, 2])]
+    batches = bucket_batches(items, 2)
+    assert [[k for k, _ in b] for b in batches] == [[1, 3], [2, 0]]
+
+
+def test_pad_batch_pads_to_batch_max():
+    ids, mask = pad_batch([[7, 7], [7]], 0)
+    assert ids == [[7, 7], [7, 0]]
+    assert mask == [[1, 1], [1, 0]]
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile([], 95) == 0.0
+
+
+def test_engine_streams_all_texts_and_truncates_by_tokens():
+    engine = BatchInferenceEngine(batch_size=2, workers=0, max_length=3,
+                                  tokenizer=FakeTokenizer(), predict_fn=fake_predict)
+    texts = ["good app", "", "a b c d e", None, "fine"]
+    results = {key: (label, score) for key, label, score in engine.run(enumerate(texts))}
+
+    assert results[0] == ("POSITIVE", 2.0)
+    assert results[2] == ("POSITIVE", 3.0)
+    assert results[1] == ("Neutral", 0.5)
+    assert results[3] == ("Neutral", 0.5)
+    assert engine.stats.reviews == 3
+    assert engine.stats.batches == 2
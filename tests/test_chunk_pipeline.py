@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from chunk_pipeline import run_overlapped
+
+
+def test_results_are_written_in_order():
+    written = []
+    run_overlapped(iter(range(20)), lambda x: x * 10, written.append, depth=1)
+    assert written == [x * 10 for x in range(20)]
+
+
+def test_reading_and_writing_overlap_with_processing():
+    threads = set()
+
+    def chunks():
+        for i in range(4):
+            threads.add(("read", threading.current_thread().name))
+            time.sleep(0.05)
+            yield i
+
+    def write(result):
+        threads.add(("write", threading.current_thread().name))
+        time.sleep(0.05)
+
+    def process(chunk):
+        time.sleep(0.05)
+        return chunk
+
+    start = time.perf_counter()
+    run_overlapped(chunks(), process, write)
+    # three 0.2s stages take about 0.3s overlapped, 0.6s one after another
+    assert time.perf_counter() - start < 0.5
+    assert threads == {("read", "chunk-reader"), ("write", "chunk-writer")}
+
+
+def test_reader_stays_at_most_depth_chunks_ahead():
+    read, processed = [], []
+
+    def chunks():
+        for i in range(10):
+            read.append(i)
+            yield i
+
+    def process(chunk):
+        time.sleep(0.02)
+        # depth queued, plus one waiting in the reader and the one being processed
+        assert len(read) - len(processed) <= 2 + 2
+        processed.append(chunk)
+        return chunk
+
+    run_overlapped(chunks(), process, lambda result: None, depth=2)
+    assert processed == list(range(10))
+
+
+@pytest.mark.parametrize("stage", ["read", "process", "write"])
+def test_first_error_stops_every_stage(stage):
+    written = []
+
+    def chunks():
+        for i in range(1000):
+            if stage == "read" and i == 3:
+                raise RuntimeError("read failed")
+            yield i
+
+    def process(chunk):
+        if stage == "process" and chunk == 3:
+            raise RuntimeError("process failed")
+        return chunk
+
+    def write(result):
+        if stage == "write" and result == 3:
+            raise RuntimeError("write failed")
+        written.append(result)
+
+    with pytest.raises(RuntimeError, match=f"{stage} failed"):
+        run_overlapped(chunks(), process, write, depth=1)
+    assert written == list(range(len(written))) and len(written) <= 3
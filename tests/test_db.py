@@ -0,0 +1,96 @@
+import pytest
+
+import db
+import task_2_analysis
+from tests.fakes import FakeConnection
+
+
+@pytest.fixture
+def database():
+    database = db.SQLiteDatabase()
+    with database.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("CREATE TABLE banks (bank_id INTEGER PRIMARY KEY, bank_name TEXT)")
+        cur.execute("CREATE TABLE reviews (review_id INTEGER PRIMARY KEY, bank_id INTEGER, review_text TEXT)")
+        cur.executemany("INSERT INTO banks VALUES (%s, %s)", [(1, "Dashen Bank"), (2, "Bank of Abyssinia")])
+    yield database
+    database.close()
+
+
+def _add_reviews(database, rows):
+    with database.connection() as conn:
+        conn.cursor().executemany("INSERT INTO reviews VALUES (%s, %s, %s)", rows)
+
+
+def test_sqlite_placeholders_are_translated():
+    assert db._sqlite_sql("SELECT %s, %(after)s, %(n)s") == "SELECT ?, :after, :n"
+
+
+def test_iter_frames_streams_in_chunks(database):
+    _add_reviews(database, [(i, 1 + i % 2, f"review {i}") for i in range(1, 8)])
+    frames = list(database.iter_frames(
+        "SELECT review_id, bank_id FROM reviews WHERE review_id > %(after)s ORDER BY review_id",
+        {"after": 2}, chunk_size=2
+    ))
+    assert [len(f) for f in frames] == [2, 2, 1]
+    assert frames[0].columns.tolist() == ["review_id", "bank_id"]
+    assert list(database.iter_rows("SELECT review_id FROM reviews WHERE bank_id = %s", (2,))) == [(1,), (3,), (5,), (7,)]
+
+
+def test_empty_results_keep_their_columns(database):
+    sql = "SELECT review_id, review_text FROM reviews"
+    assert list(database.iter_frames(sql)) == []
+    frame = database.read_frame(sql)
+    assert frame.empty and frame.columns.tolist() == ["review_id", "review_text"]
+
+
+def test_connection_rolls_back_on_error(database):
+    with pytest.raises(RuntimeError):
+        with database.connection() as conn:
+            conn.cursor().execute("INSERT INTO banks VALUES (%s, %s)", (3, "Commercial Bank of Ethiopia"))
+            raise RuntimeError("boom")
+    assert len(database.read_frame("SELECT * FROM banks")) == 2
+
+
+def test_prepared_statement_is_prepared_once_per_connection():
+    statement = db.Prepared("set_label", "UPDATE reviews SET sentiment_label = %s WHERE review_id = %s")
+    first, second = FakeConnection(), FakeConnection()
+    for review_id in (1, 2):
+        statement.execute(first.cursor(), ("positive", review_id))
+    statement.execute(second.cursor(), ("negative", 3))
+
+    assert first.statements == [
+        "PREPARE set_label AS UPDATE reviews SET sentiment_label = $1 WHERE review_id = $2",
+        "EXECUTE set_label (%s, %s)",
+        "EXECUTE set_label (%s, %s)",
+    ]
+    assert second.statements[0].startswith("PREPARE set_label")
+
+
+def test_prepared_statement_runs_directly_on_sqlite(database):
+    statement = db.Prepared("rename_bank", "UPDATE banks SET bank_name = %s WHERE bank_id = %s")
+    with database.connection() as conn:
+        statement.execute(conn.cursor(), ("Dashen", 1))
+    assert list(database.iter_rows("SELECT bank_name FROM banks WHERE bank_id = 1")) == [("Dashen",)]
+
+
+def test_themes_update_incrementally_from_the_database(database, tmp_path):
+    index_file = str(tmp_path / "index.npz")
+    _add_reviews(database, [(1, 1, "slow login"), (2, 2, "great app"), (3, 1, "login error")])
+    themes = task_2_analysis.extract_themes(database, index_file=index_file)
+    assert "login" in themes[1]
+
+    _add_reviews(database, [(4, 2, "login failed"), (5, 2, "login again"), (6, 2, "login slow")])
+    themes = task_2_analysis.extract_themes(database, incremental=True, index_file=index_file)
+    assert themes[2][0] == "login"
+
+    output = tmp_path / "themes.csv"
+    task_2_analysis.save_themes(database, themes, str(output))
+    assert output.read_text().startswith("bank_id,top_keywords")
+
+
+def test_single_slot_pool_has_no_spare_connection():
+    database = db.Database.__new__(db.Database)
+    database.pool_size = 1
+    with database.spare_connection() as conn:
+        assert conn is None
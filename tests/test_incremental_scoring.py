@@ -0,0 +1,64 @@
+import incremental_scoring
+from tests.fakes import FakeConnection
+
+
+def test_text_hash_matches_postgres_md5_of_coalesced_text():
+    # SELECT md5('good app')
+    assert incremental_scoring.text_hash("good app") == "749052ab49ebcbdd1812ce114f98c21f"
+    assert incremental_scoring.text_hash(None) == incremental_scoring.text_hash("")
+
+
+def test_score_incrementally_walks_keyset_chunks():
+    conn = FakeConnection(fetch_results=[
+        [(1, "good app"), (4, "bad")],
+        [(9, None)],
+        [],
+    ])
+    scored = incremental_scoring.score_incrementally(
+        conn, lambda text: ("positive", 1.0), "test", "1", chunk_size=2
+    )
+
+    assert scored == 3
+    selects = [p for cur in conn.cursors for s, p in zip(cur.statements, cur.params)
+               if "WHERE review_id >" in s]
+    assert [p["after"] for p in selects] == [0, 4, 9]
+    assert all("sentiment_model IS DISTINCT FROM" in s
+               for cur in conn.cursors for s in cur.statements if "WHERE review_id >" in s)
+
+    copied = "".join(c for cur in conn.cursors for c in cur.copied).splitlines()
+    assert copied[0].split("\t")[:4] == ["1", "positive", "1.0", "test-1"]
+    assert copied[2].split("\t")[4] == incremental_scoring.text_hash("")
+
+
+def test_full_mode_drops_pending_filter():
+    conn = FakeConnection(fetch_results=[[]])
+    incremental_scoring.score_incrementally(conn, None, "m", "1", full=True)
+    selects = [s for s in conn.statements if "WHERE review_id >" in s]
+    assert "IS DISTINCT FROM" not in selects[0]
+
+
+def test_reads_can_use_their_own_connection():
+    conn, read_conn = FakeConnection(), FakeConnection(fetch_results=[[(1, "good app")], []])
+    scored = incremental_scoring.score_incrementally(
+        conn, lambda text: ("positive", 1.0), "test", "1", read_conn=read_conn
+    )
+
+    assert scored == 1
+    assert not [s for s in conn.statements if "WHERE review_id >" in s]
+    assert len([s for s in read_conn.statements if "WHERE review_id >" in s]) == 2
+    assert read_conn.commits == 2
+    assert any("UPDATE reviews" in s for s in conn.statements)
+
+
+def test_without_a_read_connection_everything_runs_on_the_calling_thread():
+    import threading
+    threads = set()
+
+    class OneThreadConnection(FakeConnection):
+        def cursor(self, *args, **kwargs):
+            threads.add(threading.current_thread())
+            return super().cursor(*args, **kwargs)
+
+    conn = OneThreadConnection(fetch_results=[[(1, "good app")], []])
+    assert incremental_scoring.score_incrementally(conn, lambda text: ("positive", 1.0), "test", "1") == 1
+    assert threads == {threading.current_thread()}
@@ -0,0 +1,52 @@
+import pandas as pd
+
+import insert_reviews
+import migrate
+from tests.fakes import FakeConnection
+
+# schema_migrations reports every migration as applied, then the bank lookup
+APPLIED = [(m.version,) for m in migrate.discover()]
+BANK_IDS = [("Dashen Bank", 3), ("Bank of Abyssinia", 2)]
+
+
+def _reviews():
+    return pd.DataFrame({
+        "review": ["good app", "tab\there", "not working"],
+        "rating": [5, 3, 1],
+        "date": ["2025-12-01", None, "2025-11-30"],
+        "bank": ["Dashen Bank", "Dashen Bank", "Bank of Abyssinia"],
+        "source": ["Google Play"] * 3,
+    })
+
+
+def test_review_key_is_stable_and_distinguishes_rows():
+    a = insert_reviews.review_key("Dashen Bank", "2025-12-01", 5, "good app")
+    assert a == insert_reviews.review_key("Dashen Bank", "2025-12-01", 5, "good app")
+    assert a != insert_reviews.review_key("Dashen Bank", "2025-12-02", 5, "good app")
+
+
+def test_copy_load_resolves_banks_once_and_streams_rows():
+    conn = FakeConnection(fetch_results=[APPLIED, BANK_IDS])
+    stats = insert_reviews.load_reviews(conn, _reviews(), method="copy")
+
+    assert stats["staged"] == 3
+    assert conn.commits == 1
+    bank_lookups = [s for s in conn.statements if "FROM banks" in s]
+    assert len(bank_lookups) == 1
+
+    lines = "".join(conn.cursors[0].copied).splitlines()
+    assert len(lines) == 3
+    assert lines[0].split("\t")[:4] == ["3", "good app", "5", "2025-12-01"]
+    # tabs are escaped and missing dates become NULL
+    assert lines[1].split("\t")[1:4] == ["tab\\there", "3", "\\N"]
+    assert any("ON CONFLICT (review_key, review_date) DO NOTHING" in s for s in conn.statements)
+    assert any("create_review_partitions" in s for s in conn.statements)
+
+
+def test_values_load_pages_rows():
+    conn = FakeConnection(fetch_results=[APPLIED, BANK_IDS])
+    stats = insert_reviews.load_reviews(conn, _reviews(), method="values", page_size=2)
+
+    assert stats["staged"] == 3
+    staging_inserts = [s for s in conn.statements if s.startswith("INSERT INTO reviews_staging")]
+    assert len(staging_inserts) == 2
@@ -0,0 +1,114 @@
+import json
+import pstats
+import threading
+
+import pytest
+
+import instrumentation
+import pipeline
+from instrumentation import Run, count, instrumented, prometheus_text, stage, timed
+
+
+def stages(run):
+    return {s["stage"]: s for s in run.report()["stages"]}
+
+
+def test_stages_accumulate_rows_and_counters_by_name():
+    run = instrumentation.start_run("test")
+    for size in (3, 5):
+        with stage("clean", rows_in=size) as s:
+            count("cache_hits", 2)
+            s.rows_out = size - 1
+    report = stages(run)["clean"]
+    assert report["calls"] == 2
+    assert (report["rows_in"], report["rows_out"]) == (8, 6)
+    assert report["counters"] == {"cache_hits": 4}
+    assert report["rows_per_sec"] > 0
+
+
+def test_counts_go_to_the_innermost_stage_of_their_thread():
+    run = instrumentation.start_run("test")
+    with stage("outer"):
+        with stage("inner"):
+            count("hits")
+        count("misses")
+        thread = threading.Thread(target=lambda: count("lost"))   # no stage open there
+        thread.start()
+        thread.join()
+    count("outside")
+    report = stages(run)
+    assert report["inner"]["counters"] == {"hits": 1}
+    assert report["outer"]["counters"] == {"misses": 1}
+
+
+def test_stages_from_several_threads_share_one_entry():
+    run = instrumentation.start_run("test")
+
+    def work():
+        for _ in range(100):
+            with stage("fetch", rows_out=1):
+                pass
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stages(run)["fetch"]["rows_out"] == 400
+
+
+def test_timed_counts_items_and_closes_the_source():
+    run = instrumentation.start_run("test")
+    closed = []
+
+    def chunks():
+        try:
+            yield [1, 2]
+            yield [3]
+            yield [4, 5, 6]
+        finally:
+            closed.append(True)
+
+    for chunk in timed(chunks(), "read"):
+        if chunk == [3]:
+            break
+    assert closed == [True]
+    assert stages(run)["read"]["rows_out"] == 3
+
+
+def test_prometheus_text():
+    run = Run('night"ly')
+    with run.stage("preprocess.clean", rows_in=10) as s:
+        s.count("cache-hits", 4)
+    run.finish()
+    text = prometheus_text(run.report())
+    assert '# TYPE review_pipeline_stage_seconds gauge' in text
+    assert 'review_pipeline_stage_rows_in{run="night\\"ly",stage="preprocess.clean"} 10' in text
+    assert 'review_pipeline_stage_cache_hits{run="night\\"ly",stage="preprocess.clean"} 4' in text
+    assert 'review_pipeline_run_success{run="night\\"ly"} 1' in text
+    assert "stage_rows_out" not in text     # never set, so not exported
+
+
+def test_reports_are_written_even_when_the_run_fails(tmp_path):
+    json_file, prom_file, profile_file = tmp_path / "run.json", tmp_path / "m.prom", tmp_path / "run.prof"
+    with pytest.raises(RuntimeError):
+        with instrumented("test", str(json_file), str(prom_file), str(profile_file)):
+            with stage("work", rows_in=1):
+                raise RuntimeError("boom")
+    report = json.loads(json_file.read_text())
+    assert report["status"] == "failed"
+    assert report["stages"][0]["stage"] == "work"
+    assert 'review_pipeline_run_success{run="test"} 0' in prom_file.read_text()
+    assert pstats.Stats(str(profile_file)).total_calls > 0
+
+
+def test_pipeline_table_lists_each_stage_with_its_steps(tmp_path):
+    def step(ctx):
+        with stage("load.write", rows_in=1000) as s:
+            s.count("cache_hits", 7)
+
+    with instrumented("pipeline") as run:
+        timings = pipeline.run_pipeline([pipeline.Stage("load", step)], state_file=tmp_path / "state.json")
+    table = pipeline.format_timings(timings, run.report()).splitlines()
+    assert table[1].split()[:2] == ["load", "ran"]
+    assert table[2].split()[0] == "load.write"
+    assert table[2].split()[2:4] == ["1,000", "-"] and table[2].split()[-1] == "7"
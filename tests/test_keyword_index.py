@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from keyword_index import KeywordIndex, top_k_indices
+
+TEXTS = [
+    "app keeps crashing after update", "login fails every time", "great app fast transfers",
+    "transfer failed money not received", "slow app slow login", "love the new update",
+    "otp never arrives login fails", "fast and simple", "crashing on startup again",
+    "customer support never answers", "transfers are fast", "update broke the login",
+]
+BANKS = [1, 2, 3, 1, 2, 3, 1, 2, 3, 1, 2, 3]
+
+
+def legacy_scores(texts, groups):
+    """Per-bank keyword score sums, as task_2_analysis.extract_themes used to compute them."""
+    df = pd.DataFrame({"text": texts, "group": groups})
+    tfidf = TfidfVectorizer(stop_words="english", ngram_range=(1, 2), max_features=100)
+    tfidf.fit(df["text"])
+    names = tfidf.get_feature_names_out()
+    return {
+        group: dict(zip(names, tfidf.transform(df[df["group"] == group]["text"]).sum(axis=0).A1))
+        for group in df["group"].unique()
+    }
+
+
+def test_top_k_indices_orders_ties_by_index():
+    scores = np.array([1.0, 3.0, 2.0, 3.0, 0.0, 2.0])
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 5, 0, 4]
+
+
+def test_matches_per_bank_tfidf():
+    index = KeywordIndex().fit(TEXTS, BANKS)
+    legacy = legacy_scores(TEXTS, BANKS)
+    top = index.top_keywords(5)
+    assert list(top) == [1, 2, 3]
+    for group, keywords in top.items():
+        scores = legacy[group]
+        ranked = sorted(scores.values(), reverse=True)
+        assert np.allclose([scores[kw] for kw in keywords], ranked[:5])
+        # keywords tied with the 5th may be swapped in; anything strictly above must be there
+        assert {kw for kw, s in scores.items() if s > ranked[4] + 1e-12} <= set(keywords)
+
+
+def test_update_adds_documents_and_groups():
+    index = KeywordIndex().fit(TEXTS[:9], BANKS[:9], last_id=9)
+    n_features = len(index.vocabulary)
+    df_before = index.df.copy()
+    index.update(TEXTS[9:] + ["login fails"], BANKS[9:] + [4], last_id=13)
+
+    assert index.n_docs == 13
+    assert index.groups == [1, 2, 3, 4]
+    assert index.last_id == 13
+    assert len(index.vocabulary) == n_features            # vocabulary is fixed until refit
+    assert (index.df >= df_before).all() and index.df.sum() > df_before.sum()
+    assert set(index.top_keywords(2)[4]) == {"login fails", "fails"}
+
+
+def test_update_with_nothing_new_is_a_no_op():
+    index = KeywordIndex().fit(TEXTS, BANKS, last_id=12)
+    sums = index.sums.copy()
+    index.update([], [], last_id=None)
+    assert index.last_id == 12 and np.array_equal(index.sums, sums)
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "keywords.npz"
+    index = KeywordIndex().fit(TEXTS, BANKS, last_id=np.int64(12))
+    index.save(path)
+    loaded = KeywordIndex.load(path)
+
+    assert loaded.last_id == 12 and loaded.n_docs == index.n_docs
+    assert loaded.top_keywords() == index.top_keywords()
+    loaded.update(["login fails"], [2])
+    index.update(["login fails"], [2])
+    assert np.allclose(loaded.sums, index.sums)
@@ -0,0 +1,21 @@
+import pandas as pd
+import pytest
+
+import task_2_sentiment_thematic_analysis as task_2
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    pytest.importorskip("spacy")
+    try:
+        return task_2.get_nlp()
+    except OSError:
+        pytest.skip(f"spaCy model {task_2.SPACY_MODEL} is not installed")
+
+
+def test_batched_keywords_match_one_text_at_a_time(nlp):
+    texts = pd.read_csv("data/cleaned_reviews.csv")["review"].sample(300, random_state=0).tolist()
+    texts += [None, ""]     # non-strings and empty texts are handled the same way too
+    batched = list(task_2.extract_keywords_batch(texts, batch_size=64))
+    assert batched == [task_2.extract_keywords(text) for text in texts]
+    assert any(batched)
@@ -0,0 +1,124 @@
+import os
+
+import pandas as pd
+import pytest
+
+import insert_reviews
+import migrate
+from tests.fakes import FakeConnection
+
+
+def _migrations(tmp_path, *names):
+    for name in names:
+        (tmp_path / name).write_text(f"-- {name}\nSELECT 1;\n")
+    return str(tmp_path)
+
+
+def test_repo_migrations_are_numbered_in_order():
+    versions = [m.version for m in migrate.discover()]
+    assert versions == sorted(versions) == list(range(1, len(versions) + 1))
+
+
+def test_discover_sorts_by_version_and_skips_other_files(tmp_path):
+    directory = _migrations(tmp_path, "0010_later.sql", "0002_second.sql", "README.md", "draft.sql")
+    assert [(m.version, m.name) for m in migrate.discover(directory)] == [(2, "second"), (10, "later")]
+
+
+def test_duplicate_versions_are_rejected(tmp_path):
+    directory = _migrations(tmp_path, "0001_a.sql", "001_b.sql")
+    with pytest.raises(ValueError, match="Duplicate migration version 1"):
+        migrate.discover(directory)
+
+
+def test_migrate_applies_only_pending_in_order(tmp_path):
+    directory = _migrations(tmp_path, "0001_base.sql", "0002_enums.sql", "0003_partitions.sql")
+    conn = FakeConnection(fetch_results=[[(1,)]])
+
+    applied = migrate.migrate(conn, directory)
+
+    assert [m.version for m in applied] == [2, 3]
+    assert conn.commits == 1
+    statements = conn.statements
+    assert "pg_advisory_xact_lock" in statements[0]
+    run = [s for s in statements if s.startswith("-- ")]
+    assert run == ["-- 0002_enums.sql\nSELECT 1;\n", "-- 0003_partitions.sql\nSELECT 1;\n"]
+    recorded = [p for cur in conn.cursors for s, p in zip(cur.statements, cur.params)
+                if s.startswith("INSERT INTO schema_migrations")]
+    assert recorded == [(2, "enums"), (3, "partitions")]
+
+
+def test_migrate_respects_target(tmp_path):
+    directory = _migrations(tmp_path, "0001_base.sql", "0002_enums.sql", "0003_partitions.sql")
+    conn = FakeConnection(fetch_results=[[]])
+    assert [m.version for m in migrate.migrate(conn, directory, target=2)] == [1, 2]
+
+
+# -------------------------
+# Against PostgreSQL (set TEST_DATABASE_DSN to run)
+# -------------------------
+LEGACY_SCHEMA = """
+    CREATE TABLE banks (bank_id SERIAL PRIMARY KEY, bank_name TEXT UNIQUE NOT NULL, app_name TEXT);
+    CREATE TABLE reviews (
+        review_id SERIAL PRIMARY KEY, bank_id INT REFERENCES banks(bank_id), review_text TEXT,
+        rating INT, review_date DATE, sentiment_label TEXT, sentiment_score FLOAT, source TEXT
+    );
+"""
+# What the old loader wrote: no review_key, exact duplicates allowed
+LEGACY_REVIEWS = pd.DataFrame({
+    "bank": ["Dashen Bank", "Dashen Bank", "Dashen Bank", "Bank of Abyssinia", "Bank of Abyssinia", "Dashen Bank"],
+    "review": ["good app", "very slow", "good app", "good app", "crashes on login", "best app"],
+    "rating": [5, 2, 5, 5, 1, 5],
+    "date": ["2025-12-01", "2025-12-01", "2025-12-01", "2025-12-01", None, None],
+})
+
+
+@pytest.fixture
+def pg():
+    dsn = os.environ.get("TEST_DATABASE_DSN")
+    if not dsn:
+        pytest.skip("TEST_DATABASE_DSN is not set")
+    psycopg2 = pytest.importorskip("psycopg2")
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("DROP SCHEMA IF EXISTS test_migrate CASCADE; CREATE SCHEMA test_migrate; SET search_path TO test_migrate")
+    cur.execute(LEGACY_SCHEMA)
+    for row in LEGACY_REVIEWS.itertuples():
+        cur.execute("INSERT INTO banks (bank_name) VALUES (%s) ON CONFLICT DO NOTHING", (row.bank,))
+        cur.execute("""
+            INSERT INTO reviews (bank_id, review_text, rating, review_date, source)
+            SELECT bank_id, %s, %s, %s, 'Google Play' FROM banks WHERE bank_name = %s
+        """, (row.review, row.rating, row.date, row.bank))
+    conn.commit()
+    yield conn
+    conn.rollback()
+    cur = conn.cursor()
+    cur.execute("DROP SCHEMA test_migrate CASCADE")
+    conn.commit()
+    conn.close()
+
+
+def _keys(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT review_id, review_key FROM reviews ORDER BY review_id")
+    return cur.fetchall()
+
+
+def test_legacy_reviews_get_the_loaders_key_and_are_not_reloaded(pg):
+    stats = insert_reviews.load_reviews(pg, LEGACY_REVIEWS)     # migrates first
+    assert stats["inserted"] == 0
+    keys = _keys(pg)
+    expected = [insert_reviews.review_key(r.bank, r.date, r.rating, r.review) for r in LEGACY_REVIEWS.itertuples()]
+    assert [key for _, key in keys] == expected[:2] + [f"{expected[2]}-{keys[2][0]}"] + expected[3:]
+
+
+def test_partitioning_backfills_keys_left_null_by_an_earlier_0001(pg):
+    migrate.migrate(pg, target=1)
+    cur = pg.cursor()
+    cur.execute("UPDATE reviews SET review_key = NULL")     # as 0001 used to leave them
+    pg.commit()
+
+    migrate.migrate(pg)
+    keys = _keys(pg)
+    assert len(keys) == len(LEGACY_REVIEWS)
+    assert all(key for _, key in keys)
+    assert len({key for _, key in keys}) == len(keys)
@@ -0,0 +1,111 @@
+import os
+import socket
+import threading
+from multiprocessing import AuthenticationError
+
+import pandas as pd
+import pytest
+
+import model_server
+import task_2_sentiment_thematic_analysis as task_2
+
+
+def fake_handlers(calls):
+    def sentiment(texts):
+        calls.append(len(texts))
+        return [("POSITIVE" if "good" in t else "NEGATIVE", 0.9) for t in texts]
+
+    def keywords(texts):
+        return [t.lower() for t in texts]
+
+    def broken(texts):
+        raise ValueError("model exploded")
+
+    return {"sentiment": sentiment, "keywords": keywords, "broken": broken}
+
+
+@pytest.fixture
+def server():
+    calls = []
+    server = model_server.ModelServer(fake_handlers(calls), ("localhost", 0), authkey=b"test")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.calls = calls
+    yield server
+    server.close()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+
+def test_client_batches_requests_and_surfaces_errors(server):
+    with model_server.ModelClient(server.address, authkey=b"test", request_size=2) as client:
+        assert client.ping() == ["broken", "keywords", "sentiment"]
+        texts = ["good app", "bad app", "good", "slow", "crash"]
+        assert [label for label, _ in client.sentiment(texts)] == \
+            ["POSITIVE", "NEGATIVE", "POSITIVE", "NEGATIVE", "NEGATIVE"]
+        assert server.calls == [2, 2, 1]
+        with pytest.raises(RuntimeError, match="model exploded"):
+            client.call("broken", ["x"])
+        with pytest.raises(RuntimeError, match="unknown op"):
+            client.call("translate", ["x"])
+        # The connection is still usable after errors
+        assert client.keywords(["Mobile Banking"]) == ["mobile banking"]
+
+
+def test_process_reviews_can_use_a_warm_server(server):
+    df = pd.DataFrame({"review": ["good transfer", "app login failed"]})
+    with model_server.ModelClient(server.address, authkey=b"test") as client:
+        out = task_2.process_reviews(df, client=client)
+    assert out["sentiment_label"].tolist() == ["POSITIVE", "NEGATIVE"]
+    assert out["keywords"].tolist() == ["good transfer", "app login failed"]
+    assert out["identified_theme"].tolist()[1] == "Account Access Issues"
+
+
+def test_process_reviews_runs_once_per_near_duplicate_cluster(server):
+    df = pd.DataFrame({
+        "review": ["good transfer", "app login failed", "good transfer!", "app login failed"],
+        "cluster_id": [0, 1, 0, 1],
+    })
+    with model_server.ModelClient(server.address, authkey=b"test") as client:
+        out = task_2.process_reviews(df, client=client)
+    assert server.calls == [2]
+    assert out["sentiment_label"].tolist() == ["POSITIVE", "NEGATIVE", "POSITIVE", "NEGATIVE"]
+    assert out["keywords"].tolist()[2] == "good transfer"
+
+
+def test_parse_address():
+    assert model_server.parse_address("localhost:6010") == ("localhost", 6010)
+    assert model_server.parse_address("/tmp/models.sock") == "/tmp/models.sock"
+
+
+def test_server_writes_a_private_random_key_that_clients_read(tmp_path, monkeypatch):
+    monkeypatch.delenv(model_server.AUTHKEY_ENV, raising=False)
+    key_file = tmp_path / "server.key"
+    with pytest.raises(RuntimeError, match="No model server key"):
+        model_server.get_authkey(str(key_file))
+    key = model_server.get_authkey(str(key_file), create=True)
+    assert len(key) == 64 and (key_file.stat().st_mode & 0o777) == 0o600
+    assert model_server.get_authkey(str(key_file)) == key
+    key_file.chmod(0o644)
+    with pytest.raises(RuntimeError, match="readable by other users"):
+        model_server.get_authkey(str(key_file))
+    monkeypatch.setenv(model_server.AUTHKEY_ENV, "from-env")
+    assert model_server.get_authkey(str(key_file)) == b"from-env"
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no Unix sockets")
+def test_unix_socket_server_rejects_the_wrong_key(tmp_path):
+    path = str(tmp_path / "models.sock")
+    open(path, "w").close()         # stale file from a crashed server
+    server = model_server.ModelServer(fake_handlers([]), path, authkey=b"test")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert (os.stat(path).st_mode & 0o777) == 0o600
+        with pytest.raises(AuthenticationError):
+            model_server.ModelClient(path, authkey=b"wrong")
+        with model_server.ModelClient(path, authkey=b"test") as client:
+            assert client.keywords(["Fast App"]) == ["fast app"]
+    finally:
+        server.close()
+        thread.join(timeout=5)
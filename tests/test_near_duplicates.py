@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import near_duplicates
+import preprocess
+
+CRASH = "the app keeps crashing every time i try to open it, please fix"
+
+
+def _shingles(text, k=near_duplicates.SHINGLE_SIZE):
+    data = near_duplicates._NON_WORD.sub(" ", text.lower()).strip().encode().ljust(k, b"\0")
+    return {data[i:i + k] for i in range(len(data) - k + 1)}
+
+
+def test_signatures_estimate_jaccard_similarity():
+    hasher = near_duplicates.MinHasher(num_perm=512)
+    a = "transfer failed twice today and the money was deducted from my account"
+    b = "transfer failed again today and the money was deducted from my account"
+    sig = hasher.signatures([a, b, a])
+    jaccard = len(_shingles(a) & _shingles(b)) / len(_shingles(a) | _shingles(b))
+    assert (sig[0] == sig[2]).all()
+    assert abs((sig[0] == sig[1]).mean() - jaccard) < 0.08
+
+
+def test_lsh_params_follow_the_threshold():
+    strict, loose = near_duplicates.lsh_params(0.9, 64), near_duplicates.lsh_params(0.5, 64)
+    assert strict[0] * strict[1] <= 64 and loose[0] * loose[1] <= 64
+    assert strict[1] > loose[1]      # more rows per band: harder to collide
+
+
+def test_near_duplicates_share_a_cluster():
+    index = near_duplicates.NearDuplicateIndex()
+    texts = [CRASH, "great app", CRASH.replace(",", "") + "!", "great app", "transfer failed", CRASH + " now"]
+    clusters = index.assign(texts)
+    assert clusters.tolist() == [0, 1, 0, 1, 3, 0]
+    assert len(index) == 5           # the repeated "great app" is one item
+
+
+def test_threshold_is_tunable():
+    texts = [CRASH, CRASH.replace("every time", "whenever")]
+    assert near_duplicates.NearDuplicateIndex(0.5).assign(texts).tolist() == [0, 0]
+    assert near_duplicates.NearDuplicateIndex(0.95).assign(texts).tolist() == [0, 1]
+
+
+def test_index_persists_and_only_hashes_new_texts(tmp_path, monkeypatch):
+    path = tmp_path / "index.npz"
+    index = near_duplicates.NearDuplicateIndex()
+    first = index.assign([CRASH, "great app", "login error"])
+    index.save(path)
+
+    loaded = near_duplicates.NearDuplicateIndex.load(path)
+    hashed = []
+    original = loaded.hasher.signatures
+    monkeypatch.setattr(loaded.hasher, "signatures", lambda texts: hashed.extend(texts) or original(texts))
+    clusters = loaded.assign(["great app", CRASH + "!!", "login error", "new review"])
+
+    assert hashed == [CRASH + "!!", "new review"]
+    assert clusters.tolist() == [first[1], first[0], first[2], 4]
+    assert loaded.bands == index.bands and len(loaded) == 5
+
+
+def test_annotate_and_collapse():
+    df = pd.DataFrame({"review": [CRASH, "great app", CRASH + "!"], "rating": [1, 5, 2]})
+    index = near_duplicates.NearDuplicateIndex()
+    annotated = near_duplicates.annotate(df, index)
+    assert annotated["cluster_id"].tolist() == [0, 1, 0]
+    assert annotated["cluster_size"].tolist() == [2, 1, 2]
+    collapsed = near_duplicates.annotate(df, index, collapse=True)
+    assert collapsed["rating"].tolist() == [1, 5]
+
+    first, spread = near_duplicates.representatives(annotated["cluster_id"])
+    assert first.tolist() == [0, 1] and np.array(["a", "b"])[spread].tolist() == ["a", "b", "a"]
+
+
+@pytest.mark.parametrize("mode", ["annotate", "collapse"])
+def test_preprocess_streaming_matches_in_memory(tmp_path, mode):
+    raw = pd.DataFrame({
+        "review": [CRASH, "Good!", CRASH + " 👍", "bad", "good", "bad app"],
+        "rating": [1, 5, 1, 1, 5, 2],
+        "date": ["2025-12-01"] * 6,
+        "bank": ["CBE", "BOA", "CBE", "Dashen", "Dashen", "BOA"],
+        "source": ["Google Play"] * 6,
+    })
+    raw_file = tmp_path / "raw.csv"
+    raw.to_csv(raw_file, index=False)
+    options = {"near_duplicates": mode}
+
+    preprocess.preprocess_reviews(raw_file, tmp_path / "full.csv", index_file=tmp_path / "a.npz", **options)
+    preprocess.preprocess_reviews_streaming(raw_file, tmp_path / "stream.csv", chunksize=2,
+                                            index_file=tmp_path / "b.npz", **options)
+    full = pd.read_csv(tmp_path / "full.csv")
+    if mode == "annotate":
+        assert full["cluster_id"].tolist()[:3] == [0, 1, 0]
+    else:
+        assert full["review"].tolist() == [preprocess.clean_text(CRASH), "good!", "bad", "bad app"]
+    assert full.drop(columns="cluster_size").equals(
+        pd.read_csv(tmp_path / "stream.csv").drop(columns="cluster_size")
+    )
@@ -0,0 +1,51 @@
+import pipeline
+import storage
+
+
+def test_content_hash_follows_file_contents(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "a.csv").write_text("x\n1\n")
+    first = pipeline.content_hash([data])
+    assert pipeline.content_hash([data]) == first
+
+    (data / ".a.csv.tmp").write_text("ignored")
+    assert pipeline.content_hash([data]) == first
+
+    (data / "a.csv").write_text("x\n2\n")
+    assert pipeline.content_hash([data]) != first
+    assert pipeline.content_hash([data], extra="v2") != pipeline.content_hash([data])
+
+
+def test_stages_pass_frames_in_memory_and_skip_when_inputs_unchanged(tmp_path):
+    source = tmp_path / "raw.csv"
+    output = tmp_path / "doubled.parquet"
+    state_file = tmp_path / "state.json"
+    source.write_text("x\n1\n2\n")
+    runs = []
+
+    def read(ctx):
+        runs.append("read")
+        ctx["frame"] = storage.read_table(source)
+
+    def double(ctx):
+        runs.append("double")
+        storage.write_table(ctx["frame"] * 2, output)
+
+    stages = [
+        pipeline.Stage("read", read),
+        pipeline.Stage("double", double, inputs=[source], outputs=[output]),
+    ]
+    timings = pipeline.run_pipeline(stages, state_file=state_file)
+    assert [t["status"] for t in timings] == ["ran", "ran"]
+    assert storage.read_table(output)["x"].tolist() == [2, 4]
+
+    timings = pipeline.run_pipeline(stages, state_file=state_file)
+    assert [t["status"] for t in timings] == ["ran", "skipped"]
+
+    source.write_text("x\n3\n")
+    pipeline.run_pipeline(stages, state_file=state_file)
+    assert storage.read_table(output)["x"].tolist() == [6]
+
+    pipeline.run_pipeline(stages, state_file=state_file, force=True)
+    assert runs.count("double") == 3   # first run, changed input, forced
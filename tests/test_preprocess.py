@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+import preprocess
+
+
+def test_map_unique_matches_apply():
+    s = pd.Series(["Good APP 👍", None, np.nan, 5, "visit www.x.com now", "Good APP 👍"], index=[3, 1, 4, 1, 5, 9])
+    assert preprocess.map_unique(s, preprocess.clean_text).equals(s.apply(preprocess.clean_text))
+
+    banks = pd.Series(["CBE", np.nan, "boa", "Dashen", "CBE"])
+    assert preprocess.map_unique(banks, preprocess.standardize_bank_name).equals(
+        banks.apply(preprocess.standardize_bank_name)
+    )
+
+
+def test_preprocess_reproduces_bundled_cleaned_csv(tmp_path):
+    output = tmp_path / "cleaned.csv"
+    preprocess.preprocess_reviews("data/raw/reviews.csv", output)
+    with open(output, "rb") as new, open("data/cleaned_reviews.csv", "rb") as bundled:
+        assert new.read() == bundled.read()
+
+
+def test_streaming_matches_in_memory_across_chunk_boundaries(tmp_path):
+    raw = pd.DataFrame({
+        "review": ["Good!", "bad", "Good!", "", "ok 👍", "bad"],
+        "rating": [5, 1, 5, 3, 9, 1],
+        "date": ["2025-12-01"] * 6,
+        "bank": ["CBE", "BOA", "CBE", "Dashen", "Dashen", "BOA"],
+        "source": ["Google Play"] * 6,
+    })
+    raw_file = tmp_path / "raw.csv"
+    raw.to_csv(raw_file, index=False)
+
+    preprocess.preprocess_reviews(raw_file, tmp_path / "full.csv")
+    rows_in, rows_out = preprocess.preprocess_reviews_streaming(raw_file, tmp_path / "stream.csv", chunksize=2)
+
+    assert (rows_in, rows_out) == (6, 2)
+    assert (tmp_path / "stream.csv").read_bytes() == (tmp_path / "full.csv").read_bytes()
+
+
+def test_streaming_reproduces_bundled_cleaned_csv(tmp_path):
+    output = tmp_path / "cleaned.csv"
+    preprocess.preprocess_reviews_streaming("data/raw/reviews.csv", output, chunksize=500)
+    with open(output, "rb") as new, open("data/cleaned_reviews.csv", "rb") as bundled:
+        assert new.read() == bundled.read()
@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import report_renderer
+import rollups
+from report_renderer import Figure, render_figures, report_figures, write_bundle
+
+SUMMARY = pd.DataFrame({
+    "bank_id": [1, 2],
+    "bank_name": ["Dashen Bank", "Bank of Abyssinia"],
+    "avg_rating": [4.1, 3.2],
+    "avg_sentiment": [0.3, 0.1],
+    "n_positive": [40, 3], "n_neutral": [1, 1], "n_negative": [5, 2],
+    **{f"rating_{r}": np.array([r, 6 - r], dtype=np.int64) for r in rollups.RATINGS},
+})
+THEMES = pd.DataFrame({"bank_name": ["Dashen Bank", "Bank of Abyssinia"], "top_keywords": ["app fast", ""]})
+
+
+def figures(summary=SUMMARY):
+    by_bank = summary.set_index("bank_name")
+    return report_figures(summary, THEMES, by_bank["avg_rating"], by_bank["avg_sentiment"],
+                          rollups.LABEL_COLUMNS, rollups.RATINGS)
+
+
+@pytest.fixture
+def drawn(monkeypatch):
+    """Replace drawing with writing the figure's kind, recording each path drawn."""
+    paths = []
+
+    def render_one(kind, data, path):
+        with open(path, "w") as f:
+            f.write(kind)
+        paths.append(os.path.basename(path))
+    monkeypatch.setattr(report_renderer, "render_one", render_one)
+    return paths
+
+
+def test_one_figure_per_chart_and_non_empty_keyword_list():
+    names = [figure.name for figure in figures()]
+    assert names == ["sentiment_distribution", "rating_distribution", "keyword_cloud_Dashen Bank",
+                     "average_rating_per_bank", "average_sentiment_per_bank"]
+
+
+def test_key_depends_only_on_the_data():
+    assert Figure("a", "kind", {"x": np.int64(1)}).key() == Figure("b", "kind", {"x": 1}).key()
+    assert Figure("a", "kind", {"x": 1}).key() != Figure("a", "kind", {"x": 2}).key()
+
+
+def test_only_changed_figures_are_redrawn(tmp_path, drawn):
+    drawn_names, skipped = render_figures(figures(), tmp_path, workers=0)
+    assert len(drawn_names) == 5 and skipped == []
+
+    changed = SUMMARY.copy()
+    changed["avg_rating"] = [4.2, 3.2]
+    drawn.clear()
+    drawn_names, skipped = render_figures(figures(changed), tmp_path, workers=0)
+    assert drawn_names == ["average_rating_per_bank"] and len(skipped) == 4
+    assert drawn == ["average_rating_per_bank.png"]
+
+
+def test_missing_file_is_redrawn(tmp_path, drawn):
+    render_figures(figures(), tmp_path, workers=0)
+    os.remove(tmp_path / "rating_distribution.png")
+    drawn_names, _ = render_figures(figures(), tmp_path, workers=0)
+    assert drawn_names == ["rating_distribution"]
+
+
+def test_bundle_inlines_figures_and_tables(tmp_path, drawn):
+    rendered = figures()
+    render_figures(rendered, tmp_path, workers=0)
+    path = write_bundle(tmp_path / "report.html", rendered, tmp_path,
+                        [("Recommendations", pd.DataFrame({"bank_name": ["Dashen Bank"]}))])
+    html = open(path, encoding="utf-8").read()
+    assert html.count("data:image/png;base64,") == 5
+    assert "<h2>Recommendations</h2>" in html and "Dashen Bank" in html
+
+
+def test_figures_are_drawn_headless_in_a_process_pool(tmp_path):
+    pytest.importorskip("matplotlib")
+    pytest.importorskip("seaborn")
+    pytest.importorskip("wordcloud")
+    drawn_names, _ = render_figures(figures(), tmp_path, workers=2)
+    assert len(drawn_names) == 5
+    for name in drawn_names:
+        with open(tmp_path / f"{name}.png", "rb") as f:
+            assert f.read(8) == b"\x89PNG\r\n\x1a\n"
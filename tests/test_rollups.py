@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+import rollups
+import task_4_analysis
+
+SUMMARY = pd.DataFrame({
+    "bank_id": [1, 2, 3],
+    "bank_name": ["Dashen Bank", "Bank of Abyssinia", "Commercial Bank of Ethiopia"],
+    "avg_rating": [4.1, 3.2, 3.9],
+    "avg_sentiment": [0.3, -0.1, 0.2],
+    "n_positive": [4000, 30, 0],
+    "n_neutral": [10, 10, 10],
+    "n_negative": [500, 2, 7],
+})
+
+
+def percentile_stats(data, whis=1.5):
+    """Reference box statistics from the expanded data (matplotlib's definitions)."""
+    q1, med, q3 = np.percentile(data, [25, 50, 75])
+    iqr = q3 - q1
+    hi, lo = data[data <= q3 + whis * iqr], data[data >= q1 - whis * iqr]
+    whishi = q3 if not len(hi) or hi.max() < q3 else hi.max()
+    whislo = q1 if not len(lo) or lo.min() > q1 else lo.min()
+    return q1, med, q3, whislo, whishi, np.unique(data[(data < whislo) | (data > whishi)])
+
+
+def test_box_stats_match_expanded_data():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        counts = rng.integers(0, 30, 5) * (rng.random(5) < 0.7)
+        if not counts.sum():
+            continue
+        data = np.repeat(np.arange(1, 6, dtype=float), counts)
+        stats = rollups.box_stats(counts)
+        q1, med, q3, whislo, whishi, fliers = percentile_stats(data)
+        assert np.allclose([stats["q1"], stats["med"], stats["q3"], stats["whislo"], stats["whishi"]],
+                           [q1, med, q3, whislo, whishi])
+        assert stats["fliers"].tolist() == fliers.tolist()
+        assert np.isclose(stats["mean"], data.mean())
+
+
+def test_box_stats_of_no_ratings():
+    assert np.isnan(rollups.box_stats([0, 0, 0, 0, 0])["med"])
+
+
+def test_sample_percent():
+    assert rollups.sample_percent({1: 1_000_000, 2: 1_000_000}, n=5) == 100.0 * 4 * 5 * 2 / 2_000_000
+    assert rollups.sample_percent({1: 30}, n=5) is None
+    assert rollups.sample_percent({}, n=5) is None
+
+
+def test_sample_reviews_tops_up_short_banks(monkeypatch):
+    calls = []
+
+    def fake_sample(database, label, bank_ids, n, percent=None):
+        calls.append((sorted(bank_ids), percent))
+        if percent is not None:       # the block sample misses bank 2
+            return {1: ["a"] * n}
+        return {b: [f"full {b}"] for b in bank_ids}
+
+    monkeypatch.setattr(rollups, "_ranked_sample", fake_sample)
+    samples = rollups.sample_reviews(None, SUMMARY, "negative", 5)
+
+    assert samples == {1: ["a"] * 5, 2: ["full 2"], 3: ["full 3"]}
+    assert calls[0][0] == [1, 2, 3] and calls[0][1] is not None
+    assert calls[1] == ([2, 3], None)
+
+
+def test_sample_reviews_skips_banks_without_matches(monkeypatch):
+    monkeypatch.setattr(rollups, "_ranked_sample",
+                        lambda database, label, bank_ids, n, percent=None: {b: ["x"] for b in bank_ids})
+    assert rollups.sample_reviews(None, SUMMARY, "positive", 5) == {1: ["x"], 2: ["x"], 3: []}
+
+
+def test_report_uses_the_summary():
+    avg_ratings, avg_sentiment = task_4_analysis.compare_banks(SUMMARY)
+    assert avg_ratings.index.tolist() == sorted(SUMMARY["bank_name"])
+    assert avg_ratings["Dashen Bank"] == 4.1 and avg_sentiment["Bank of Abyssinia"] == -0.1
+
+    themes = pd.DataFrame({"bank_id": [1, 2], "top_keywords": ["app", "login"]})
+    mapping = task_4_analysis.add_bank_names(SUMMARY, themes)
+    recs = task_4_analysis.build_recommendations(
+        SUMMARY, {1: ["great"], 2: [], 3: []}, {1: [], 2: ["login error"], 3: ["app crash"]}, mapping
+    )
+    assert themes["bank_name"].tolist() == ["Dashen Bank", "Bank of Abyssinia"]
+    assert recs["Bank of Abyssinia"]["recommendations"] == ["Improve login reliability"]
+    assert recs["Commercial Bank of Ethiopia"]["recommendations"] == ["Fix app stability issues"]
+
+
+def test_rollup_sql_tracks_every_write():
+    with open(rollups.ROLLUP_SQL) as f:
+        ddl = f.read()
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        assert f"AFTER {event} ON reviews" in ddl
+    assert "CREATE OR REPLACE VIEW bank_review_summary" in ddl
@@ -0,0 +1,130 @@
+import threading
+from datetime import datetime, timedelta
+
+from google_play_scraper.features.reviews import _ContinuationToken
+
+import scrape_reviews
+import storage
+
+START = datetime(2025, 12, 1, 12, 0)
+
+
+class FakeReviewSource:
+    """Newest-first reviews served in pages; tokens point at the next review, like a cursor."""
+
+    def __init__(self, n):
+        self.items = [
+            {"content": f"review {i}", "score": 5, "at": START - timedelta(hours=i)}
+            for i in range(n)
+        ]
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def add_newer(self, k):
+        newest = self.items[0]["at"]
+        self.items = [
+            {"content": f"new {i}", "score": 1, "at": newest + timedelta(minutes=k - i)}
+            for i in range(k)
+        ] + self.items
+
+    def __call__(self, app_id, lang, country, sort, count, continuation_token=None):
+        with self.lock:
+            self.calls += 1
+        contents = [item["content"] for item in self.items]
+        offset = contents.index(continuation_token.token) if continuation_token else 0
+        page = self.items[offset:offset + count]
+        more = offset + count < len(self.items)
+        token = _ContinuationToken(contents[offset + count] if more else None,
+                                   lang, country, sort, count, None, None)
+        return page, token
+
+
+def test_follows_tokens_and_resumes_backfill():
+    source = FakeReviewSource(10)
+    records, state = scrape_reviews.scrape_app_reviews(
+        "app", "Bank", fetch=source, page_size=3, max_pages=2
+    )
+    assert [r["review"] for r in records] == [f"review {i}" for i in range(6)]
+    assert state["backfill_token"]["token"] == "review 6"
+    assert state["newest_seen"] == START.isoformat()
+
+    # Next run: two new reviews on top, then the backfill continues to the end
+    source.add_newer(2)
+    records, state = scrape_reviews.scrape_app_reviews(
+        "app", "Bank", state=state, fetch=source, page_size=3, max_pages=None
+    )
+    assert [r["review"] for r in records] == ["new 0", "new 1", "review 6", "review 7", "review 8", "review 9"]
+    assert state["backfill_token"] is None
+
+    # Nothing new: a single page is fetched and the run stops early
+    calls = source.calls
+    records, state = scrape_reviews.scrape_app_reviews(
+        "app", "Bank", state=state, fetch=source, page_size=3
+    )
+    assert records == []
+    assert source.calls == calls + 1
+
+
+def test_scrape_all_runs_apps_concurrently_with_state_per_app():
+    source = FakeReviewSource(5)
+    apps = [{"name": "A", "id": "a"}, {"name": "B", "id": "b"}]
+    records, state = scrape_reviews.scrape_all(apps, fetch=source, rate=None, page_size=5)
+    assert sorted({r["bank"] for r in records}) == ["A", "B"]
+    assert set(state) == {"a", "b"}
+
+
+def test_state_round_trips_through_json(tmp_path):
+    path = tmp_path / "state.json"
+    scrape_reviews.save_state({"a": {"newest_seen": START.isoformat()}}, path)
+    assert scrape_reviews.load_state(path)["a"]["newest_seen"] == START.isoformat()
+    assert scrape_reviews.load_state(tmp_path / "missing.json") == {}
+
+
+def test_interrupted_head_pass_resumes_without_gaps():
+    source = FakeReviewSource(6)
+    _, state = scrape_reviews.scrape_app_reviews("app", "Bank", fetch=source, page_size=3, max_pages=None)
+
+    # Five new reviews arrive; the run dies after the first page is written
+    source.add_newer(5)
+    pages = scrape_reviews.iter_app_reviews("app", "Bank", state, fetch=source, page_size=3)
+    first, checkpoint = next(pages)
+    assert [r["review"] for r in first] == ["new 0", "new 1", "new 2"]
+    assert checkpoint["newest_seen"] == state["newest_seen"]
+
+    records, state = scrape_reviews.scrape_app_reviews("app", "Bank", checkpoint, fetch=source, page_size=3)
+    assert [r["review"] for r in records] == ["new 3", "new 4"]
+    assert state["head_token"] is None
+    assert state["newest_seen"] == (START + timedelta(minutes=5)).isoformat()
+
+
+def test_stream_all_writes_partitions_and_checkpoints_each_page(tmp_path):
+    source = FakeReviewSource(14)   # 12:00 back to 23:00 the day before
+    checkpoints = []
+    writer = scrape_reviews.PartitionWriter(tmp_path / "reviews")
+    written, state = scrape_reviews.stream_all(
+        writer, [{"name": "A", "id": "a"}], fetch=source, rate=None,
+        page_size=5, max_pages=None, checkpoint=checkpoints.append, queue_pages=1
+    )
+    assert written == 14
+    assert len(checkpoints) == 3
+    assert checkpoints[-1] == state
+
+    parts = sorted((tmp_path / "reviews" / "a").glob("*/part-*.parquet"))
+    assert {p.parent.name for p in parts} == {"2025-12-01", "2025-11-30"}
+    df = storage.read_table(tmp_path / "reviews")
+    assert sorted(df["review"]) == sorted(f"review {i}" for i in range(14))
+
+
+def test_csv_export_stays_out_of_the_parquet_dataset(tmp_path):
+    writer = scrape_reviews.PartitionWriter(tmp_path / "reviews", export_csv=True)
+    scrape_reviews.stream_all(
+        writer, [{"name": "A", "id": "a"}], fetch=FakeReviewSource(14), rate=None,
+        page_size=5, max_pages=None, checkpoint=lambda state: None
+    )
+    csv_parts = sorted((tmp_path / "reviews_csv" / "a").glob("*/part-*.csv"))
+    assert {p.parent.name for p in csv_parts} == {"2025-12-01", "2025-11-30"}
+    assert not list((tmp_path / "reviews").rglob("*.csv"))
+
+    assert len(storage.read_table(tmp_path / "reviews")) == 14
+    assert sum(len(chunk) for chunk in storage.iter_chunks(tmp_path / "reviews", 4)) == 14
+    assert "review" in storage.read_columns(tmp_path / "reviews")
@@ -0,0 +1,64 @@
+import sqlite3
+
+from sentiment_cache import SentimentCache, cached_scores, text_key
+from vader_scoring import get_sentiment
+
+
+def test_cached_scores_scores_each_distinct_text_once(tmp_path):
+    calls = []
+
+    def score_many(texts):
+        calls.append(list(texts))
+        return [("positive", float(len(t))) for t in texts]
+
+    cache = SentimentCache(tmp_path / "cache.sqlite")
+    first = cached_scores(["good app", "Good app!", "good app", "bad"], score_many, cache, "m", "1")
+    assert calls == [["good app", "Good app!", "bad"]]
+    assert first[0] == first[2]
+
+    # a second run (new process, same file) never pays for inference again
+    cache.close()
+    cache = SentimentCache(tmp_path / "cache.sqlite", memory_entries=1)
+    second = cached_scores(["bad", "good app"], score_many, cache, "m", "1")
+    assert len(calls) == 1
+    assert second == [first[3], first[0]]
+    assert cache.stats()["hits"] == 2
+
+    # another model version is a different key
+    cached_scores(["bad"], score_many, cache, "m", "2")
+    assert calls[-1] == ["bad"]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = SentimentCache(tmp_path / "cache.sqlite", max_entries=2)
+    score = lambda texts: [("neutral", 0.0)] * len(texts)
+    cached_scores(["a"], score, cache, "m", "1")
+    cached_scores(["b"], score, cache, "m", "1")
+    cached_scores(["c"], score, cache, "m", "1")
+    assert cache.evictions == 1
+    (count,) = cache._db.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()
+    assert count == 2
+
+
+def test_texts_that_score_differently_never_share_an_entry(tmp_path):
+    texts = ["not good", "not good :(", "Not good!", "not good"]
+    assert len({text_key(t) for t in texts}) == 3
+    score_many = lambda batch: [get_sentiment(t) for t in batch]
+    cache = SentimentCache(tmp_path / "cache.sqlite")
+    for order in (texts, texts[::-1]):
+        assert cached_scores(order, score_many, cache, "vader", "1") == score_many(order)
+    assert score_many(["not good"]) != score_many(["not good :("])     # what made merging them wrong
+
+
+def test_entries_from_the_old_keying_are_dropped(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    SentimentCache(path).close()
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA user_version = 0")
+    db.execute("INSERT INTO sentiment_cache VALUES (?, 'm', '1', 'neutral', 0.0, 0)", (text_key("not good"),))
+    db.commit()
+    db.close()
+    calls = []
+    score_many = lambda batch: calls.append(batch) or [("negative", -0.34)] * len(batch)
+    assert cached_scores(["not good"], score_many, SentimentCache(path), "m", "1") == [("negative", -0.34)]
+    assert calls == [["not good"]]
@@ -0,0 +1,89 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import sentiment_service
+
+
+class FakeScorer:
+    """Scores 'good' texts positive and records every batch it is given."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, texts):
+        self.release.wait(5)
+        self.batches.append(list(texts))
+        return [("positive", 0.5) if "good" in t else ("negative", -0.5) for t in texts]
+
+
+def test_concurrent_requests_are_grouped_into_micro_batches():
+    scorer = FakeScorer()
+    batcher = sentiment_service.MicroBatcher(scorer, max_batch=4, window=1.0)
+    try:
+        # Hold the scorer so requests pile up behind the first batch
+        scorer.release.clear()
+        first = batcher.submit(["good 0"])
+        futures = [batcher.submit([f"text {i}", f"good {i}"]) for i in range(4)]
+        scorer.release.set()
+
+        assert first.result(5) == [("positive", 0.5)]
+        assert [f.result(5) for f in futures] == [[("negative", -0.5), ("positive", 0.5)]] * 4
+        assert all(len(batch) <= 5 for batch in scorer.batches)   # max_batch, plus one request
+        assert len(scorer.batches) < 5
+
+        metrics = batcher.metrics.snapshot()
+        assert metrics["requests"] == 5 and metrics["texts"] == 9
+        assert metrics["request_latency"]["count"] == 5
+        assert metrics["request_latency"]["buckets"]["le_+Inf"] == 5
+    finally:
+        batcher.close()
+
+
+def test_scoring_errors_reach_every_request_in_the_batch():
+    def broken(texts):
+        raise ValueError("lexicon missing")
+
+    batcher = sentiment_service.MicroBatcher(broken, window=0)
+    try:
+        with pytest.raises(ValueError, match="lexicon missing"):
+            batcher.score(["x"], timeout=5)
+        assert batcher.metrics.snapshot()["errors"] == 1
+    finally:
+        batcher.close()
+
+
+def _request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=5) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_http_endpoints():
+    service = sentiment_service.SentimentService({"vader": FakeScorer()}, port=0, window=0.001)
+    service.start()
+    try:
+        status, body = _request(f"{service.url}/score", {"texts": ["good app", "bad app"]})
+        assert status == 200
+        assert body == {"model": "vader", "results": [
+            {"label": "positive", "score": 0.5}, {"label": "negative", "score": -0.5}
+        ]}
+        assert _request(f"{service.url}/score", {"text": "good"})[1]["results"][0]["label"] == "positive"
+        assert _request(f"{service.url}/score", {"text": "x", "model": "bert"})[0] == 404
+        assert _request(f"{service.url}/score", {"texts": "not a list"})[0] == 400
+
+        status, metrics = _request(f"{service.url}/metrics")
+        assert status == 200
+        assert metrics["vader"]["texts"] == 3
+        assert metrics["vader"]["queue_depth"] == 0
+        assert _request(f"{service.url}/health")[1]["models"] == ["vader"]
+    finally:
+        service.close()
@@ -0,0 +1,16 @@
+from sentiment_writeback import write_sentiment
+from tests.fakes import FakeConnection
+
+
+def test_write_sentiment_commits_per_batch():
+    conn = FakeConnection()
+    results = [(i, "positive", 0.5) for i in range(5)]
+    write_sentiment(conn, results, batch_size=2)
+
+    assert conn.commits == 3
+    prepares = [s for s in conn.statements if s.startswith("PREPARE")]
+    assert len(prepares) == 1 and "UPDATE reviews" in prepares[0]
+    assert conn.statements.count("EXECUTE update_sentiment") == 3
+    copied = "".join(conn.cursors[0].copied).splitlines()
+    assert copied[0] == "0\tpositive\t0.5"
+    assert len(copied) == 5
@@ -0,0 +1,48 @@
+import datetime
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import storage
+
+
+def _reviews():
+    return pd.DataFrame({
+        "review": ["good app", "slow"],
+        "rating": [5, 1],
+        "date": ["2025-12-01", None],
+        "bank": ["Dashen Bank", "Bank of Abyssinia"],
+        "source": ["Google Play", "Google Play"],
+    })
+
+
+def test_parquet_round_trip_uses_typed_columns(tmp_path):
+    path = tmp_path / "reviews.parquet"
+    storage.write_table(_reviews(), path, export_csv=True)
+
+    schema = pq.read_schema(path)
+    assert str(schema.field("rating").type) == "int8"
+    assert str(schema.field("date").type) == "date32[day]"
+    assert str(schema.field("bank").type).startswith("dictionary")
+
+    df = storage.read_table(path, columns=["bank", "date"])
+    assert list(df.columns) == ["bank", "date"]
+    assert df["date"].iloc[0] == datetime.date(2025, 12, 1)
+    assert df["date"].iloc[1] is None
+    assert pd.read_csv(tmp_path / "reviews.csv")["review"].tolist() == ["good app", "slow"]
+
+
+def test_missing_parquet_falls_back_to_csv(tmp_path):
+    _reviews().to_csv(tmp_path / "reviews.csv", index=False)
+    df = storage.read_table(tmp_path / "reviews.parquet")
+    assert len(df) == 2
+    assert storage.read_columns(tmp_path / "reviews.parquet")[0] == "review"
+
+
+def test_table_writer_appends_chunks(tmp_path):
+    path = tmp_path / "out.parquet"
+    with storage.TableWriter(path) as writer:
+        writer.write(_reviews())
+        writer.write(_reviews().iloc[:1])
+    chunks = list(storage.iter_chunks(path, chunksize=2))
+    assert [len(c) for c in chunks] == [2, 1]
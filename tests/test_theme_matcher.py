@@ -0,0 +1,45 @@
+import pandas as pd
+
+from theme_matcher import ThemeMatcher
+
+
+def _matcher():
+    return ThemeMatcher.from_file("themes.yaml")
+
+
+def test_terms_match_whole_words_only():
+    matcher = _matcher()
+    assert matcher.assign("new ui, fast") == "User Interface & Experience"
+    assert matcher.assign("the build, a guide") == "Feature / Others"
+    assert matcher.assign("money transfers") == "Transaction Performance"
+
+
+def test_priority_and_multi_label():
+    matcher = _matcher()
+    text = "customer support, login page, slow transfer"
+    assert matcher.assign(text) == "Account Access Issues"
+    assert matcher.match(text) == [
+        "Account Access Issues", "Transaction Performance", "Customer Support"
+    ]
+
+
+def test_series_matches_single_text_path():
+    matcher = _matcher()
+    keywords = pd.Series(["my account", None, "nice design", "", "help me", "guinea"],
+                         index=[5, 5, 7, 8, 9, 10])
+    expected = [matcher.assign(k) for k in keywords]
+    assert matcher.assign_series(keywords).tolist() == expected
+    assert matcher.match_series(keywords).tolist() == expected
+
+
+def test_priority_key_reorders_themes(tmp_path):
+    path = tmp_path / "themes.yaml"
+    path.write_text(
+        "default: Other\n"
+        "themes:\n"
+        "  - {name: A, terms: [slow], priority: 2}\n"
+        "  - {name: B, terms: [app], priority: 1}\n"
+    )
+    matcher = ThemeMatcher.from_file(path)
+    assert matcher.assign("slow app") == "B"
+    assert matcher.assign("nothing") == "Other"
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+import vader_scoring
+
+TEXTS = [
+    "great app, love it", "terrible, keeps crashing", "it is an app", "great app, love it",
+    "", None, float("nan"), "worst bank ever", "ok", "terrible, keeps crashing",
+]
+
+
+def legacy_get_sentiment(text, analyzer=SentimentIntensityAnalyzer()):
+    """The per-row function sentiment_analysis.py and task_2_analysis.py used to copy."""
+    if not text:
+        return "neutral", 0
+    compound = analyzer.polarity_scores(text)['compound']
+    if compound >= 0.05:
+        return "positive", compound
+    elif compound <= -0.05:
+        return "negative", compound
+    else:
+        return "neutral", compound
+
+
+def test_thresholds():
+    assert [vader_scoring.label_for(c) for c in (0.05, 0.0499, -0.0499, -0.05)] == \
+        ["positive", "neutral", "neutral", "negative"]
+    assert vader_scoring.labels_for([0.05, 0.0, -0.05]).tolist() == ["positive", "neutral", "negative"]
+
+
+def test_matches_the_per_row_function():
+    strings = [t for t in TEXTS if isinstance(t, str)]
+    assert vader_scoring.score_many(strings, workers=0) == [legacy_get_sentiment(t) for t in strings]
+    assert vader_scoring.get_sentiment(None) == ("neutral", 0)
+
+
+def test_process_pool_matches_serial_scoring_and_dedupes():
+    serial = vader_scoring.VaderScorer(workers=0).compounds(TEXTS)
+    with vader_scoring.VaderScorer(workers=2, chunk_size=2, min_parallel=1) as scorer:
+        parallel = scorer.compounds(TEXTS)
+        again = scorer.compounds(TEXTS[:3])   # the pool is reused
+    np.testing.assert_array_equal(serial, parallel)
+    np.testing.assert_array_equal(again, serial[:3])
+    assert parallel[0] == parallel[3] and parallel[1] == parallel[9]
+    assert parallel[4] == parallel[5] == parallel[6] == 0
+
+
+def test_score_frame_keeps_the_index():
+    texts = pd.Series(["love it", "hate it"], index=[10, 20])
+    frame = vader_scoring.VaderScorer(workers=0).score_frame(texts)
+    assert frame.index.tolist() == [10, 20]
+    assert frame["sentiment_label"].tolist() == ["positive", "negative"]